@@ -0,0 +1,106 @@
+"""Crash-safe artifact writes shared by all pipeline stages.
+
+Every stage writes its outputs through ``atomic_write``: data goes to a
+temporary ``*.partial`` file next to the target, is fsynced, and is then
+renamed over the target. A crash or Ctrl-C therefore leaves either the old
+file or the new one, never a truncated file that existence-based skip logic
+would treat as complete. ``quarantine_partial_outputs`` cleans up leftovers
+from interrupted runs at startup.
+"""
+import json
+import logging
+import os
+import shutil
+import uuid
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+PARTIAL_SUFFIX = ".partial"
+QUARANTINE_DIR = ".quarantine"
+
+
+def _fsync_dir(path: str) -> None:
+    """Persist a rename by fsyncing its directory (best effort; not on Windows)."""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+@contextmanager
+def atomic_write(path: str, mode: str = "w", encoding: str = "utf-8") -> Iterator:
+    """Open a temporary file that atomically replaces ``path`` on success.
+
+    Usage mirrors ``open``: ``with atomic_write(p) as f: f.write(...)``. If the
+    block raises, the temporary file is removed and ``path`` is untouched.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    tmp = f"{path}.{uuid.uuid4().hex[:8]}{PARTIAL_SUFFIX}"
+    binary = "b" in mode
+    try:
+        with open(tmp, mode, **({} if binary else {"encoding": encoding})) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+    _fsync_dir(directory)
+
+
+def write_text_atomic(path: str, text: str) -> None:
+    """Atomically write UTF-8 text to ``path``."""
+    with atomic_write(path) as f:
+        f.write(text)
+
+
+def write_json_atomic(path: str, data, **json_kwargs) -> None:
+    """Atomically dump ``data`` as JSON to ``path``."""
+    with atomic_write(path) as f:
+        json.dump(data, f, **json_kwargs)
+
+
+def quarantine_partial_outputs(dirs: list) -> list:
+    """Move leftover partial files under ``dirs`` into ``<dir>/.quarantine``.
+
+    Partial files are our own ``*.partial`` temp files and scratch folders.
+    yt-dlp's ``*.part``/``*.ytdl`` files are left alone: they are its resume
+    state, and the next download continues from them. Returns the quarantined
+    paths (their new locations).
+    """
+    moved = []
+    for root_dir in dirs:
+        if not root_dir or not os.path.isdir(root_dir):
+            continue
+        for root, subdirs, files in os.walk(root_dir):
+            # Never descend into quarantine folders; partial folders are moved whole
+            partial_dirs = [d for d in subdirs if d.endswith(PARTIAL_SUFFIX)]
+            subdirs[:] = [
+                d for d in subdirs if d != QUARANTINE_DIR and d not in partial_dirs
+            ]
+            for fname in [f for f in files if f.endswith(PARTIAL_SUFFIX)] + partial_dirs:
+                src = os.path.join(root, fname)
+                qdir = os.path.join(root, QUARANTINE_DIR)
+                os.makedirs(qdir, exist_ok=True)
+                dest = os.path.join(qdir, fname)
+                if os.path.exists(dest):
+                    dest = f"{dest}.{uuid.uuid4().hex[:8]}"
+                try:
+                    shutil.move(src, dest)
+                except OSError as e:
+                    logging.warning("Could not quarantine %s: %s", src, e)
+                    continue
+                logging.warning("Quarantined partial output %s -> %s", src, dest)
+                moved.append(dest)
+    return moved
@@ -0,0 +1,368 @@
+"""Streaming audio analysis helpers shared by the audio stages.
+
+Audio is decoded by ffmpeg into 16 kHz mono 16-bit PCM and consumed block by
+block, so even multi-hour broadcasts are analysed in constant memory. Per
+frame only an RMS level is kept (a few MB for several hours of audio). NumPy
+is used when installed; otherwise a pure-Python path computes the same
+values, only slower.
+"""
+import bisect
+import math
+import subprocess
+import sys
+import wave
+from array import array
+from collections.abc import Iterable, Iterator
+from typing import Callable, Optional
+
+try:
+    import numpy as np
+except ImportError:  # optional speed-up
+    np = None
+
+SAMPLE_RATE = 16000
+FRAME_SECONDS = 0.02
+
+
+def decode_pcm(
+    path: str,
+    sample_rate: int = SAMPLE_RATE,
+    start: Optional[float] = None,
+    duration: Optional[float] = None,
+    block_bytes: int = 1 << 16,
+) -> Iterator[bytes]:
+    """Yield raw mono s16le PCM blocks of ``path`` decoded by ffmpeg."""
+    cmd = ["ffmpeg", "-nostdin", "-v", "error"]
+    if start:
+        cmd += ["-ss", f"{start:.3f}"]
+    cmd += ["-i", path]
+    if duration:
+        cmd += ["-t", f"{duration:.3f}"]
+    cmd += ["-ac", "1", "-ar", str(sample_rate), "-f", "s16le", "-"]
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    try:
+        while True:
+            block = proc.stdout.read(block_bytes)
+            if not block:
+                break
+            yield block
+        err = proc.stderr.read().decode("utf-8", "replace").strip()
+        if proc.wait() != 0:
+            raise RuntimeError(f"ffmpeg failed to decode {path}: {err}")
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+            proc.wait()
+        proc.stdout.close()
+        proc.stderr.close()
+
+
+def _rms(data: bytes, frame_len: int) -> list:
+    """RMS level (0..1) of each ``frame_len``-sample frame in ``data``."""
+    if np is not None:
+        x = np.frombuffer(data, dtype="<i2").astype(np.float32) / 32768.0
+        x = x.reshape(-1, frame_len)
+        return np.sqrt((x * x).mean(axis=1)).tolist()
+    samples = array("h")
+    samples.frombytes(data)
+    if sys.byteorder == "big":
+        samples.byteswap()
+    levels = []
+    for i in range(0, len(samples), frame_len):
+        frame = samples[i : i + frame_len]
+        levels.append(math.sqrt(sum(s * s for s in frame) / len(frame)) / 32768.0)
+    return levels
+
+
+def frame_levels(
+    blocks: Iterable[bytes],
+    sample_rate: int = SAMPLE_RATE,
+    frame_seconds: float = FRAME_SECONDS,
+) -> array:
+    """Return per-frame RMS levels for a stream of s16le PCM blocks."""
+    frame_len = max(1, int(sample_rate * frame_seconds))
+    frame_bytes = frame_len * 2
+    levels = array("f")
+    carry = b""
+    for block in blocks:
+        data = carry + block
+        usable = len(data) - len(data) % frame_bytes
+        if usable:
+            levels.extend(_rms(data[:usable], frame_len))
+        carry = data[usable:]
+    tail = len(carry) // 2
+    if tail:
+        levels.extend(_rms(carry[: tail * 2], tail))
+    return levels
+
+
+def _percentile(sorted_values, q: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * q))]
+
+
+def isolation_metrics(
+    blocks: Iterable[bytes],
+    sample_rate: int = 8000,
+    frame_seconds: float = 0.032,
+) -> dict:
+    """Cheap statistics telling voice-only audio from voice over music/game audio.
+
+    ``floor_ratio`` is the 10th/90th percentile frame level: a voice alone
+    pauses between phrases, so its floor sits far below its peaks, while a
+    music or game bed lifts it. With NumPy the spectrum is also measured:
+    ``out_of_band`` is the share of energy outside the 300-3400 Hz speech
+    band and ``flatness`` the median spectral flatness of the louder half of
+    the frames. Both are None without NumPy.
+    """
+    frame_len = max(1, int(sample_rate * frame_seconds))
+    frame_bytes = frame_len * 2
+    levels = array("f")
+    flatness = array("f")
+    band = [0.0, 0.0]
+    if np is not None:
+        window = np.hanning(frame_len).astype(np.float32)
+        freqs = np.fft.rfftfreq(frame_len, 1.0 / sample_rate)
+        in_band = (freqs >= 300) & (freqs <= 3400)
+    carry = b""
+    for block in blocks:
+        data = carry + block
+        usable = len(data) - len(data) % frame_bytes
+        carry = data[usable:]
+        if not usable:
+            continue
+        levels.extend(_rms(data[:usable], frame_len))
+        if np is not None:
+            x = np.frombuffer(data[:usable], dtype="<i2").astype(np.float32) / 32768.0
+            power = np.abs(np.fft.rfft(x.reshape(-1, frame_len) * window, axis=1)) ** 2
+            band[0] += float(power[:, in_band].sum())
+            band[1] += float(power.sum())
+            power += 1e-12
+            flatness.extend(
+                (np.exp(np.log(power).mean(axis=1)) / power.mean(axis=1)).tolist()
+            )
+
+    metrics = {
+        "frames": len(levels),
+        "floor_ratio": None,
+        "out_of_band": None,
+        "flatness": None,
+    }
+    if not levels:
+        return metrics
+    ordered = sorted(levels)
+    peak = _percentile(ordered, 0.9)
+    metrics["floor_ratio"] = (
+        round(_percentile(ordered, 0.1) / peak, 4) if peak > 0 else 0.0
+    )
+    if np is not None and band[1] > 0:
+        metrics["out_of_band"] = round(1.0 - band[0] / band[1], 4)
+        loud = np.asarray(levels) >= _percentile(ordered, 0.5)
+        metrics["flatness"] = round(float(np.median(np.asarray(flatness)[loud])), 4)
+    return metrics
+
+
+def smoothed(levels, window: int) -> array:
+    """Centered moving average of ``levels`` over ``window`` frames."""
+    n = len(levels)
+    prefix = array("d", [0.0])
+    total = 0.0
+    for v in levels:
+        total += v
+        prefix.append(total)
+    half = window // 2
+    out = array("f")
+    for i in range(n):
+        lo = max(0, i - half)
+        hi = min(n, lo + window)
+        out.append((prefix[hi] - prefix[lo]) / (hi - lo))
+    return out
+
+
+def find_split_points(
+    levels,
+    target_seconds: float,
+    search_seconds: float,
+    frame_seconds: float = FRAME_SECONDS,
+    smooth_seconds: float = 0.3,
+) -> list:
+    """Pick cut times (seconds) at the quietest moment before each target length.
+
+    Each cut lies in ``[target - search, target]`` after the previous cut, so
+    no chunk is longer than ``target_seconds``. Ties go to the later frame,
+    keeping chunks close to the target size.
+    """
+    n = len(levels)
+    per = max(1, round(target_seconds / frame_seconds))
+    search = max(1, round(search_seconds / frame_seconds))
+    quiet = smoothed(levels, max(1, round(smooth_seconds / frame_seconds)))
+    cuts = []
+    start = 0
+    while n - start > per:
+        lo = max(start + 1, start + per - search)
+        hi = start + per
+        best = min(range(lo, hi + 1), key=lambda i: (quiet[i], hi - i))
+        cuts.append(round(best * frame_seconds, 3))
+        start = best
+    return cuts
+
+
+def speech_regions(  # noqa: C901
+    levels,
+    frame_seconds: float = FRAME_SECONDS,
+    threshold: Optional[float] = None,
+    min_speech: float = 0.25,
+    min_gap: float = 0.8,
+    pad: float = 0.2,
+) -> list:
+    """Return ``(start, end)`` seconds of voiced audio from frame levels.
+
+    Without an explicit ``threshold`` a frame counts as voiced when it is at
+    least 4x the noise floor (10th percentile level) and above -40 dBFS.
+    Pauses shorter than ``min_gap`` are bridged, blips shorter than
+    ``min_speech`` dropped, and every region is padded by ``pad``.
+    """
+    n = len(levels)
+    if not n:
+        return []
+    if threshold is None:
+        floor = sorted(levels)[int(n * 0.1)]
+        threshold = max(0.01, floor * 4)
+    regions = []
+    start = None
+    for i, v in enumerate(levels):
+        if v >= threshold:
+            if start is None:
+                start = i
+        elif start is not None:
+            regions.append([start, i])
+            start = None
+    if start is not None:
+        regions.append([start, n])
+
+    gap = round(min_gap / frame_seconds)
+    bridged = []
+    for r in regions:
+        if bridged and r[0] - bridged[-1][1] <= gap:
+            bridged[-1][1] = r[1]
+        else:
+            bridged.append(r)
+
+    min_len = round(min_speech / frame_seconds)
+    p = round(pad / frame_seconds)
+    out = []
+    for start, end in bridged:
+        if end - start < min_len:
+            continue
+        s, e = max(0, start - p), min(n, end + p)
+        if out and s <= out[-1][1]:
+            out[-1][1] = e
+        else:
+            out.append([s, e])
+    return [(round(s * frame_seconds, 3), round(e * frame_seconds, 3)) for s, e in out]
+
+
+def write_regions_wav(
+    blocks: Iterable[bytes],
+    regions: list,
+    fileobj,
+    sample_rate: int = SAMPLE_RATE,
+    gap_seconds: float = 0.5,
+) -> list:
+    """Stream only ``regions`` of a PCM stream into a compact mono WAV.
+
+    Regions are separated by ``gap_seconds`` of silence. Returns the time
+    map ``[{"speech_start", "source_start", "duration"}, ...]`` used by
+    ``map_to_source``.
+    """
+    w = wave.open(fileobj, "wb")
+    w.setnchannels(1)
+    w.setsampwidth(2)
+    w.setframerate(sample_rate)
+    spans = [(int(s * sample_rate), int(e * sample_rate)) for s, e in regions]
+    gap = b"\0\0" * int(gap_seconds * sample_rate)
+    mapping = []
+    written = 0
+    ri = 0
+    pos = 0
+    carry = b""
+    for block in blocks:
+        data = carry + block
+        usable = len(data) - len(data) % 2
+        data, carry = data[:usable], data[usable:]
+        end = pos + usable // 2
+        while ri < len(spans) and spans[ri][0] < end:
+            s, e = spans[ri]
+            lo, hi = max(s, pos), min(e, end)
+            if lo == s:
+                if mapping:
+                    w.writeframes(gap)
+                    written += len(gap) // 2
+                mapping.append(
+                    {
+                        "speech_start": written / sample_rate,
+                        "source_start": s / sample_rate,
+                        "duration": (e - s) / sample_rate,
+                    }
+                )
+            if hi > lo:
+                w.writeframes(data[(lo - pos) * 2 : (hi - pos) * 2])
+                written += hi - lo
+            if e > end:
+                break
+            ri += 1
+        pos = end
+    w.close()
+    return mapping
+
+
+def source_mapper(mapping: list) -> Callable[[float], float]:
+    """``map_to_source`` for one ``mapping``, with its breakpoints built once."""
+    if not mapping:
+        return lambda t: t
+    starts = [m["speech_start"] for m in mapping]
+
+    def to_source(t: float) -> float:
+        seg = mapping[max(0, bisect.bisect_right(starts, t) - 1)]
+        offset = min(max(t - seg["speech_start"], 0.0), seg["duration"])
+        return seg["source_start"] + offset
+
+    return to_source
+
+
+def map_to_source(t: float, mapping: list) -> float:
+    """Map a time on the compact speech timeline back to the source audio.
+
+    Use ``source_mapper`` to map many times through the same mapping.
+    """
+    return source_mapper(mapping)(t)
+
+
+def crossfade(tail: bytes, head: bytes, channels: int = 1) -> bytes:
+    """Blend two s16le blocks, fading ``tail`` out while ``head`` fades in.
+
+    The result has the length of the shorter block.
+    """
+    frame_bytes = 2 * channels
+    n = min(len(tail), len(head)) // frame_bytes
+    if not n:
+        return b""
+    if np is not None:
+        a = np.frombuffer(tail[: n * frame_bytes], dtype="<i2").reshape(n, channels)
+        b = np.frombuffer(head[: n * frame_bytes], dtype="<i2").reshape(n, channels)
+        ramp = ((np.arange(n, dtype=np.float32) + 0.5) / n)[:, None]
+        mixed = a * (1.0 - ramp) + b * ramp
+        return np.clip(np.rint(mixed), -32768, 32767).astype("<i2").tobytes()
+    a = array("h")
+    a.frombytes(tail[: n * frame_bytes])
+    b = array("h")
+    b.frombytes(head[: n * frame_bytes])
+    if sys.byteorder == "big":
+        a.byteswap()
+        b.byteswap()
+    out = array("h", bytes(n * frame_bytes))
+    for i in range(n * channels):
+        w = (i // channels + 0.5) / n
+        out[i] = max(-32768, min(32767, round(a[i] * (1.0 - w) + b[i] * w)))
+    if sys.byteorder == "big":
+        out.byteswap()
+    return out.tobytes()
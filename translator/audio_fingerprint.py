@@ -0,0 +1,269 @@
+"""Audio fingerprints for spotting re-uploads and mirrors of the same recording.
+
+A fingerprint is one symbol per 50 ms frame of an 8 kHz decode: 1 when the
+frame is louder than the previous one, 0 when it is quieter and 2 for
+silence. Re-encoding barely moves the loudness envelope, so two uploads of
+the same match share long runs of identical symbols, shifted by however much
+was trimmed from the start.
+
+Every fourth frame contributes a landmark (the next ``KEY_FRAMES`` symbols
+packed into an integer) to a SQLite index. A new video looks up all of its
+landmarks, votes for ``(video, frame lag)`` pairs and verifies the best
+candidates symbol by symbol. A match lets the pipeline derive the video's
+subtitles from the earlier video's, shifted by the lag, instead of
+isolating, transcribing and translating it again.
+"""
+import logging
+import os
+import sqlite3
+import threading
+import zlib
+from collections import Counter
+from typing import Optional
+
+from artifacts import write_json_atomic
+from audio_analysis import decode_pcm, frame_levels
+from srt_io import clamp_cues, read_srt, seconds_to_ms, shift_cues, write_srt
+
+SAMPLE_RATE = 8000
+FRAME_SECONDS = 0.05
+KEY_FRAMES = 20
+INDEX_STEP = 4
+SILENT = 2
+# Frames quieter than this (RMS, full scale = 1) carry no envelope information
+SILENCE_LEVEL = 0.003
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS fingerprints (
+    video_id TEXT PRIMARY KEY,
+    frames INTEGER NOT NULL,
+    symbols BLOB NOT NULL,
+    subtitles_dir TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS landmarks (
+    key INTEGER NOT NULL,
+    video_id TEXT NOT NULL,
+    frame INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS landmarks_key ON landmarks (key);
+"""
+
+
+def fingerprint_levels(levels) -> bytes:
+    """Envelope symbols (0 falling, 1 rising, 2 silent) for frame levels."""
+    symbols = bytearray(len(levels))
+    prev = 0.0
+    for i, level in enumerate(levels):
+        if level < SILENCE_LEVEL:
+            symbols[i] = SILENT
+        else:
+            symbols[i] = 1 if level > prev else 0
+        prev = level
+    return bytes(symbols)
+
+
+def compute_fingerprint(audio_path: str) -> bytes:
+    """Decode ``audio_path`` and return its envelope fingerprint."""
+    levels = frame_levels(
+        decode_pcm(audio_path, sample_rate=SAMPLE_RATE),
+        sample_rate=SAMPLE_RATE,
+        frame_seconds=FRAME_SECONDS,
+    )
+    return fingerprint_levels(levels)
+
+
+def landmarks(symbols: bytes, step: int = 1) -> list:
+    """``(key, frame)`` for every ``step``-th run of ``KEY_FRAMES`` voiced symbols."""
+    out = []
+    for i in range(0, len(symbols) - KEY_FRAMES + 1, step):
+        window = symbols[i : i + KEY_FRAMES]
+        if SILENT in window:
+            continue
+        key = 0
+        for bit in window:
+            key = (key << 1) | bit
+        out.append((key, i))
+    return out
+
+
+def similarity(a: bytes, b: bytes, lag: int) -> tuple:
+    """Agreement of ``b`` with ``a`` shifted so ``b[j]`` meets ``a[j + lag]``.
+
+    Returns ``(share of equal voiced symbols, frames of b covered by a)``.
+    """
+    lo = max(0, -lag)
+    hi = min(len(b), len(a) - lag)
+    same = compared = 0
+    for j in range(lo, hi):
+        x, y = a[j + lag], b[j]
+        if x == SILENT or y == SILENT:
+            continue
+        compared += 1
+        same += x == y
+    return (same / compared if compared else 0.0), max(0, hi - lo)
+
+
+class FingerprintIndex:
+    """SQLite index of video fingerprints and their landmarks."""
+
+    def __init__(self, db_path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=60)
+        self._conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        """Close the underlying database connection."""
+        with self._lock:
+            self._conn.close()
+
+    def get(self, video_id: str) -> Optional[tuple]:
+        """Return ``(symbols, subtitles_dir)`` of an indexed video, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT symbols, subtitles_dir FROM fingerprints WHERE video_id = ?",
+                (video_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        return zlib.decompress(row[0]), row[1]
+
+    def add(self, video_id: str, symbols: bytes, subtitles_dir: str) -> None:
+        """Store (or replace) the fingerprint of ``video_id``."""
+        with self._lock:
+            self._conn.execute("DELETE FROM landmarks WHERE video_id = ?", (video_id,))
+            self._conn.execute(
+                "INSERT OR REPLACE INTO fingerprints VALUES (?, ?, ?, ?)",
+                (
+                    video_id,
+                    len(symbols),
+                    zlib.compress(symbols),
+                    os.path.abspath(subtitles_dir),
+                ),
+            )
+            self._conn.executemany(
+                "INSERT INTO landmarks VALUES (?, ?, ?)",
+                [(k, video_id, f) for k, f in landmarks(symbols, INDEX_STEP)],
+            )
+            self._conn.commit()
+
+    def find_match(
+        self,
+        video_id: str,
+        symbols: bytes,
+        min_votes: int = 5,
+        min_similarity: float = 0.8,
+        min_coverage: float = 0.9,
+    ) -> Optional[dict]:
+        """Find an indexed video that contains the audio of ``symbols``.
+
+        The match must agree on ``min_similarity`` of the voiced frames and
+        cover ``min_coverage`` of the new video. Returns ``{"source",
+        "offset", "similarity"}`` where ``offset`` is how many seconds into
+        the source the new video starts (negative if it starts earlier).
+        """
+        keys = {}
+        for key, frame in landmarks(symbols):
+            keys.setdefault(key, []).append(frame)
+        votes = Counter()
+        key_list = list(keys)
+        with self._lock:
+            for i in range(0, len(key_list), 500):
+                batch = key_list[i : i + 500]
+                rows = self._conn.execute(
+                    "SELECT key, video_id, frame FROM landmarks WHERE video_id != ? "
+                    f"AND key IN ({','.join('?' * len(batch))})",
+                    (video_id, *batch),
+                )
+                for key, other, frame in rows:
+                    for own in keys[key]:
+                        votes[(other, frame - own)] += 1
+        for (other, lag), count in votes.most_common(3):
+            if count < min_votes:
+                break
+            indexed = self.get(other)
+            if indexed is None:
+                continue
+            score, covered = similarity(indexed[0], symbols, lag)
+            if score >= min_similarity and covered >= min_coverage * len(symbols):
+                return {
+                    "source": other,
+                    "offset": round(lag * FRAME_SECONDS, 3),
+                    "similarity": round(score, 4),
+                }
+        return None
+
+
+def shift_subtitles(src: str, dest: str, offset: float, duration: float) -> None:
+    """Write ``src`` to ``dest`` with cues moved ``offset`` seconds earlier.
+
+    Cues that end up entirely outside ``[0, duration]`` are dropped.
+    """
+    cues = shift_cues(read_srt(src), -seconds_to_ms(offset))
+    write_srt(dest, clamp_cues(cues, 0, seconds_to_ms(duration)), renumber=True)
+
+
+def run_fingerprint_audio(
+    audio_path: str,
+    video_id: str,
+    subtitles_dir: str,
+    cache_dir: str,
+    index_path: Optional[str] = None,
+) -> bool:
+    """Fingerprint a downloaded video and reuse subtitles of an earlier upload.
+
+    When the audio matches an indexed video whose Korean and English
+    subtitles exist, they are shifted onto this video as ``kr_<vid>.srt`` and
+    ``en_<vid>.srt`` and ``<cache_dir>/duplicate_<vid>.json`` records the
+    match. Videos that already have both subtitles, or match nothing, are
+    only added to the index.
+    """
+    try:
+        if not os.path.exists(audio_path):
+            logging.error(f"Audio not found for fingerprinting: {audio_path}")
+            return False
+        index = FingerprintIndex(
+            index_path or os.path.join(cache_dir, "fingerprints.sqlite")
+        )
+        targets = {
+            lang: os.path.join(subtitles_dir, f"{lang}_{video_id}.srt")
+            for lang in ("kr", "en")
+        }
+        try:
+            symbols = compute_fingerprint(audio_path)
+            done = all(os.path.exists(p) for p in targets.values())
+            match = None if done else index.find_match(video_id, symbols)
+            index.add(video_id, symbols, subtitles_dir)
+            if match is None:
+                logging.info(f"No earlier upload to reuse for {video_id}")
+                return True
+            source_dir = index.get(match["source"])[1]
+        finally:
+            index.close()
+
+        logging.info(
+            f"{video_id} matches {match['source']} at {match['offset']:+.2f}s "
+            f"(similarity {match['similarity']:.2f})"
+        )
+        sources = {
+            lang: os.path.join(source_dir, f"{lang}_{match['source']}.srt")
+            for lang in ("kr", "en")
+        }
+        match["derived"] = all(os.path.exists(p) for p in sources.values())
+        if match["derived"]:
+            duration = len(symbols) * FRAME_SECONDS
+            for lang, src in sources.items():
+                shift_subtitles(src, targets[lang], match["offset"], duration)
+            logging.info(f"Derived subtitles for {video_id} from {match['source']}")
+        else:
+            logging.info(
+                f"Subtitles of {match['source']} are not ready; processing {video_id}"
+            )
+        write_json_atomic(
+            os.path.join(cache_dir, f"duplicate_{video_id}.json"), match, indent=2
+        )
+        return True
+    except Exception as e:
+        logging.error(f"Fingerprinting failed for {audio_path}: {e}")
+        return False
@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""Offline translation of titles and subtitle chunks through the OpenAI Batch API.
+
+Collects every uncached title and subtitle-chunk prompt across a run's video
+list into JSONL batch jobs (half price, no RPM limit), polls until they
+finish and writes the replies into the regular ``title_<vid>.json`` caches
+and the chunk translation cache (``translation_cache``). A following pipeline run with
+``translate_title``/``translate_subtitles`` then only reads caches.
+
+Submitted batch ids are kept in ``<cache_dir>/batch_translate.json`` so an
+interrupted run resumes polling instead of paying for the jobs twice.
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from typing import Optional
+
+from dotenv import load_dotenv
+from openai import OpenAI
+
+import translation_cache
+from artifacts import write_json_atomic
+from run_paths import resolve_run_dirs
+from translate_subtitles import (
+    build_chunk_request,
+    build_prompt,
+    chunk_cache_key,
+    chunk_subtitles,
+    parse_srt_file,
+)
+from translate_title import build_title_request, save_title_cache, sha1
+
+ENDPOINT = "/v1/chat/completions"
+# Batch API limits a single input file to 50,000 requests
+MAX_REQUESTS_PER_BATCH = 50000
+_FINAL_STATUSES = ("completed", "failed", "expired", "cancelled")
+
+
+def collect_requests(
+    videos: list,
+    metadata_dir: str,
+    subtitles_dir: str,
+    cache_dir: str,
+    slang_file: str,
+    model: str,
+    chunk_size: int = 50,
+    overlap: int = 5,
+) -> tuple:
+    """Return ``(requests, targets)`` for every uncached title and chunk.
+
+    ``requests`` are Batch API JSONL lines; ``targets`` maps each
+    ``custom_id`` to the cache entry its reply belongs in.
+    """
+    with open(slang_file, encoding="utf-8") as f:
+        slang_text = f.read()
+    requests, targets = [], {}
+    cache = translation_cache.open_cache(cache_dir)
+    queued = set()
+
+    def add(custom_id: str, body: dict, target: dict):
+        requests.append(
+            {"custom_id": custom_id, "method": "POST", "url": ENDPOINT, "body": body}
+        )
+        targets[custom_id] = target
+
+    for v in videos:
+        vid = v["v"]
+        meta_path = os.path.join(metadata_dir, f"{vid}.json")
+        if os.path.exists(meta_path):
+            with open(meta_path, encoding="utf-8") as f:
+                title = json.load(f).get("title") or ""
+            cache_path = os.path.join(cache_dir, f"title_{vid}.json")
+            cached = {}
+            if os.path.exists(cache_path):
+                with open(cache_path, encoding="utf-8") as f:
+                    cached = json.load(f)
+            if title and not (
+                cached.get("source_hash") == sha1(title) and cached.get("title_en")
+            ):
+                add(
+                    f"title:{vid}",
+                    build_title_request(title, model),
+                    {
+                        "kind": "title",
+                        "cache": cache_path,
+                        "video_id": vid,
+                        "source_hash": sha1(title),
+                    },
+                )
+
+        kr_srt = os.path.join(subtitles_dir, f"kr_{vid}.srt")
+        if not os.path.exists(kr_srt):
+            continue
+        chunks = chunk_subtitles(parse_srt_file(kr_srt), chunk_size, overlap)
+        for idx, chunk in enumerate(chunks):
+            key = chunk_cache_key(chunk, model, slang_text)
+            # The same chunk may already be queued for another video
+            if key in cache or key in queued:
+                continue
+            queued.add(key)
+            add(
+                f"chunk:{vid}:{idx}",
+                build_chunk_request(build_prompt(chunk, slang_text), model),
+                {
+                    "kind": "chunk",
+                    "cache_dir": cache_dir,
+                    "key": key,
+                    "origin_ms": chunk[0].start,
+                },
+            )
+    return requests, targets
+
+
+def submit_batches(
+    client, requests: list, work_dir: str, on_submitted=None
+) -> list:
+    """Upload ``requests`` as one or more batch jobs and return their ids.
+
+    ``on_submitted(batch_ids)`` is called after every created batch, so the
+    ids of paid jobs can be saved before a later submission fails.
+    """
+    os.makedirs(work_dir, exist_ok=True)
+    batch_ids = []
+    for start in range(0, len(requests), MAX_REQUESTS_PER_BATCH):
+        part = requests[start : start + MAX_REQUESTS_PER_BATCH]
+        path = os.path.join(work_dir, f"batch_{int(time.time())}_{start}.jsonl")
+        with open(path, "w", encoding="utf-8") as f:
+            for req in part:
+                f.write(json.dumps(req, ensure_ascii=False) + "\n")
+        with open(path, "rb") as f:
+            uploaded = client.files.create(file=f, purpose="batch")
+        batch = client.batches.create(
+            input_file_id=uploaded.id, endpoint=ENDPOINT, completion_window="24h"
+        )
+        logging.info(f"Submitted batch {batch.id} with {len(part)} requests")
+        batch_ids.append(batch.id)
+        if on_submitted is not None:
+            on_submitted(batch_ids)
+    return batch_ids
+
+
+def wait_for_batch(client, batch_id: str, poll_interval: float = 60.0):
+    """Poll a batch until it reaches a final status and return it."""
+    while True:
+        batch = client.batches.retrieve(batch_id)
+        counts = getattr(batch, "request_counts", None)
+        logging.info(
+            f"Batch {batch_id}: {batch.status}"
+            + (f" ({counts.completed}/{counts.total} done)" if counts else "")
+        )
+        if batch.status in _FINAL_STATUSES:
+            return batch
+        time.sleep(poll_interval)
+
+
+def apply_results(text: str, targets: dict) -> int:
+    """Write successful batch replies in ``text`` into their caches.
+
+    Returns the number of cache entries written.
+    """
+    written = 0
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        row = json.loads(line)
+        target = targets.get(row.get("custom_id"))
+        response = row.get("response") or {}
+        # Chunks of a batch submitted before the translation cache have no
+        # key; they are collected again by the next run
+        if target is None or (target["kind"] != "title" and "key" not in target):
+            continue
+        if row.get("error") or response.get("status_code") != 200:
+            logging.warning(
+                f"Batch request {row.get('custom_id')} failed: "
+                f"{row.get('error') or response.get('body')}"
+            )
+            continue
+        content = response["body"]["choices"][0]["message"]["content"] or ""
+        content = content.strip()
+        if target["kind"] == "title":
+            save_title_cache(
+                target["cache"], target["video_id"], content, target["source_hash"]
+            )
+        else:
+            translation_cache.open_cache(target["cache_dir"]).put(
+                target["key"], content, target["origin_ms"]
+            )
+        written += 1
+    return written
+
+
+def run_batch_translate(
+    videos: list,
+    metadata_dir: str,
+    subtitles_dir: str,
+    cache_dir: str,
+    slang_file: str,
+    model: str = "gpt-4.1-mini",
+    chunk_size: int = 50,
+    overlap: int = 5,
+    poll_interval: float = 60.0,
+    client=None,
+    cache_max_bytes: Optional[int] = None,
+) -> bool:
+    """Translate all uncached titles and chunks for ``videos`` via batch jobs.
+
+    ``cache_max_bytes`` bounds the chunk translation cache as in
+    ``translate_subtitles.run_translate_subtitles``.
+    """
+    try:
+        translation_cache.open_cache(cache_dir, cache_max_bytes)
+        if client is None:
+            load_dotenv()
+            client = OpenAI()
+        state_path = os.path.join(cache_dir, "batch_translate.json")
+        if os.path.exists(state_path):
+            with open(state_path, encoding="utf-8") as f:
+                state = json.load(f)
+            logging.info(f"Resuming batches {', '.join(state['batch_ids'])}")
+        else:
+            requests, targets = collect_requests(
+                videos,
+                metadata_dir,
+                subtitles_dir,
+                cache_dir,
+                slang_file,
+                model,
+                chunk_size,
+                overlap,
+            )
+            if not requests:
+                logging.info("Nothing to translate; all titles and chunks are cached")
+                return True
+            state = {"batch_ids": [], "targets": targets}
+
+            def save_state(batch_ids: list) -> None:
+                state["batch_ids"] = list(batch_ids)
+                write_json_atomic(state_path, state, ensure_ascii=False)
+
+            submit_batches(
+                client, requests, os.path.join(cache_dir, "batches"), save_state
+            )
+
+        ok = True
+        for batch_id in state["batch_ids"]:
+            batch = wait_for_batch(client, batch_id, poll_interval)
+            if batch.status != "completed":
+                logging.error(f"Batch {batch_id} ended with status {batch.status}")
+                ok = False
+            if batch.output_file_id:
+                text = client.files.content(batch.output_file_id).text
+                n = apply_results(text, state["targets"])
+                logging.info(f"Batch {batch_id}: cached {n} translations")
+            if batch.error_file_id:
+                text = client.files.content(batch.error_file_id).text
+                apply_results(text, state["targets"])
+        # Finished batches are never resumed; anything that failed is
+        # collected again (uncached) by the next run.
+        os.remove(state_path)
+        return ok
+    except Exception as e:
+        logging.error(f"Batch translation failed: {e}")
+        return False
+
+
+def main():
+    """Run batch translation for the videos of a pipeline config."""
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s"
+    )
+    p = argparse.ArgumentParser(
+        description="Translate uncached titles and subtitle chunks via the OpenAI Batch API"
+    )
+    p.add_argument("--config", required=True, help="Path to pipeline-config.json")
+    p.add_argument(
+        "--poll-interval",
+        type=float,
+        default=60.0,
+        help="Seconds between batch status checks",
+    )
+    args = p.parse_args()
+
+    config = json.load(open(args.config, encoding="utf-8"))
+    dirs = resolve_run_dirs(config)
+    videos = json.load(open(dirs["video_list_file"], encoding="utf-8"))
+    ok = run_batch_translate(
+        videos,
+        metadata_dir=dirs["video_metadata_dir"],
+        subtitles_dir=dirs["subtitles_dir"],
+        cache_dir=dirs["cache_dir"],
+        slang_file=dirs["slang_file"],
+        model=config.get("translation_model", "gpt-4.1-mini"),
+        chunk_size=config.get("translation_chunk_size", 50),
+        overlap=config.get("translation_overlap", 5),
+        poll_interval=args.poll_interval,
+        cache_max_bytes=translation_cache.config_max_bytes(config),
+    )
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""Compare srt_io with the regex parser it replaced on a synthetic SRT file.
+
+Usage: python bench_srt_io.py [--cues 10000] [--repeat 5]
+
+``regex`` is the per-module pattern used before srt_io, which only yields
+timestamp strings; ``regex+ms`` adds the string-to-milliseconds conversion
+every stage then did per cue. ``srt_io`` builds the full cue list and
+``streamed`` consumes the cues one at a time.
+"""
+import argparse
+import os
+import re
+import tempfile
+import time
+import tracemalloc
+
+import srt_io
+
+_LEGACY = re.compile(
+    r"(\d+)\s+(\d{2}:\d{2}:\d{2},\d{3}) --> (\d{2}:\d{2}:\d{2},\d{3})"
+    r"\s+([\s\S]*?)(?=\n\n|\Z)",
+    re.MULTILINE,
+)
+
+
+def _legacy_parse(path: str) -> int:
+    with open(path, encoding="utf-8-sig") as f:
+        content = f.read()
+    cues = [
+        (int(m.group(1)), m.group(2), m.group(3), m.group(4).strip().split("\n"))
+        for m in _LEGACY.finditer(content)
+    ]
+    return len(cues)
+
+
+def _legacy_ms(ts: str) -> int:
+    # transcribe_audio._time_to_seconds, scaled to milliseconds
+    h, m, rest = ts.split(":")
+    s, ms = rest.split(",")
+    return round((int(h) * 3600 + int(m) * 60 + int(s) + int(ms) / 1000) * 1000)
+
+
+def _legacy_parse_ms(path: str) -> int:
+    with open(path, encoding="utf-8-sig") as f:
+        content = f.read()
+    cues = [
+        (
+            int(m.group(1)),
+            _legacy_ms(m.group(2)),
+            _legacy_ms(m.group(3)),
+            m.group(4).strip().split("\n"),
+        )
+        for m in _LEGACY.finditer(content)
+    ]
+    return len(cues)
+
+
+def _read_all(path: str) -> int:
+    return len(srt_io.read_srt(path))
+
+
+def _streamed(path: str) -> int:
+    return sum(1 for _ in srt_io.iter_srt_file(path))
+
+
+def _make_srt(path: str, cues: int) -> None:
+    srt_io.write_srt(
+        path,
+        (
+            srt_io.Cue(i + 1, i * 2000, i * 2000 + 1500, [f"자막 {i}", "두 번째 줄"])
+            for i in range(cues)
+        ),
+    )
+
+
+def _measure(fn, path: str, repeat: int) -> tuple:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        count = fn(path)
+        best = min(best, time.perf_counter() - t0)
+    tracemalloc.start()
+    fn(path)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak, count
+
+
+def main():
+    """Print parse time and peak traced memory of each variant."""
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    p.add_argument("--cues", type=int, default=10000, help="Cues in the test file")
+    p.add_argument("--repeat", type=int, default=5, help="Timed runs per variant")
+    args = p.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.srt")
+        _make_srt(path, args.cues)
+        for name, fn in (
+            ("regex", _legacy_parse),
+            ("regex+ms", _legacy_parse_ms),
+            ("srt_io", _read_all),
+            ("streamed", _streamed),
+        ):
+            seconds, peak, count = _measure(fn, path, args.repeat)
+            print(  # noqa: T201
+                f"{name:>8}: {count} cues in {seconds * 1000:.1f} ms, "
+                f"peak {peak / 1024:.0f} KiB"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -3,27 +3,8 @@ import logging  # Added for logging
 import os
 from typing import Optional
 
-
-def read_details(metadata_dir: str, vid: str) -> dict:
-    """Read cached video details JSON for a given video ID.
-
-    Returns an empty dict if the file does not exist.
-    """
-    path = os.path.join(metadata_dir, f"{vid}.json")
-    if os.path.exists(path):
-        return json.load(open(path, encoding="utf-8"))
-    return {}
-
-
-def read_title_cache(cache_dir: str, vid: str) -> dict:
-    """Read cached English title JSON for a given video ID.
-
-    Returns an empty dict if the file does not exist.
-    """
-    path = os.path.join(cache_dir, f"title_{vid}.json")
-    if os.path.exists(path):
-        return json.load(open(path, encoding="utf-8"))
-    return {}
+import metadata_index
+from artifacts import write_json_atomic
 
 
 def run_build_videos_json(
@@ -49,13 +30,17 @@ def run_build_videos_json(
             return False
 
         items = json.load(open(video_list_file, encoding="utf-8"))
+        # One indexed lookup per source instead of two file reads per video
+        ids = [item["v"] for item in items if item.get("v")]
+        details_by_id = metadata_index.read_metadata(metadata_dir, ids)
+        titles_by_id = metadata_index.read_titles(cache_dir, ids)
         enriched = []
         for item in items:
             vid = item.get("v")
             if not vid:
                 continue
-            details = read_details(metadata_dir, vid)
-            title_cache = read_title_cache(cache_dir, vid)
+            details = details_by_id.get(vid, {})
+            title_cache = titles_by_id.get(vid, {})
             # derive fields
             creator = (
                 details.get("uploader")
@@ -79,8 +64,7 @@ def run_build_videos_json(
             enriched.append(merged)
 
         os.makedirs(os.path.dirname(output), exist_ok=True)
-        with open(output, "w", encoding="utf-8") as f:
-            json.dump(enriched, f, ensure_ascii=False, indent=2)
+        write_json_atomic(output, enriched, ensure_ascii=False, indent=2)
         logging.info(f"Videos JSON built and saved to {output}")
         return True
     except Exception as e:
@@ -1,8 +1,135 @@
 import logging  # Keep logging for internal use
 import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional
+from urllib.parse import urlparse
 
 import yt_dlp
 
+# "mp3" transcodes to 192 kbps mp3, "native" keeps the downloaded stream as is,
+# "wav"/"flac" transcode straight to the 16 kHz mono input Whisper uses
+AUDIO_FORMATS = ("mp3", "native", "wav", "flac")
+# Containers a native download can arrive in, in lookup order
+NATIVE_EXTS = ("m4a", "webm", "opus", "ogg", "aac", "mp4")
+# Further attempts per format after the host answered HTTP 429
+RATE_LIMIT_RETRIES = 3
+
+
+class HostThrottle:
+    """Per-host cap on concurrent downloads that adapts to HTTP 429 answers.
+
+    Every host starts with ``max_concurrent`` slots. A 429 halves its slots
+    and pauses new requests to it for a cool-down that doubles while the
+    host keeps refusing; each later success gives one slot back and resets
+    the cool-down.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = 4,
+        base_backoff: float = 30.0,
+        max_backoff: float = 600.0,
+    ):
+        self._cond = threading.Condition()
+        self._hosts = {}
+        self.configure(max_concurrent, base_backoff, max_backoff)
+
+    def configure(
+        self,
+        max_concurrent: Optional[int] = None,
+        base_backoff: Optional[float] = None,
+        max_backoff: Optional[float] = None,
+    ) -> None:
+        """Change the limits; ``None`` keeps the current value."""
+        with self._cond:
+            if max_concurrent is not None:
+                self.max_concurrent = max(1, int(max_concurrent))
+                for state in self._hosts.values():
+                    state["limit"] = min(state["limit"], self.max_concurrent)
+            if base_backoff is not None:
+                self.base_backoff = float(base_backoff)
+            if max_backoff is not None:
+                self.max_backoff = float(max_backoff)
+            self._cond.notify_all()
+
+    def _state(self, host: str) -> dict:
+        state = {"limit": self.max_concurrent, "active": 0}
+        state.update(resume_at=0.0, backoff=0.0)
+        return self._hosts.setdefault(host, state)
+
+    def limit(self, host: str) -> int:
+        """Return the number of concurrent requests allowed to ``host``."""
+        with self._cond:
+            return self._state(host)["limit"]
+
+    @contextmanager
+    def slot(self, host: str):
+        """Hold one of ``host``'s slots, waiting out any cool-down first."""
+        with self._cond:
+            state = self._state(host)
+            while True:
+                wait = state["resume_at"] - time.monotonic()
+                if wait <= 0 and state["active"] < state["limit"]:
+                    break
+                self._cond.wait(timeout=wait if wait > 0 else None)
+            state["active"] += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                state["active"] -= 1
+                self._cond.notify_all()
+
+    def success(self, host: str) -> None:
+        """Record a completed request: grow the limit back by one slot."""
+        with self._cond:
+            state = self._state(host)
+            state["backoff"] = 0.0
+            if state["limit"] < self.max_concurrent:
+                state["limit"] += 1
+                self._cond.notify_all()
+
+    def throttled(self, host: str) -> float:
+        """Record a 429 from ``host``; returns the seconds until it is retried."""
+        with self._cond:
+            state = self._state(host)
+            now = time.monotonic()
+            if now < state["resume_at"]:
+                # Another worker already backed off for this burst
+                return state["resume_at"] - now
+            state["limit"] = max(1, state["limit"] // 2)
+            state["backoff"] = min(
+                self.max_backoff, state["backoff"] * 2 or self.base_backoff
+            )
+            state["resume_at"] = now + state["backoff"]
+            return state["backoff"]
+
+
+# Shared by every download of the process
+host_throttle = HostThrottle()
+
+
+def _is_rate_limited(error: Exception) -> bool:
+    text = str(error)
+    return "HTTP Error 429" in text or "Too Many Requests" in text
+
+
+def audio_file(output_dir: str, video_id: str, audio_format: str = "mp3") -> str:
+    """Path of the audio ``run_download_audio`` saves for ``audio_format``.
+
+    For ``native`` this is the first existing ``<video_id>.<ext>`` among
+    ``NATIVE_EXTS`` (``.m4a`` if none has been downloaded yet).
+    """
+    if audio_format != "native":
+        return os.path.join(output_dir, f"{video_id}.{audio_format}")
+    for ext in NATIVE_EXTS:
+        path = os.path.join(output_dir, f"{video_id}.{ext}")
+        if os.path.exists(path):
+            return path
+    return os.path.join(output_dir, f"{video_id}.{NATIVE_EXTS[0]}")
+
 
 def _apply_cookie_options(opts: dict) -> None:
     """Augment yt-dlp options with cookies if configured via env.
@@ -64,8 +191,10 @@ def _pick_best_audio_format(info: dict) -> str | None:
     return best_id
 
 
-def _base_ydlp_opts(output_dir: str, video_id: str) -> dict:
-    return {
+def _base_ydlp_opts(
+    output_dir: str, video_id: str, audio_format: str = "mp3", fragments: int = 1
+) -> dict:
+    opts = {
         "outtmpl": os.path.join(output_dir, f"{video_id}.%(ext)s"),
         "postprocessors": [
             {
@@ -85,37 +214,96 @@ def _base_ydlp_opts(output_dir: str, video_id: str) -> dict:
                 "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Mobile Safari/537.36"
             )
         },
-        # Avoid parallel fragment downloads which sometimes trigger throttling
-        "concurrent_fragment_downloads": 1,
+        # Parallel fragment downloads sometimes trigger throttling; 1 by default
+        "concurrent_fragment_downloads": fragments,
     }
+    if audio_format == "native":
+        opts["postprocessors"] = []
+    elif audio_format in ("wav", "flac"):
+        opts["postprocessors"] = [
+            {"key": "FFmpegExtractAudio", "preferredcodec": audio_format}
+        ]
+        opts["postprocessor_args"] = {"extractaudio": ["-ar", "16000", "-ac", "1"]}
+    return opts
+
 
+def _unextracted_source(output_dir: str, video_id: str) -> Optional[str]:
+    """Return a downloaded source stream still waiting for mp3 extraction, if any."""
+    for ext in ("m4a", "webm", "opus", "mp4", "aac"):
+        path = os.path.join(output_dir, f"{video_id}.{ext}")
+        if os.path.exists(path):
+            return path
+    return None
 
-def run_download_audio(url: str, video_id: str, output_dir: str = "audio") -> bool:
+
+def run_download_audio(  # noqa: C901
+    url: str,
+    video_id: str,
+    output_dir: str = "audio",
+    info: Optional[dict] = None,
+    audio_format: str = "mp3",
+    fragments: int = 1,
+    throttle: Optional[HostThrottle] = None,
+) -> bool:
     """Download audio from a URL and save it to the output directory.
 
+    ``info`` is a yt-dlp info dict already fetched for this video (e.g. the
+    saved metadata); its format list replaces the extra probe request.
+    ``audio_format`` is one of ``AUDIO_FORMATS``; ``audio_file`` gives the
+    resulting path. ``fragments`` is yt-dlp's fragment concurrency.
+
+    Requests go through ``throttle`` (the shared ``host_throttle`` by
+    default): a 429 from the host shrinks how many downloads run against it
+    at once and retries the download after a growing cool-down.
+
     Supports yt-dlp cookies via env for painless auth when YouTube blocks unauthenticated requests:
     - Set `YTDLP_COOKIES=/path/to/cookies.txt` (exported from your browser)
     - Or set `YTDLP_COOKIES_BROWSER=chrome` (or firefox, brave, edge) for auto pickup
     """
+    if audio_format not in AUDIO_FORMATS:
+        logging.error(f"Unknown audio format: {audio_format}")
+        return False
+    throttle = throttle or host_throttle
+    host = urlparse(url).hostname or url
     os.makedirs(output_dir, exist_ok=True)
     # Final expected path after extraction
-    final_path = os.path.join(output_dir, f"{video_id}.mp3")
+    final_path = audio_file(output_dir, video_id, audio_format)
     if os.path.exists(final_path):
-        logging.info(f"{final_path} already exists, skipping download")
-        return True
+        # Native downloads are renamed into place whole; nothing to extract
+        leftover = (
+            None
+            if audio_format == "native"
+            else _unextracted_source(output_dir, video_id)
+        )
+        if not leftover:
+            logging.info(f"{final_path} already exists, skipping download")
+            return True
+        # yt-dlp deletes the source stream only after ffmpeg finished the mp3,
+        # so a surviving source means the mp3 was cut off mid-extraction.
+        logging.warning(
+            "Discarding partial %s (source %s still present)", final_path, leftover
+        )
+        os.remove(final_path)
+
+    # Formats from saved metadata make the probe unnecessary
+    cached_info = info if isinstance(info, dict) and info.get("formats") else None
 
     # Adaptive probing and selection
-    def attempt(android_client: bool) -> tuple[bool, dict | None]:
-        opts = _base_ydlp_opts(output_dir, video_id)
+    def attempt(android_client: bool) -> tuple[bool, dict | None]:  # noqa: C901
+        opts = _base_ydlp_opts(output_dir, video_id, audio_format, fragments)
         if android_client:
             opts["extractor_args"] = {"youtube": {"player_client": ["android"]}}
         _apply_cookie_options(opts)
-        info: dict | None = None
-        try:
-            ydl_probe = yt_dlp.YoutubeDL({k: v for k, v in opts.items() if k != "postprocessors"})
-            info = ydl_probe.extract_info(url, download=False)
-        except Exception as ex:
-            logging.warning("yt-dlp probe failed (%s); continuing with fallback selection", ex)
+        info: dict | None = cached_info
+        if info is None:
+            try:
+                ydl_probe = yt_dlp.YoutubeDL({k: v for k, v in opts.items() if k != "postprocessors"})
+                with throttle.slot(host):
+                    info = ydl_probe.extract_info(url, download=False)
+            except Exception as ex:
+                if _is_rate_limited(ex):
+                    throttle.throttled(host)
+                logging.warning("yt-dlp probe failed (%s); continuing with fallback selection", ex)
         # Choose format
         fmt = None
         if isinstance(info, dict):
@@ -132,12 +320,32 @@ def run_download_audio(url: str, video_id: str, output_dir: str = "audio") -> bo
                 opts_dl = dict(opts)
                 opts_dl["format"] = selector
                 ydl = yt_dlp.YoutubeDL(opts_dl)
-                ydl.download([url])
+                retries = 0
+                while True:
+                    try:
+                        with throttle.slot(host):
+                            ydl.download([url])
+                    except Exception as e:
+                        if not _is_rate_limited(e) or retries >= RATE_LIMIT_RETRIES:
+                            raise
+                        retries += 1
+                        pause = throttle.throttled(host)
+                        logging.warning(
+                            "%s is rate limiting (%d slot(s) left); "
+                            "retrying %s in %.0fs",
+                            host,
+                            throttle.limit(host),
+                            video_id,
+                            pause,
+                        )
+                        continue
+                    throttle.success(host)
+                    break
                 if os.path.exists(final_path):
                     logging.info(f"Downloaded audio to {final_path} (format {selector})")
                     return True, info
-                # In rare cases, file may have different name; still treat as success if any mp3 for id exists
-                guessed = os.path.join(output_dir, f"{video_id}.mp3")
+                # A native download's container is only known afterwards
+                guessed = audio_file(output_dir, video_id, audio_format)
                 if os.path.exists(guessed):
                     logging.info(f"Downloaded audio to {guessed} (format {selector})")
                     return True, info
@@ -1,38 +1,232 @@
+#!/usr/bin/env python3
+"""Fetch YouTube metadata into compact per-video records.
+
+``<metadata_dir>/<vid>.json`` keeps only the fields the pipeline reads
+(``COMPACT_FIELDS`` plus the audio-only formats ``download_audio`` picks
+from) instead of the full ``extract_info`` dump with every format,
+thumbnail and caption URL. More fields can be kept with ``extra_fields``;
+the raw dump can be retained as ``<vid>.info.json.gz``.
+"""
+import argparse
+import gzip
 import json
 import logging
 import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 import yt_dlp
 
+import metadata_index
+from artifacts import atomic_write, write_json_atomic
+from download_audio import _apply_cookie_options
 
-def run_fetch_video_metadata(video_id: str, output_dir: str) -> bool:
-    """Fetch video metadata from YouTube and save it to a JSON file."""
-    output_file = os.path.join(output_dir, f"{video_id}.json")
+COMPACT_FIELDS = (
+    "id",
+    "title",
+    "uploader",
+    "channel",
+    "creator",
+    "upload_date",
+    "duration",
+    "webpage_url",
+)
+_FORMAT_FIELDS = ("format_id", "ext", "vcodec", "acodec", "abr", "tbr")
+RAW_SUFFIX = ".info.json.gz"
+
+
+def compact_info(info: dict, extra_fields: tuple = ()) -> dict:
+    """Reduce a yt-dlp info dict to the fields the pipeline uses."""
+    record = {
+        k: info[k]
+        for k in (*COMPACT_FIELDS, *extra_fields)
+        if info.get(k) is not None
+    }
+    formats = [
+        {k: f[k] for k in _FORMAT_FIELDS if f.get(k) is not None}
+        for f in info.get("formats") or []
+        if f.get("vcodec") in (None, "none")
+    ]
+    if formats:
+        record["formats"] = formats
+    return record
+
+
+def save_raw_info(path: str, info: dict) -> None:
+    """Atomically write the full info dict as gzip-compressed JSON."""
+    with atomic_write(path, "wb") as f:
+        with gzip.GzipFile(fileobj=f, mode="wb") as gz:
+            gz.write(json.dumps(info, ensure_ascii=False).encode("utf-8"))
 
-    if os.path.exists(output_file):
-        logging.info(f"Metadata for {video_id} already exists. Skipping.")
-        return True
 
-    ydl_opts = {
+def _ydl_opts() -> dict:
+    opts = {
         "quiet": True,
         "no_warnings": True,
         "skip_download": True,
     }
+    _apply_cookie_options(opts)
+    return opts
 
-    try:
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(
-                f"https://www.youtube.com/watch?v={video_id}", download=False
-            )
 
-            # Ensure the output directory exists
-            os.makedirs(output_dir, exist_ok=True)
+def _fetch(
+    ydl,
+    video_id: str,
+    output_dir: str,
+    output_file: str,
+    extra_fields: tuple,
+    keep_raw: bool,
+) -> None:
+    info = ydl.extract_info(
+        f"https://www.youtube.com/watch?v={video_id}", download=False
+    )
+
+    # Ensure the output directory exists
+    os.makedirs(output_dir, exist_ok=True)
+
+    if keep_raw:
+        save_raw_info(os.path.join(output_dir, f"{video_id}{RAW_SUFFIX}"), info)
+    record = compact_info(info, extra_fields)
+    write_json_atomic(output_file, record)
+    metadata_index.record(metadata_index.METADATA, output_dir, video_id, record)
+
+    logging.info(f"Successfully fetched and saved metadata for {video_id}")
+
 
-            with open(output_file, "w") as f:
-                json.dump(info, f)
+def run_fetch_video_metadata(
+    video_id: str,
+    output_dir: str,
+    ydl=None,
+    extra_fields: tuple = (),
+    keep_raw: bool = False,
+) -> bool:
+    """Fetch video metadata from YouTube and save it to a JSON file.
+
+    ``ydl`` reuses an open ``yt_dlp.YoutubeDL`` session instead of creating one.
+    """
+    output_file = os.path.join(output_dir, f"{video_id}.json")
+
+    if os.path.exists(output_file):
+        logging.info(f"Metadata for {video_id} already exists. Skipping.")
+        return True
 
-            logging.info(f"Successfully fetched and saved metadata for {video_id}")
-            return True
+    try:
+        args = (video_id, output_dir, output_file, tuple(extra_fields), keep_raw)
+        if ydl is not None:
+            _fetch(ydl, *args)
+        else:
+            with yt_dlp.YoutubeDL(_ydl_opts()) as session:
+                _fetch(session, *args)
+        return True
     except Exception as e:
         logging.error(f"Error fetching metadata for {video_id}: {e}")
         return False
+
+
+def run_fetch_video_metadata_bulk(
+    video_ids: list,
+    output_dir: str,
+    max_workers: int = 4,
+    extra_fields: tuple = (),
+    keep_raw: bool = False,
+) -> dict:
+    """Fetch metadata for many videos concurrently; return ``{video_id: ok}``.
+
+    Each worker thread keeps one ``YoutubeDL`` session (HTTP connections,
+    cookies, extractor state) for all of its videos instead of building one
+    per video. Videos whose metadata file exists are skipped.
+    """
+    results = {}
+    pending = []
+    for vid in dict.fromkeys(video_ids):
+        if os.path.exists(os.path.join(output_dir, f"{vid}.json")):
+            results[vid] = True
+        else:
+            pending.append(vid)
+    if not pending:
+        return results
+
+    local = threading.local()
+    sessions = []
+    sessions_lock = threading.Lock()
+
+    def fetch(vid: str) -> bool:
+        ydl = getattr(local, "ydl", None)
+        if ydl is None:
+            ydl = local.ydl = yt_dlp.YoutubeDL(_ydl_opts())
+            with sessions_lock:
+                sessions.append(ydl)
+        return run_fetch_video_metadata(
+            vid, output_dir, ydl=ydl, extra_fields=extra_fields, keep_raw=keep_raw
+        )
+
+    logging.info(
+        f"Fetching metadata for {len(pending)} videos with {max_workers} workers"
+    )
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+            for vid, ok in zip(pending, pool.map(fetch, pending)):
+                results[vid] = ok
+    finally:
+        for ydl in sessions:
+            ydl.close()
+    logging.info(
+        f"Fetched metadata for {sum(results[v] for v in pending)}/{len(pending)} videos"
+    )
+    return results
+
+
+def run_compact_metadata(
+    metadata_dir: str, extra_fields: tuple = (), keep_raw: bool = False
+) -> bool:
+    """Rewrite full ``extract_info`` dumps in ``metadata_dir`` as compact records."""
+    try:
+        allowed = {*COMPACT_FIELDS, *extra_fields, "formats"}
+        rewritten = 0
+        for name in sorted(os.listdir(metadata_dir)):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(metadata_dir, name)
+            with open(path, encoding="utf-8") as f:
+                info = json.load(f)
+            if not isinstance(info, dict) or set(info) <= allowed:
+                continue
+            if keep_raw:
+                save_raw_info(path[: -len(".json")] + RAW_SUFFIX, info)
+            write_json_atomic(path, compact_info(info, extra_fields))
+            rewritten += 1
+        logging.info(f"Compacted {rewritten} metadata files in {metadata_dir}")
+        return True
+    except Exception as e:
+        logging.error(f"Failed to compact metadata in {metadata_dir}: {e}")
+        return False
+
+
+def main():
+    """Compact existing metadata dumps from the command line."""
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s"
+    )
+    p = argparse.ArgumentParser(
+        description="Rewrite full yt-dlp metadata dumps as compact records"
+    )
+    p.add_argument("metadata_dir", help="Folder with <video_id>.json files")
+    p.add_argument(
+        "--extra-field",
+        action="append",
+        default=[],
+        help="Additional info field to keep (repeatable)",
+    )
+    p.add_argument(
+        "--keep-raw",
+        action="store_true",
+        help=f"Keep each full dump as <video_id>{RAW_SUFFIX}",
+    )
+    args = p.parse_args()
+    ok = run_compact_metadata(args.metadata_dir, tuple(args.extra_field), args.keep_raw)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,11 @@
-import json
 import logging
 import os
 from typing import Optional
 
 import gspread
 
+from artifacts import write_json_atomic
+
 
 def run_google_sheet_read(
     spreadsheet: str,
@@ -24,8 +25,7 @@ def run_google_sheet_read(
         records = ws.get_all_records()
 
         os.makedirs(os.path.dirname(output), exist_ok=True)
-        with open(output, "w", encoding="utf-8") as f:
-            json.dump(records, f, ensure_ascii=False, indent=2)
+        write_json_atomic(output, records, ensure_ascii=False, indent=2)
         return True
     except Exception as e:
         logging.error(f"Error in google_sheet_read: {e}")
@@ -8,6 +8,8 @@ import gspread
 from dotenv import load_dotenv
 from gspread.exceptions import APIError
 
+from artifacts import write_json_atomic
+
 
 def _retry_gspread_call(
     func: Callable, *args: Any, max_attempts: int = 5, **kwargs: Any
@@ -86,8 +88,7 @@ def _write_url_and_cache(
     _retry_gspread_call(ws.update_cell, row, col, url)
     logging.info("Updated %s in row %d, col %d", vid, row, col)
     sheet_cache = os.path.join(cache_dir, f"google_{vid}.json")
-    with open(sheet_cache, "w", encoding="utf-8") as f:
-        json.dump({"url": url}, f, ensure_ascii=False, indent=2)
+    write_json_atomic(sheet_cache, {"url": url}, ensure_ascii=False, indent=2)
 
 
 def run_google_sheet_write(
@@ -129,8 +130,12 @@ def run_google_sheet_write(
             if existing:
                 logging.info("Skipping update for %s (already set)", vid)
                 # Cache to avoid future redundant sheet calls
-                with open(os.path.join(cache_dir, f"google_{vid}.json"), "w", encoding="utf-8") as f:
-                    json.dump({"url": url}, f, ensure_ascii=False, indent=2)
+                write_json_atomic(
+                    os.path.join(cache_dir, f"google_{vid}.json"),
+                    {"url": url},
+                    ensure_ascii=False,
+                    indent=2,
+                )
                 continue
 
             try:
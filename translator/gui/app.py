@@ -154,7 +154,7 @@ class App(tk.Tk):
         self.transcribe_provider_combo = ttk.Combobox(
             step3_frame,
             textvariable=self.vars["transcription_provider"],
-            values=["local", "openai"],
+            values=["local", "worker", "openai"],
             width=10,
         )
         self.transcribe_provider_combo.pack(side="left")
@@ -456,6 +456,34 @@ class App(tk.Tk):
                 "spreadsheet",
                 "worksheet",
                 "sheet_column",
+                "concurrency",
+                "run_state",
+                "metadata_concurrency",
+                "metadata_extra_fields",
+                "metadata_keep_raw",
+                "audio_format",
+                "download_host_concurrency",
+                "download_fragment_concurrency",
+                "fingerprint_index",
+                "manifest_incremental",
+                "manifest_shard_by",
+                "subtitle_filter",
+                "translation_model",
+                "translation_chunk_size",
+                "translation_overlap",
+                "translation_concurrency",
+                "translation_cache_max_mb",
+                "transcription_max_in_flight",
+                "transcription_segment_mode",
+                "transcription_segment_seconds",
+                "transcription_vad",
+                "transcription_worker_url",
+                "whisper_cache_models",
+                "whisper_cache_max_gb",
+                "isolate_batch_size",
+                "isolate_window_seconds",
+                "isolate_auto_skip",
+                "isolate_skip_thresholds",
             ):
                 if k in base:
                     cfg[k] = base[k]
@@ -639,6 +667,8 @@ class App(tk.Tk):
                     run_videos_dir = os.path.dirname(os.path.abspath(run_dirs["video_list_file"]))
                     enriched_videos = os.path.join(run_videos_dir, "videos_enriched.json")
                     videos_json = enriched_videos if os.path.exists(enriched_videos) else run_dirs["video_list_file"]
+                    with open(cfg_path, encoding="utf-8") as f:
+                        cfg = json.load(f)
                     cmd = [
                         sys.executable,
                         os.path.join(os.getcwd(), "submit_to_catalog.py"),
@@ -646,7 +676,17 @@ class App(tk.Tk):
                         "--api-key", token,
                         "--videos-json", videos_json,
                         "--subtitles-dir", run_dirs["subtitles_dir"],
+                        # Lets the script rebuild missing EN SRTs from cached chunks
+                        "--cache-dir", run_dirs["cache_dir"],
+                        "--slang-file", cfg["slang_file"],
                     ]
+                    for key, flag in (
+                        ("translation_model", "--model"),
+                        ("translation_chunk_size", "--chunk-size"),
+                        ("translation_overlap", "--overlap"),
+                    ):
+                        if key in cfg:
+                            cmd += [flag, str(cfg[key])]
                     proc = subprocess.run(cmd, capture_output=True, text=True)
                     if proc.stdout:
                         for line in proc.stdout.splitlines():
@@ -1,42 +1,304 @@
+import glob
+import json
 import logging
 import os
+import shutil
 import subprocess
+import tempfile
+import wave
+from typing import Optional
 
+from artifacts import PARTIAL_SUFFIX, atomic_write, write_json_atomic
+from audio_analysis import crossfade, decode_pcm, isolation_metrics
 
-def run_isolate_vocals(
+# Frames copied per read when stitching windows
+_COPY_FRAMES = 1 << 16
+
+DECISION_FILE = "isolation.json"
+# Above either value the voice shares the track with music or game audio
+DEFAULT_SKIP_THRESHOLDS = {"floor_ratio": 0.2, "out_of_band": 0.35}
+
+
+def _vocals_path(input_file: str, output_dir: str) -> str:
+    video_id = os.path.splitext(os.path.basename(input_file))[0]
+    return os.path.join(output_dir, video_id, "vocals.wav")
+
+
+def assess_isolation(
+    input_file: str, output_dir: str = "vocals", thresholds: Optional[dict] = None
+) -> dict:
+    """Decide whether Demucs is worth running on ``input_file``.
+
+    A decimated 8 kHz decode is measured with ``isolation_metrics``; isolation
+    is needed when any metric reaches its threshold. The decision, metrics and
+    thresholds are saved to ``<output_dir>/<video_id>/isolation.json`` and
+    reused while the audio size, mtime and thresholds are unchanged. If the audio
+    cannot be analysed, isolation runs as usual.
+    """
+    thresholds = {**DEFAULT_SKIP_THRESHOLDS, **(thresholds or {})}
+    decision_path = os.path.join(
+        os.path.dirname(_vocals_path(input_file, output_dir)), DECISION_FILE
+    )
+    st = os.stat(input_file)
+    source = {"source_size": st.st_size, "source_mtime_ns": st.st_mtime_ns}
+    try:
+        with open(decision_path, encoding="utf-8") as f:
+            cached = json.load(f)
+        if (
+            all(cached.get(k) == v for k, v in source.items())
+            and cached.get("thresholds") == thresholds
+        ):
+            return cached
+    except (OSError, ValueError):
+        pass
+
+    try:
+        metrics = isolation_metrics(decode_pcm(input_file, sample_rate=8000))
+    except Exception as e:
+        logging.warning(f"Could not analyse {input_file}, isolating anyway: {e}")
+        return {"isolate": True, "metrics": None, "thresholds": thresholds}
+    reasons = [
+        name
+        for name, limit in thresholds.items()
+        if metrics.get(name) is not None and metrics[name] >= limit
+    ]
+    decision = {
+        "isolate": bool(reasons) or not metrics["frames"],
+        "reasons": reasons,
+        "metrics": metrics,
+        "thresholds": thresholds,
+        **source,
+    }
+    write_json_atomic(decision_path, decision, indent=2)
+    verdict = "needed" if decision["isolate"] else "not needed"
+    logging.info(f"Vocal isolation {verdict} for {input_file}: {metrics}")
+    return decision
+
+
+def _separated(scratch: str, name: str) -> Optional[str]:
+    """Path of the ``vocals.wav`` Demucs wrote for track ``name``, if any."""
+    produced = glob.glob(
+        os.path.join(glob.escape(scratch), "**", glob.escape(name), "vocals.wav"),
+        recursive=True,
+    )
+    return produced[0] if produced else None
+
+
+def _extract_windows(
+    input_file: str, out_dir: str, window: float, overlap: float
+) -> list:
+    """Cut ``input_file`` into WAV windows starting every ``window`` seconds.
+
+    Each window runs ``overlap`` seconds into the next one so the seams can be
+    cross-faded. Only one window is decoded at a time.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    stem = os.path.splitext(os.path.basename(input_file))[0]
+    paths = []
+    start = 0.0
+    while True:
+        path = os.path.join(out_dir, f"{stem}.w{len(paths):04d}.wav")
+        cmd = ["ffmpeg", "-nostdin", "-v", "error", "-y", "-ss", f"{start:.3f}"]
+        cmd += ["-t", f"{window + overlap:.3f}", "-i", input_file]
+        cmd += ["-vn", "-c:a", "pcm_s16le", path]
+        subprocess.run(cmd, check=True)
+        with wave.open(path, "rb") as w:
+            seconds = w.getnframes() / w.getframerate()
+        if not seconds:
+            os.remove(path)
+            break
+        paths.append(path)
+        if seconds < window + overlap - 0.5:
+            break
+        start += window
+    return paths
+
+
+def _stitch_windows(
+    parts: list, output_path: str, window: float, overlap: float
+) -> None:
+    """Stream separated windows into one WAV, cross-fading every seam.
+
+    Window ``k`` owns ``[k * window, (k + 1) * window)``; its last ``overlap``
+    seconds are blended with the start of window ``k + 1``.
+    """
+    with atomic_write(output_path, "wb") as f:
+        out = None
+        tail = b""
+        for i, part in enumerate(parts):
+            last = i == len(parts) - 1
+            with wave.open(part, "rb") as w:
+                if out is None:
+                    channels, rate = w.getnchannels(), w.getframerate()
+                    if w.getsampwidth() != 2:
+                        raise ValueError(f"Expected 16-bit Demucs output: {part}")
+                    out = wave.open(f, "wb")
+                    out.setnchannels(channels)
+                    out.setsampwidth(2)
+                    out.setframerate(rate)
+                fade = round(overlap * rate) if i else 0
+                if fade:
+                    out.writeframes(crossfade(tail, w.readframes(fade), channels))
+                body = None if last else round(window * rate) - fade
+                while body is None or body > 0:
+                    block = w.readframes(
+                        _COPY_FRAMES if body is None else min(body, _COPY_FRAMES)
+                    )
+                    if not block:
+                        break
+                    out.writeframes(block)
+                    if body is not None:
+                        body -= len(block) // (2 * channels)
+                tail = b"" if last else w.readframes(round(overlap * rate))
+        if out is None:
+            raise ValueError("No separated windows to stitch")
+        out.close()
+
+
+def _run_demucs(demucs: list, scratch: str, tracks: list) -> None:
+    """Separate ``tracks`` into ``scratch`` with one Demucs process."""
+    try:
+        subprocess.run([*demucs, "--out", scratch, *tracks], check=True)
+    except subprocess.CalledProcessError as e:
+        # Demucs stops at the first bad file; keep what it finished
+        logging.error(f"Demucs exited with status {e.returncode}")
+
+
+def _isolate_windowed(
     input_file: str,
+    output_path: str,
+    scratch: str,
+    demucs: list,
+    window: float,
+    overlap: float,
+) -> bool:
+    """Cut, separate and stitch ``input_file`` window by window.
+
+    Returns False when the file fits in one window (or cannot be cut), so it
+    is separated whole with the rest of the batch instead.
+    """
+    work = tempfile.mkdtemp(dir=scratch)
+    try:
+        try:
+            parts = _extract_windows(
+                input_file, os.path.join(work, "windows"), window, overlap
+            )
+        except Exception as e:
+            logging.error(f"Could not cut {input_file} into windows: {e}")
+            return False
+        if len(parts) < 2:
+            return False
+        logging.info(f"Isolating vocals for {input_file} in {len(parts)} windows")
+        _run_demucs(demucs, work, parts)
+        separated = [
+            _separated(work, os.path.splitext(os.path.basename(p))[0]) for p in parts
+        ]
+        if all(separated):
+            os.makedirs(os.path.dirname(output_path), exist_ok=True)
+            _stitch_windows(separated, output_path, window, overlap)
+        return True
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+
+def run_isolate_vocals_batch(  # noqa: C901
+    input_files: list,
     output_dir: str = "vocals",
     model: str = "htdemucs",
     two_stems: bool = False,
-) -> bool:
-    """Isolate vocals from an audio file using the Demucs CLI.
+    window_seconds: Optional[float] = None,
+    overlap_seconds: float = 2.0,
+) -> dict:
+    """Isolate vocals from several audio files with a single Demucs process.
 
-    Creates ``<output_dir>/<video_id>/vocals.wav`` and skips if it already exists.
+    Torch and the model weights are loaded once for the whole batch instead of
+    once per file. Each result lands at ``<output_dir>/<video_id>/vocals.wav``;
+    existing outputs are skipped. Returns ``{input_file: success}``.
+
+    With ``window_seconds`` each file is separated in overlapping windows that
+    are cross-faded back together, so Demucs memory is bounded by the window
+    length instead of the track length. Such files get one Demucs run each,
+    cut only when their turn comes, so scratch space is bounded too.
     """
-    try:
+    results = {}
+    pending = {}
+    for input_file in input_files:
+        results[input_file] = False
         if not os.path.exists(input_file):
             logging.error(f"Input audio not found for vocal isolation: {input_file}")
-            return False
+            continue
+        output_path = _vocals_path(input_file, output_dir)
+        if os.path.exists(output_path):
+            logging.info(f"{output_path} already exists, skipping isolation")
+            results[input_file] = True
+        else:
+            pending[input_file] = output_path
+    if not pending:
+        return results
 
-        video_id = os.path.splitext(os.path.basename(input_file))[0]
-        dest_dir = os.path.join(output_dir, video_id)
-        os.makedirs(dest_dir, exist_ok=True)
-        output_path = os.path.join(dest_dir, "vocals.wav")
+    demucs = ["demucs"]
+    if model:
+        demucs += ["-n", model]
+    if two_stems:
+        demucs += ["--two-stems", "vocals"]
+    try:
+        os.makedirs(output_dir, exist_ok=True)
+        # Demucs writes into a scratch folder; results are moved into place only
+        # once complete so an interrupted run never leaves a truncated vocals.wav.
+        scratch = tempfile.mkdtemp(
+            prefix=".demucs-", suffix=PARTIAL_SUFFIX, dir=output_dir
+        )
+        try:
+            batch = dict(pending)
+            if window_seconds:
+                # One file at a time, so scratch holds a single file's windows
+                for input_file, output_path in pending.items():
+                    if _isolate_windowed(
+                        input_file,
+                        output_path,
+                        scratch,
+                        demucs,
+                        window_seconds,
+                        overlap_seconds,
+                    ):
+                        del batch[input_file]
+            if batch:
+                if len(batch) > 1:
+                    logging.info(
+                        f"Isolating vocals for {len(batch)} file(s) in one Demucs run"
+                    )
+                _run_demucs(demucs, scratch, list(batch))
+            for output_path in batch.values():
+                video_id = os.path.basename(os.path.dirname(output_path))
+                produced = _separated(scratch, video_id)
+                if produced:
+                    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+                    os.replace(produced, output_path)
+        finally:
+            shutil.rmtree(scratch, ignore_errors=True)
+    except Exception as e:
+        logging.error(f"Vocal isolation failed for {', '.join(pending)}: {e}")
 
+    for input_file, output_path in pending.items():
         if os.path.exists(output_path):
-            logging.info(f"{output_path} already exists, skipping isolation")
-            return True
+            logging.info(f"Vocal isolation complete: {output_path}")
+            results[input_file] = True
+        else:
+            logging.error(f"Demucs did not produce {output_path}")
+    return results
 
-        cmd = ["demucs"]
-        if model:
-            cmd += ["-n", model]
-        if two_stems:
-            cmd += ["--two-stems", "vocals"]
-        cmd += ["--out", output_dir, input_file]
 
-        subprocess.run(cmd, check=True)
-        logging.info(f"Vocal isolation complete: {output_path}")
-        return True
-    except Exception as e:
-        logging.error(f"Vocal isolation failed for {input_file}: {e}")
-        return False
+def run_isolate_vocals(
+    input_file: str,
+    output_dir: str = "vocals",
+    model: str = "htdemucs",
+    two_stems: bool = False,
+    window_seconds: Optional[float] = None,
+) -> bool:
+    """Isolate vocals from an audio file using the Demucs CLI.
+
+    Creates ``<output_dir>/<video_id>/vocals.wav`` and skips if it already exists.
+    """
+    return run_isolate_vocals_batch(
+        [input_file], output_dir, model, two_stems, window_seconds=window_seconds
+    )[input_file]
@@ -1,16 +1,157 @@
+import hashlib
 import json
 import logging  # Added for logging
 import os
+import re
+import shutil
+from typing import Optional
+
+import metadata_index
+from artifacts import write_json_atomic
+
+SHARD_KEYS = ("creator", "month")
+_COMPACT = {"ensure_ascii": False, "separators": (",", ":")}
+
+
+def _build_entry(vid: str, meta: dict, details: dict) -> dict:
+    return {
+        "v": vid,
+        # support sheet-exported keys "EN Title" and "Creator"
+        "title": meta.get("EN Title", meta.get("title_en", "")),
+        "description": meta.get("description", meta.get("Description", "")),
+        "creator": meta.get("Creator", meta.get("creator", "")),
+        # support sheet-exported key "EN Subtitles"
+        "subtitleUrl": meta.get("EN Subtitles", meta.get("subtitleUrl", "")),
+        "releaseDate": details.get("upload_date"),
+        "tags": meta.get("tags", meta.get("Tags", [])),
+    }
+
+
+def _signature(meta: dict, details_file: str) -> str:
+    """Hash of everything an entry is built from (list item + details file stat)."""
+    try:
+        st = os.stat(details_file)
+        details = [st.st_size, st.st_mtime_ns]
+    except OSError:
+        details = None
+    payload = json.dumps([meta, details], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def _shard_key(entry: dict, shard_by: str) -> str:
+    if shard_by == "month":
+        date = entry.get("releaseDate") or ""
+        return f"{date[:4]}-{date[4:6]}" if len(date) >= 6 else "unknown"
+    return re.sub(r"[^\w-]+", "_", entry.get("creator") or "").strip("_") or "unknown"
+
+
+def _load_previous(output_file: str, state_file: str) -> tuple:
+    """Entries and state of the last build, or empty ones if unusable."""
+    try:
+        with open(state_file, encoding="utf-8") as f:
+            state = json.load(f)
+        with open(output_file, encoding="utf-8") as f:
+            entries = {e["v"]: e for e in json.load(f)}
+        return entries, state
+    except (OSError, ValueError, KeyError, TypeError):
+        return {}, {}
+
+
+def _write_shards(
+    entries: list, output_file: str, shard_by: str, previous: dict
+) -> dict:
+    """Write ``<manifest stem>/shards/<key>.json`` plus ``<manifest stem>/index.json``.
+
+    Only shards whose content changed since ``previous`` (key -> digest) are
+    rewritten; shards that no longer have entries are removed. Returns the
+    new key -> digest map.
+    """
+    index_dir = os.path.splitext(output_file)[0]
+    # Shards get their own folder so no creator or month can clash with index.json
+    shard_dir = os.path.join(index_dir, "shards")
+    groups = {}
+    for entry in entries:
+        groups.setdefault(_shard_key(entry, shard_by), []).append(entry)
+    digests = {}
+    for key, items in sorted(groups.items()):
+        body = json.dumps(items, **_COMPACT)
+        digests[key] = hashlib.sha1(body.encode("utf-8")).hexdigest()
+        path = os.path.join(shard_dir, f"{key}.json")
+        if previous.get(key) != digests[key] or not os.path.exists(path):
+            write_json_atomic(path, items, **_COMPACT)
+    for key in set(previous) - set(digests):
+        try:
+            os.remove(os.path.join(shard_dir, f"{key}.json"))
+        except OSError:
+            pass
+    write_json_atomic(
+        os.path.join(index_dir, "index.json"),
+        {
+            "shardBy": shard_by,
+            "shards": [
+                {"key": k, "file": f"shards/{k}.json", "count": len(groups[k])}
+                for k in sorted(groups)
+            ],
+        },
+        **_COMPACT,
+    )
+    return digests
+
+
+def _remove_shards(output_file: str) -> None:
+    """Delete the shard files and ``index.json`` of an earlier sharded build.
+
+    The files to delete are taken from that build's index, so shards of the
+    old flat ``<manifest stem>/<key>.json`` layout go as well.
+    """
+    index_dir = os.path.splitext(output_file)[0]
+    index_file = os.path.join(index_dir, "index.json")
+    try:
+        with open(index_file, encoding="utf-8") as f:
+            listed = [s["file"] for s in json.load(f)["shards"]]
+    except (OSError, ValueError, KeyError, TypeError):
+        listed = []
+    for name in listed:
+        if not isinstance(name, str) or os.path.isabs(name) or ".." in name:
+            continue
+        try:
+            os.remove(os.path.join(index_dir, name))
+        except OSError:
+            pass
+    try:
+        os.remove(index_file)
+    except OSError:
+        pass
+    shutil.rmtree(os.path.join(index_dir, "shards"), ignore_errors=True)
+    try:
+        os.rmdir(index_dir)  # only succeeds when nothing else lives there
+    except OSError:
+        pass
 
 
 def run_manifest_builder(
-    video_list_file: str, subtitles_dir: str, details_dir: str, output_file: str
+    video_list_file: str,
+    subtitles_dir: str,
+    details_dir: str,
+    output_file: str,
+    incremental: bool = True,
+    shard_by: Optional[str] = None,
+    state_file: Optional[str] = None,
 ) -> bool:
     """Build the website manifest (subtitles.json) from available EN SRTs.
 
-    Includes only videos that have translated English subtitles.
+    Includes only videos that have translated English subtitles. In
+    ``incremental`` mode entries whose sources (list item, details file) are
+    unchanged since the last build, as recorded in ``state_file``, are reused,
+    and nothing is written when no entry changed; ``incremental=False`` or no
+    ``state_file`` rebuilds everything. ``shard_by`` (``"creator"`` or
+    ``"month"``) additionally writes per-key files under ``shards/`` plus an
+    ``index.json`` into a folder named after the manifest.
     """
     try:
+        if shard_by is not None and shard_by not in SHARD_KEYS:
+            logging.error(f"Unknown manifest shard key: {shard_by}")
+            return False
         # Load metadata
         if not os.path.exists(video_list_file):
             logging.error(
@@ -22,7 +163,6 @@ def run_manifest_builder(
         video_map = {v["v"]: v for v in videos}
 
         # Find translated subtitles
-        entries = []
         if not os.path.exists(subtitles_dir):
             logging.warning(
                 f"Subtitles directory not found: {subtitles_dir}. Skipping manifest build."
@@ -30,41 +170,69 @@ def run_manifest_builder(
             # This is not a fatal error, so we return True
             return True
 
-        for fname in sorted(os.listdir(subtitles_dir)):
-            if not fname.startswith("en_") or not fname.endswith(".srt"):
-                continue
-            vid = fname[len("en_") : -len(".srt")]
-            meta = video_map.get(vid)
-            if not meta:
-                continue
-
-            # Load detailed metadata
-            details_file = os.path.join(details_dir, f"{vid}.json")
-            details = {}
-            if os.path.exists(details_file):
-                with open(details_file, encoding="utf-8") as f:
-                    details = json.load(f)
-
-            entries.append(
-                {
-                    "v": vid,
-                    # support sheet-exported keys "EN Title" and "Creator"
-                    "title": meta.get("EN Title", meta.get("title_en", "")),
-                    "description": meta.get("description", meta.get("Description", "")),
-                    "creator": meta.get("Creator", meta.get("creator", "")),
-                    # support sheet-exported key "EN Subtitles"
-                    "subtitleUrl": meta.get(
-                        "EN Subtitles", meta.get("subtitleUrl", "")
-                    ),
-                    "releaseDate": details.get("upload_date"),
-                    "tags": meta.get("tags", meta.get("Tags", [])),
-                }
-            )
+        subtitled = [
+            fname[len("en_") : -len(".srt")]
+            for fname in sorted(os.listdir(subtitles_dir))
+            if fname.startswith("en_") and fname.endswith(".srt")
+        ]
+        subtitled = [vid for vid in subtitled if vid in video_map]
 
-        os.makedirs(os.path.dirname(output_file), exist_ok=True)
-        with open(output_file, "w", encoding="utf-8") as f:
-            json.dump(entries, f, ensure_ascii=False, indent=2)
-        logging.info(f"Manifest built and saved to {output_file}")
+        previous, state = (
+            _load_previous(output_file, state_file)
+            if incremental and state_file
+            else ({}, {})
+        )
+        old_sigs = state.get("signatures", {})
+        sigs = {
+            vid: _signature(video_map[vid], os.path.join(details_dir, f"{vid}.json"))
+            for vid in subtitled
+        }
+        changed = [
+            vid
+            for vid in subtitled
+            if vid not in previous or old_sigs.get(vid) != sigs[vid]
+        ]
+        removed = set(previous) - set(subtitled)
+        if (
+            previous
+            and not changed
+            and not removed
+            and state.get("shard_by") == shard_by
+        ):
+            logging.info(f"Manifest {output_file} is up to date")
+            return True
+
+        # Detailed metadata of the changed videos in one indexed lookup
+        details_by_id = metadata_index.read_metadata(details_dir, changed)
+        changed_set = set(changed)
+        entries = [
+            _build_entry(vid, video_map[vid], details_by_id.get(vid, {}))
+            if vid in changed_set
+            else previous[vid]
+            for vid in subtitled
+        ]
+
+        os.makedirs(os.path.dirname(os.path.abspath(output_file)), exist_ok=True)
+        write_json_atomic(output_file, entries, **_COMPACT)
+        previous_shards = state.get("shards", {})
+        if state.get("shard_by") != shard_by:
+            # Layout changed (other key, sharding off, or no record of it)
+            _remove_shards(output_file)
+            previous_shards = {}
+        shards = (
+            _write_shards(entries, output_file, shard_by, previous_shards)
+            if shard_by
+            else {}
+        )
+        if state_file:
+            write_json_atomic(
+                state_file,
+                {"signatures": sigs, "shard_by": shard_by, "shards": shards},
+            )
+        logging.info(
+            f"Manifest built and saved to {output_file} "
+            f"({len(changed)} changed, {len(removed)} removed, {len(entries)} total)"
+        )
         return True
     except Exception as e:
         logging.error(f"Manifest build failed: {e}")
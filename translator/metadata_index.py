@@ -0,0 +1,156 @@
+"""Persistent SQLite index over per-video metadata records and title caches.
+
+``build_videos_json`` and ``manifest_builder`` need a few fields of every
+video's ``<metadata_dir>/<vid>.json`` and ``<cache_dir>/title_<vid>.json``.
+Opening and parsing one file per video dominates large builds, so the writers
+(``fetch_video_metadata``, ``translate_title``) also upsert each record into
+``index.sqlite`` next to the files, and readers fetch the IDs they need with
+batched queries.
+
+The JSON files stay the source of truth. Every row remembers the size and
+mtime of the file it came from; a reader only ``stat``s the files and
+re-parses (and re-indexes) those that changed or were written by another
+tool.
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+
+INDEX_FILE = "index.sqlite"
+METADATA = "metadata"
+TITLE = "title"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    kind TEXT NOT NULL,
+    video_id TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (kind, video_id)
+);
+"""
+# SQLite's default limit on host parameters per statement is 999
+_QUERY_CHUNK = 500
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def source_path(directory: str, kind: str, video_id: str) -> str:
+    """Path of the JSON file an entry of ``kind`` is read from."""
+    if kind == TITLE:
+        return os.path.join(directory, f"title_{video_id}.json")
+    return os.path.join(directory, f"{video_id}.json")
+
+
+class MetadataIndex:
+    """SQLite table of parsed JSON records keyed by ``(kind, video_id)``."""
+
+    def __init__(self, db_path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=60)
+        self._conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        """Close the underlying database connection."""
+        with self._lock:
+            self._conn.close()
+
+    def put(self, kind: str, video_id: str, path: str, data: dict) -> None:
+        """Index ``data`` as the current content of ``path``."""
+        st = os.stat(path)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)",
+                (
+                    kind,
+                    video_id,
+                    st.st_size,
+                    st.st_mtime_ns,
+                    json.dumps(data, ensure_ascii=False),
+                ),
+            )
+            self._conn.commit()
+
+    def get_many(self, kind: str, directory: str, video_ids) -> dict:
+        """Return ``{video_id: record}`` for the IDs whose JSON file exists.
+
+        Current rows come from the index; missing or outdated ones are parsed
+        from disk and re-indexed in the same pass.
+        """
+        stats = {}
+        for vid in dict.fromkeys(video_ids):
+            try:
+                st = os.stat(source_path(directory, kind, vid))
+            except OSError:
+                continue
+            stats[vid] = (st.st_size, st.st_mtime_ns)
+        found = {}
+        ids = list(stats)
+        with self._lock:
+            for i in range(0, len(ids), _QUERY_CHUNK):
+                chunk = ids[i : i + _QUERY_CHUNK]
+                rows = self._conn.execute(
+                    "SELECT video_id, size, mtime_ns, data FROM entries "
+                    f"WHERE kind = ? AND video_id IN ({','.join('?' * len(chunk))})",
+                    (kind, *chunk),
+                )
+                for vid, size, mtime_ns, data in rows:
+                    if stats[vid] == (size, mtime_ns):
+                        found[vid] = json.loads(data)
+
+        stale = [vid for vid in ids if vid not in found]
+        updates = []
+        for vid in stale:
+            try:
+                with open(source_path(directory, kind, vid), encoding="utf-8") as f:
+                    found[vid] = json.load(f)
+            except (OSError, ValueError) as e:
+                logging.warning(f"Could not read {kind} for {vid}: {e}")
+                continue
+            updates.append(
+                (kind, vid, *stats[vid], json.dumps(found[vid], ensure_ascii=False))
+            )
+        if updates:
+            with self._lock:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)", updates
+                )
+                self._conn.commit()
+            logging.info(f"Indexed {len(updates)} {kind} file(s) in {self.db_path}")
+        return found
+
+
+def open_index(directory: str) -> MetadataIndex:
+    """Shared ``MetadataIndex`` stored as ``<directory>/index.sqlite``."""
+    path = os.path.abspath(os.path.join(directory, INDEX_FILE))
+    with _indexes_lock:
+        index = _indexes.get(path)
+        if index is None:
+            index = _indexes[path] = MetadataIndex(path)
+        return index
+
+
+def record(kind: str, directory: str, video_id: str, data: dict) -> None:
+    """Index a record its writer just saved; failures are only logged."""
+    try:
+        open_index(directory).put(
+            kind, video_id, source_path(directory, kind, video_id), data
+        )
+    except Exception as e:
+        logging.warning(f"Could not index {kind} for {video_id}: {e}")
+
+
+def read_metadata(metadata_dir: str, video_ids) -> dict:
+    """Metadata records of ``video_ids`` (only those with a metadata file)."""
+    return open_index(metadata_dir).get_many(METADATA, metadata_dir, video_ids)
+
+
+def read_titles(cache_dir: str, video_ids) -> dict:
+    """Title cache entries of ``video_ids`` (only those already translated)."""
+    return open_index(cache_dir).get_many(TITLE, cache_dir, video_ids)
@@ -0,0 +1,187 @@
+"""Process-wide registry of loaded Whisper models.
+
+Loading the ``large`` model reads several GB from disk, which can take longer
+than transcribing a short clip. ``whisper_models`` keeps models resident for
+the life of the process, keyed by ``(model_size, device)``, and evicts the
+least recently used ones when the model count or memory ceiling is exceeded.
+"""
+import gc
+import importlib
+import logging
+import sys
+import threading
+from collections import OrderedDict
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import Callable, Optional
+
+# Approximate parameter counts, used to make room before a model is loaded
+_WHISPER_PARAMS = {
+    "tiny": 39e6,
+    "base": 74e6,
+    "small": 244e6,
+    "medium": 769e6,
+    "large": 1550e6,
+    "turbo": 809e6,
+}
+
+
+def estimate_model_bytes(model_size: str) -> int:
+    """Rough fp32 footprint of a Whisper model by name (0 if unknown)."""
+    name = model_size.split(".", maxsplit=1)[0].split("-", maxsplit=1)[0]
+    return int(_WHISPER_PARAMS.get(name, 0) * 4)
+
+
+def model_bytes(model) -> Optional[int]:
+    """Actual parameter memory of a torch model, or None if unavailable."""
+    try:
+        return sum(p.numel() * p.element_size() for p in model.parameters())
+    except Exception:
+        return None
+
+
+def default_device() -> str:
+    """Device Whisper picks when none is given."""
+    try:
+        torch = importlib.import_module("torch")
+        return "cuda" if torch.cuda.is_available() else "cpu"
+    except Exception:
+        return "cpu"
+
+
+def _load_whisper(model_size: str, device: Optional[str]):
+    whisper = importlib.import_module("whisper")
+    if device is None:
+        return whisper.load_model(model_size)
+    return whisper.load_model(model_size, device=device)
+
+
+def _release_memory() -> None:
+    gc.collect()
+    torch = sys.modules.get("torch")
+    if torch is not None:
+        try:
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+        except Exception:
+            pass
+
+
+class _Entry:
+    def __init__(self, estimate: int):
+        self.model = None
+        self.nbytes = estimate
+        self.users = 0
+        # Serializes loading and use: Whisper decoding is not thread-safe
+        self.lock = threading.Lock()
+
+
+class ModelCache:
+    """Thread-safe LRU of loaded models with a count and memory ceiling.
+
+    Models in use are never evicted, so the limits can be exceeded briefly
+    while several different models are busy at the same time.
+    """
+
+    def __init__(
+        self,
+        loader: Callable = _load_whisper,
+        max_models: int = 1,
+        max_bytes: Optional[int] = None,
+        size_of: Callable = model_bytes,
+        estimate: Callable = estimate_model_bytes,
+    ):
+        self._loader = loader
+        self._size_of = size_of
+        self._estimate = estimate
+        self.max_models = max_models
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[tuple, _Entry] = OrderedDict()
+
+    def configure(
+        self, max_models: Optional[int] = None, max_bytes: Optional[int] = None
+    ) -> None:
+        """Change the eviction limits; ``None`` leaves a limit unchanged."""
+        with self._lock:
+            if max_models is not None:
+                self.max_models = max(1, int(max_models))
+            if max_bytes is not None:
+                self.max_bytes = int(max_bytes)
+            self._make_room(None, 0)
+        _release_memory()
+
+    def loaded(self) -> list:
+        """Keys of the models currently resident, least recently used first."""
+        with self._lock:
+            return [k for k, e in self._entries.items() if e.model is not None]
+
+    def clear(self) -> None:
+        """Drop every model that is not in use."""
+        with self._lock:
+            for key in [k for k, e in self._entries.items() if e.users == 0]:
+                del self._entries[key]
+        _release_memory()
+
+    @contextmanager
+    def use(self, model_size: str, device: Optional[str] = None) -> Iterator:
+        """Yield the loaded model for ``(model_size, device)``, loading it once.
+
+        Callers of the same model are serialized for the duration of the block.
+        """
+        key = (model_size, device or default_device())
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = _Entry(self._estimate(model_size))
+                self._entries[key] = entry
+            entry.users += 1
+            self._entries.move_to_end(key)
+        try:
+            with entry.lock:
+                if entry.model is None:
+                    with self._lock:
+                        evicted = self._make_room(key, entry.nbytes)
+                    if evicted:
+                        _release_memory()
+                    logging.info("Loading Whisper model %s on %s", *key)
+                    entry.model = self._loader(model_size, device)
+                    entry.nbytes = self._size_of(entry.model) or entry.nbytes
+                else:
+                    logging.info("Reusing loaded Whisper model %s on %s", *key)
+                yield entry.model
+        finally:
+            with self._lock:
+                entry.users -= 1
+                if entry.model is None and entry.users == 0:
+                    # Load failed; forget the placeholder
+                    self._entries.pop(key, None)
+                evicted = self._make_room(None, 0)
+            if evicted:
+                _release_memory()
+
+    def _make_room(self, incoming: Optional[tuple], extra: int) -> int:
+        """Evict idle LRU models until limits hold; caller holds ``_lock``."""
+        evicted = 0
+        while True:
+            resident = [
+                (k, e)
+                for k, e in self._entries.items()
+                if k != incoming and e.model is not None
+            ]
+            count = len(resident) + (1 if incoming else 0)
+            total = sum(e.nbytes for _, e in resident) + extra
+            over = count > self.max_models or (
+                self.max_bytes is not None and total > self.max_bytes
+            )
+            idle = [(k, e) for k, e in resident if e.users == 0]
+            if not over or not idle:
+                return evicted
+            key, _ = idle[0]
+            logging.info("Evicting Whisper model %s on %s", *key)
+            del self._entries[key]
+            evicted += 1
+
+
+# Shared by every transcription in this process
+whisper_models = ModelCache()
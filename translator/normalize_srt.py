@@ -1,45 +1,62 @@
+import difflib
 import logging  # Added for logging
 import os
 import re
+from collections import deque
+from collections.abc import Iterable, Iterator
+from typing import Optional
 
+from artifacts import write_json_atomic
+from srt_io import (
+    Cue,
+    format_timestamp,
+    iter_srt_file,
+    parse_timestamp,
+    read_srt,
+    write_srt,
+)
 
-class Subtitle:
-    """Lightweight container for a single SRT subtitle block."""
-
-    def __init__(self, index: int, start: str, end: str, lines: list):
-        self.index = index
-        self.start = start
-        self.end = end
-        self.lines = lines
-
-    def to_srt_block(self) -> str:
-        """Serialize the subtitle back to an SRT block string."""
-        return (
-            f"{self.index}\n{self.start} --> {self.end}\n"
-            + "\n".join(self.lines)
-            + "\n"
-        )
-
-
-def parse_srt_file(path: str) -> list:
-    """Parse an SRT file path into a list of Subtitle objects."""
-    with open(path, encoding="utf-8-sig") as f:
-        content = f.read()
-    pattern = re.compile(
-        r"(\d+)\s+(.*?) --> (.*?)\s+([\s\S]*?)(?=\n\n|\Z)", re.MULTILINE
-    )
-    subs = []
-    for m in pattern.finditer(content):
-        idx = int(m.group(1))
-        subs.append(
-            Subtitle(
-                idx,
-                m.group(2).strip(),
-                m.group(3).strip(),
-                m.group(4).strip().split("\n"),
-            )
-        )
-    return subs
+# Subtitles are srt_io cues (integer millisecond times)
+Subtitle = Cue
+parse_srt_file = read_srt
+
+# Outros and credits Whisper invents over silence, music or game audio,
+# compared without case, spaces or punctuation
+HALLUCINATIONS = (
+    "시청해주셔서감사합니다",
+    "시청해주셔서고맙습니다",
+    "구독과좋아요",
+    "좋아요와구독",
+    "구독좋아요알림설정",
+    "다음영상에서만나요",
+    "mbc뉴스",
+    "자막제공",
+    "자막by",
+    "thanksforwatching",
+    "pleasesubscribe",
+    "subtitlesbytheamaraorgcommunity",
+)
+DEFAULT_FILTER = {
+    # Merge a cue into the previous one at this text similarity (0-1)
+    "similarity": 0.9,
+    # Drop a cue whose text already occurs this often in the last `window` cues
+    "max_repeats": 2,
+    "window": 8,
+    # Drop cues denser than this many characters per second
+    "max_cps": 30.0,
+    # Collapse a phrase repeated at least this many times in a row within a cue
+    "min_phrase_repeats": 3,
+}
+# Same rough rate as translation_engine.estimate_tokens
+_CHARS_PER_TOKEN = 2
+_NON_WORD = re.compile(r"[\W_]+")
+# Digit runs are amounts ("1000000원"), not loops
+_CHAR_RUN = re.compile(r"(\D)\1{4,}")
+# Unspaced loops are only cut for Hangul syllable units, so numbers, ASCII
+# laughter ("hahaha") and jamo runs ("ㅋㅋㅋ") are left to _CHAR_RUN
+_HANGUL_UNIT = "[가-힣]{3,20}?"
+# Share of a cue's non-space characters an unspaced loop must cover
+_LOOP_SHARE = 0.5
 
 
 def normalize_timestamp(ts: str) -> str:
@@ -47,71 +64,211 @@ def normalize_timestamp(ts: str) -> str:
 
     Accepts inputs like MM:SS,ms or with overflow and carries across units.
     """
-    ts = ts.strip()
-    # Split milliseconds
-    if "," in ts:
-        base, ms = ts.split(",", 1)
-    elif "." in ts:
-        base, ms = ts.split(".", 1)
-    else:
-        base, ms = ts, "000"
-    # Exactly three digits of milliseconds
-    ms = (ms + "000")[:3]
-    # Parse hours/minutes/seconds components (allow variable lengths)
-    parts = [int(p) for p in base.split(":")]
-    if len(parts) == 3:
-        h, m, s = parts
-    elif len(parts) == 2:
-        h, m, s = 0, parts[0], parts[1]
-    else:
-        h, m, s = 0, 0, parts[0]
-    # Compute total milliseconds and re-split to correct overflow
-    total_ms = ((h * 3600 + m * 60 + s) * 1000) + int(ms)
-    total_sec, ms = divmod(total_ms, 1000)
-    h, rem_sec = divmod(total_sec, 3600)
-    m, s = divmod(rem_sec, 60)
-    return f"{h:02d}:{m:02d}:{s:02d},{ms:03d}"
+    return format_timestamp(parse_timestamp(ts))
+
+
+def iter_collapsed(subs: Iterable) -> Iterator:
+    """Lazily merge adjacent subtitles that have identical text lines."""
+    last = None
+    for sub in subs:
+        if last is not None and sub.lines == last.lines:
+            last.end = sub.end
+            continue
+        if last is not None:
+            yield last
+        last = sub
+    if last is not None:
+        yield last
 
 
 def collapse_subtitles(subs: list) -> list:
     """Merge adjacent subtitles that have identical text lines."""
-    if not subs:
-        return []
-    merged = [subs[0]]
-    for sub in subs[1:]:
-        last = merged[-1]
-        if sub.lines == last.lines:
-            last.end = sub.end
+    return list(iter_collapsed(subs))
+
+
+def _key(text: str) -> str:
+    return _NON_WORD.sub("", text.lower())
+
+
+def collapse_repeats(text: str, min_repeats: int = 3) -> str:
+    """Shorten phrases repeated ``min_repeats`` or more times in a row to one.
+
+    Works on whitespace-separated words and, for unspaced Korean, on a
+    repeated unit of three or more syllables when the loop makes up most of
+    the cue; runs of one non-digit character are cut to three.
+    """
+    words = text.split()
+    out = []
+    i = 0
+    while i < len(words):
+        for n in range(1, min(8, (len(words) - i) // min_repeats) + 1):
+            phrase = words[i : i + n]
+            reps = 1
+            while words[i + reps * n : i + (reps + 1) * n] == phrase:
+                reps += 1
+            if reps >= min_repeats:
+                out.extend(phrase)
+                i += reps * n
+                break
         else:
-            merged.append(sub)
-    return merged
+            out.append(words[i])
+            i += 1
+    text = " ".join(out)
+    loop = re.search(rf"({_HANGUL_UNIT})\1{{{min_repeats - 1},}}", text)
+    if loop and loop.end() - loop.start() >= _LOOP_SHARE * len("".join(out)):
+        text = text[: loop.start()] + loop.group(1) + text[loop.end() :]
+    return _CHAR_RUN.sub(r"\1\1\1", text)
+
+
+def _hallucinated(key: str) -> bool:
+    return any(p in key and len(key) <= 2 * len(p) for p in HALLUCINATIONS)
+
+
+def _new_filter_stats() -> dict:
+    return {
+        "cues_in": 0,
+        "cues_out": 0,
+        "dropped": {"hallucination": 0, "repetition": 0, "dense": 0, "empty": 0},
+        "merged": 0,
+        "shortened": 0,
+        "prompt_chars_in": 0,
+        "prompt_chars_out": 0,
+    }
+
+
+def iter_filtered(  # noqa: C901
+    subs: Iterable, options: Optional[dict] = None, stats: Optional[dict] = None
+) -> Iterator:
+    """Lazily drop or merge Whisper hallucinations and repetition loops.
+
+    Per cue, in order: phrases repeated within the cue are collapsed
+    (``collapse_repeats``); known hallucinated outros, cues whose text already
+    occurs ``max_repeats`` times among the last ``window`` kept cues, and cues
+    denser than ``max_cps`` characters per second are dropped; a cue at least
+    ``similarity`` alike to the previous one is merged into it. ``stats``
+    (see ``filter_report``) is updated in place.
+    """
+    opts = {**DEFAULT_FILTER, **(options or {})}
+    if stats is None:
+        stats = _new_filter_stats()
+    recent = deque(maxlen=int(opts["window"]))
+    last = last_key = None
+    for sub in subs:
+        stats["cues_in"] += 1
+        stats["prompt_chars_in"] += len(sub.to_srt_block()) + 1
+        lines = [collapse_repeats(x, opts["min_phrase_repeats"]) for x in sub.lines]
+        if lines != sub.lines:
+            stats["shortened"] += 1
+            sub.lines = lines
+        key = _key(sub.text)
+        reason = None
+        if not key:
+            reason = "empty"
+        elif _hallucinated(key):
+            reason = "hallucination"
+        elif recent.count(key) >= opts["max_repeats"]:
+            reason = "repetition"
+        elif len(key) * 1000 > opts["max_cps"] * max(sub.end - sub.start, 1):
+            reason = "dense"
+        if reason:
+            stats["dropped"][reason] += 1
+            continue
+        recent.append(key)
+        if (
+            last is not None
+            and difflib.SequenceMatcher(None, key, last_key).ratio()
+            >= opts["similarity"]
+        ):
+            last.end = max(last.end, sub.end)
+            stats["merged"] += 1
+            continue
+        if last is not None:
+            yield last
+        last, last_key = sub, key
+    if last is not None:
+        yield last
+
+
+def filter_report(stats: dict) -> dict:
+    """Summary of ``iter_filtered`` stats with the estimated prompt token savings."""
+    saved = stats["prompt_chars_in"] - stats["prompt_chars_out"]
+    return {
+        **stats,
+        "tokens_saved": saved // _CHARS_PER_TOKEN,
+        "saved_ratio": round(saved / stats["prompt_chars_in"], 4)
+        if stats["prompt_chars_in"]
+        else 0.0,
+    }
+
+
+def iter_normalized(
+    input_file: str,
+    filter_options: Optional[dict] = None,
+    stats: Optional[dict] = None,
+) -> Iterator:
+    """Yield the normalized, collapsed subtitles of ``input_file`` one by one.
+
+    Only the cue being merged is held in memory, whatever the file size.
+    Indexes are those of the input; renumber when writing. With
+    ``filter_options`` (``{}`` for the defaults) the cues also pass through
+    ``iter_filtered``.
+    """
+    # Cue times are parsed (and thereby normalized) to milliseconds
+    cues = iter_collapsed(iter_srt_file(input_file))
+    if filter_options is None:
+        return cues
+    return iter_filtered(cues, filter_options, stats)
 
 
 def write_srt_file(path: str, subs: list) -> None:
     """Write a list of Subtitle objects to disk as an SRT file."""
-    with open(path, "w", encoding="utf-8") as f:
-        for sub in subs:
-            f.write(sub.to_srt_block())
-            f.write("\n")
+    write_srt(path, subs)
+
+
+def _counted(cues: Iterable, stats: dict) -> Iterator:
+    for cue in cues:
+        stats["cues_out"] += 1
+        yield cue
+        # Measured after renumbering, as the translation prompt sees it
+        stats["prompt_chars_out"] += len(cue.to_srt_block()) + 1
 
 
-def run_normalize_srt(input_file: str, output_file: str) -> bool:
-    """Normalize timestamps and collapse duplicates in an SRT file."""
+def run_normalize_srt(
+    input_file: str,
+    output_file: str,
+    filter_options: Optional[dict] = None,
+    report_file: Optional[str] = None,
+) -> bool:
+    """Normalize timestamps and collapse duplicates in an SRT file.
+
+    Cues are streamed from ``input_file`` into ``output_file``, which may be
+    the same path: the output replaces it atomically once complete. With
+    ``filter_options`` hallucinations and repetition loops are removed too
+    (see ``iter_filtered``); the savings are logged and, with
+    ``report_file``, saved as JSON.
+    """
     try:
         if not os.path.exists(input_file):
             logging.error(f"Input SRT file not found for normalization: {input_file}")
             return False
 
-        subs = parse_srt_file(input_file)
-        for sub in subs:
-            sub.start = normalize_timestamp(sub.start)
-            sub.end = normalize_timestamp(sub.end)
-        cleaned = collapse_subtitles(subs)
-        for i, sub in enumerate(cleaned, 1):
-            sub.index = i
         os.makedirs(os.path.dirname(output_file), exist_ok=True)
-        write_srt_file(output_file, cleaned)
-        logging.info(f"SRT file normalized and saved to {output_file}")
+        stats = _new_filter_stats()
+        cues = iter_normalized(input_file, filter_options, stats)
+        if filter_options is not None:
+            cues = _counted(cues, stats)
+        count = write_srt(output_file, cues, renumber=True)
+        logging.info(f"SRT file normalized and saved to {output_file} ({count} cues)")
+        if filter_options is not None:
+            report = filter_report(stats)
+            logging.info(
+                f"Filtered {input_file}: {report['cues_in']} -> {count} cues "
+                f"(dropped {report['dropped']}, merged {report['merged']}, "
+                f"shortened {report['shortened']}), ~{report['tokens_saved']} "
+                f"prompt tokens saved ({report['saved_ratio']:.0%})"
+            )
+            if report_file:
+                write_json_atomic(report_file, report, indent=2)
         return True
     except Exception as e:
         logging.error(f"SRT normalization failed for {input_file}: {e}")
@@ -3,22 +3,26 @@ import json
 import logging
 import os
 import sys
+import threading
 import time
+from contextlib import nullcontext
+from typing import Optional
 
-import build_videos_json
-import download_audio
-import fetch_video_metadata
-import google_sheet_read
-import google_sheet_write
-import isolate_vocals
-import manifest_builder
-import normalize_srt
-import read_youtube_urls
-import transcribe_audio
-import translate_subtitles
-import translate_title
-import upload_subtitles
-from run_paths import compute_run_paths
+from artifacts import quarantine_partial_outputs
+from download_audio import AUDIO_FORMATS, host_throttle
+from model_cache import whisper_models
+from pipeline_scheduler import run_graph
+from pipeline_steps import (
+    RESOURCE_CLASSES,
+    STEP_SPECS,
+    artifact_path,
+    build_context,
+    build_step_graph,
+    in_place_rewriters,
+    is_source_step,
+)
+from run_paths import resolve_run_dirs
+from run_state import FRESH, STALE, RunState, invalidate_outputs
 
 
 def setup_logging():
@@ -36,6 +40,124 @@ def setup_logging():
     return root
 
 
+def run_step(name: str, ctx: dict, v: Optional[dict] = None) -> bool:
+    """Run one registered step with START/END logging; return True on success.
+
+    Per-video steps receive the video entry ``v``; global steps run once.
+    """
+    spec = STEP_SPECS[name]
+    label = f"{name} video={v['v']}" if v is not None else name
+    logging.info("START %s", label)
+    _t0 = time.monotonic()
+    if not spec.per_video:
+        ok = spec.run(ctx)
+    elif ctx.get("state") is not None:
+        ok = _run_tracked(spec, ctx, v, ctx["state"])
+    else:
+        ok = spec.run(ctx, v)
+    if ok:
+        logging.info("END %s OK (%.1fs)", label, time.monotonic() - _t0)
+    else:
+        if not spec.per_video:
+            logging.error(
+                "%s failed%s", name, ", aborting pipeline" if spec.fatal else ""
+            )
+        logging.error("END %s FAIL (%.1fs)", label, time.monotonic() - _t0)
+    return ok
+
+
+def _run_tracked(spec, ctx: dict, v: dict, state: RunState) -> bool:
+    """Run a per-video step unless the run-state fingerprint says it is current."""
+    vid = v["v"]
+    # Artifacts rewritten in place are verified as outputs, not fingerprinted as inputs
+    inputs = {
+        n: artifact_path(ctx, n, vid) for n in spec.inputs if n not in spec.outputs
+    }
+    outputs = {n: artifact_path(ctx, n, vid) for n in spec.outputs}
+    params = spec.params(ctx)
+    fingerprint, input_digests = state.fingerprint(inputs, params)
+    verdict = state.check(vid, spec.name, fingerprint, outputs)
+    if verdict == FRESH:
+        logging.info("Skipping %s video=%s: fingerprint unchanged", spec.name, vid)
+        return True
+    if verdict == STALE:
+        invalidate_outputs([p for n, p in outputs.items() if n not in spec.inputs])
+    _t0 = time.monotonic()
+    ok = spec.run(ctx, v)
+    if ok:
+        state.record(
+            vid,
+            spec.name,
+            fingerprint,
+            input_digests,
+            params,
+            outputs,
+            time.monotonic() - _t0,
+            superseded=tuple(in_place_rewriters(spec.name)),
+        )
+    else:
+        state.forget(vid, spec.name)
+    return ok
+
+
+def run_dag(steps: list, videos: list, ctx: dict, concurrency: dict, on_done) -> dict:
+    """Run the configured steps as a dependency graph on bounded worker pools.
+
+    Steps that share no artifacts overlap (e.g. ``translate_title`` alongside
+    the audio steps of the same video). Each step gets its own pool sized by
+    ``concurrency[step]``; a ``concurrency[<resource class>]`` entry caps how
+    many steps of that class (network, cpu, gpu, llm) run at once overall.
+
+    As in the serial loop of ``main``, a failed per-video step ends that
+    video: its steps later in ``steps`` are skipped unless they already
+    started. Other videos continue, and global steps still run at the end.
+    """
+    gates = {
+        r: threading.BoundedSemaphore(concurrency[r])
+        for r in RESOURCE_CLASSES
+        if r in concurrency
+    }
+
+    position = {s: i for i, s in enumerate(steps)}
+    # Per video index: position of its earliest failed step
+    failed_at = {}
+    failed_lock = threading.Lock()
+
+    def run_node(key) -> bool:
+        name, idx = key
+        ok = False
+        try:
+            with gates.get(STEP_SPECS[name].resource) or nullcontext():
+                ok = run_step(name, ctx, videos[idx] if idx is not None else None)
+        finally:
+            if not ok and idx is not None:
+                with failed_lock:
+                    prev = failed_at.get(idx, position[name])
+                    failed_at[idx] = min(prev, position[name])
+        return ok
+
+    def after_failure(key) -> bool:
+        name, idx = key
+        with failed_lock:
+            return idx in failed_at and position[name] > failed_at[idx]
+
+    def node_done(key):
+        if key[1] is not None:
+            on_done(key[0], videos[key[1]])
+
+    return run_graph(
+        build_step_graph(steps, videos),
+        run_node,
+        pool_of=lambda key: key[0],
+        workers={
+            s: concurrency.get(s, concurrency.get(STEP_SPECS[s].resource, 1))
+            for s in steps
+        },
+        on_node_done=node_done,
+        skip=after_failure,
+    )
+
+
 def main():  # noqa: C901
     """Run the pipeline orchestrator according to the provided config file."""
     setup_logging()
@@ -65,24 +187,8 @@ def main():  # noqa: C901
         logging.error('Config must define an ordered list of steps under "steps"')
         sys.exit(1)
 
-    allowed_per_video = [
-        "fetch_video_metadata",
-        "download_audio",
-        "isolate_vocals",
-        "transcribe_audio",
-        "normalize_srt",
-        "translate_subtitles",
-        "translate_title",
-        "upload_subtitles",
-    ]
-    allowed_global = [
-        "google_sheet_read",
-        "google_sheet_write",
-        "read_youtube_urls",
-        "build_videos_json",
-        "manifest_builder",
-    ]
-    allowed = set(allowed_per_video + allowed_global)
+    allowed_per_video = [n for n, spec in STEP_SPECS.items() if spec.per_video]
+    allowed = set(STEP_SPECS)
 
     # Validate steps
     seen = set()
@@ -115,6 +221,33 @@ def main():  # noqa: C901
                     logging.error("%s must come before all per-video steps", gstep)
                     sys.exit(1)
 
+    # Optional concurrent scheduling: {"<step or resource class>": <workers>, ...}
+    concurrency = config.get("concurrency")
+    if concurrency is not None:
+        if not isinstance(concurrency, dict):
+            logging.error('"concurrency" must map step names to worker counts')
+            sys.exit(1)
+        for k, n in concurrency.items():
+            if k not in allowed_per_video and k not in RESOURCE_CLASSES:
+                logging.error(
+                    'Unknown key "%s" in concurrency. Allowed: %s',
+                    k,
+                    ", ".join(sorted(allowed_per_video) + list(RESOURCE_CLASSES)),
+                )
+                sys.exit(1)
+            if not isinstance(n, int) or isinstance(n, bool) or n < 1:
+                logging.error('Worker count for "%s" must be a positive integer', k)
+                sys.exit(1)
+
+    audio_format = config.get("audio_format", "mp3")
+    if audio_format not in AUDIO_FORMATS:
+        logging.error(
+            'Unknown audio_format "%s". Allowed: %s',
+            audio_format,
+            ", ".join(AUDIO_FORMATS),
+        )
+        sys.exit(1)
+
     video_list_file = config["video_list_file"]
     video_metadata_dir = config["video_metadata_dir"]
     audio_dir = config["audio_dir"]
@@ -132,7 +265,7 @@ def main():  # noqa: C901
                 "urls_file must be set in config when using read_youtube_urls"
             )
             sys.exit(1)
-        paths = compute_run_paths(urls_file)
+        paths = resolve_run_dirs(config)
         video_list_file = paths["video_list_file"]
         audio_dir = paths["audio_dir"]
         vocals_dir = paths["vocals_dir"]
@@ -149,34 +282,41 @@ def main():  # noqa: C901
             os.makedirs(d, exist_ok=True)
 
     logging.info("RUN START")
+    ctx = build_context(
+        config,
+        video_list_file=video_list_file,
+        video_metadata_dir=video_metadata_dir,
+        audio_dir=audio_dir,
+        vocals_dir=vocals_dir,
+        subtitles_dir=subtitles_dir,
+        cache_dir=cache_dir,
+        slang_file=slang_file,
+        website_dir=website_dir,
+    )
+
+    # Sweep temp files left by an interrupted run before anything trusts them
+    quarantine_partial_outputs(
+        [video_metadata_dir, audio_dir, vocals_dir, subtitles_dir, cache_dir]
+    )
+
+    # Keep loaded Whisper models resident across videos within these limits
+    max_gb = config.get("whisper_cache_max_gb")
+    whisper_models.configure(
+        max_models=config.get("whisper_cache_models"),
+        max_bytes=int(max_gb * 1024**3) if max_gb else None,
+    )
+
+    # Concurrent downloads start at this many per host and shrink on HTTP 429
+    host_throttle.configure(max_concurrent=config.get("download_host_concurrency"))
 
-    # Execute global steps that come before per-video steps
+    # Optional persistent run state: skip steps whose inputs/outputs are unchanged
+    if config.get("run_state"):
+        ctx["state"] = RunState(os.path.join(cache_dir, "run_state.sqlite"))
+
+    # Source steps produce the video list, so they must finish before anything else
     for s in steps:
-        if s == "google_sheet_read":
-            logging.info("START google_sheet_read")
-            _t0 = time.monotonic()
-            if not google_sheet_read.run_google_sheet_read(
-                spreadsheet=config.get("spreadsheet", ""),
-                worksheet=config.get("worksheet", ""),
-                output=video_list_file,
-                service_account_file=config.get("service_account_file", ""),
-            ):
-                logging.error("google_sheet_read failed, aborting pipeline")
-                logging.info("END google_sheet_read FAIL (%.1fs)", time.monotonic() - _t0)
-                sys.exit(1)
-            logging.info("END google_sheet_read OK (%.1fs)", time.monotonic() - _t0)
-        elif s == "read_youtube_urls":
-            logging.info("START read_youtube_urls")
-            _t0 = time.monotonic()
-            if not read_youtube_urls.run_read_youtube_urls(
-                urls_file=config.get("urls_file", ""), output=video_list_file
-            ):
-                logging.error("read_youtube_urls failed, aborting pipeline")
-                logging.info("END read_youtube_urls FAIL (%.1fs)", time.monotonic() - _t0)
-                sys.exit(1)
-            logging.info("END read_youtube_urls OK (%.1fs)", time.monotonic() - _t0)
-        elif s in allowed_per_video:
-            break
+        if is_source_step(s) and not run_step(s, ctx):
+            sys.exit(1)
 
     # Load video list after potential google_sheet_read
     try:
@@ -184,189 +324,44 @@ def main():  # noqa: C901
     except Exception as e:
         logging.error("Failed to load video list file %s: %s", video_list_file, e)
         sys.exit(1)
+    # Lets batched steps (isolate_vocals) look ahead at the other videos
+    ctx["videos"] = videos
+
+    # Bulk passes (e.g. concurrent metadata fetching) before per-video work
+    for s in steps:
+        if STEP_SPECS[s].prepare is not None:
+            STEP_SPECS[s].prepare(ctx, videos)
 
     # Calculate total number of per-video operations for progress reporting
     per_video_steps_in_run = [s for s in steps if s in allowed_per_video]
     total_ops = len(videos) * len(per_video_steps_in_run)
     current_op = 0
+    progress_lock = threading.Lock()
 
-    # Process per-video steps in the specified order
-    for v in videos:
-        vid = v["v"]
-        for s in steps:
-            if s not in allowed_per_video:
-                continue
-
-            # This is a placeholder for the actual step execution logic
-            step_executed = False
-
-            if s == "fetch_video_metadata":
-                logging.info("START fetch_video_metadata video=%s", vid)
-                _t0 = time.monotonic()
-                if not fetch_video_metadata.run_fetch_video_metadata(
-                    video_id=vid, output_dir=video_metadata_dir
-                ):
-                    logging.error("END fetch_video_metadata video=%s FAIL (%.1fs)", vid, time.monotonic() - _t0)
-                    break
-                logging.info("END fetch_video_metadata video=%s OK (%.1fs)", vid, time.monotonic() - _t0)
-                step_executed = True
-            elif s == "download_audio":
-                logging.info("START download_audio video=%s", vid)
-                _t0 = time.monotonic()
-                if not download_audio.run_download_audio(
-                    url=v.get("youtube_url", f"https://www.youtube.com/watch?v={vid}"),
-                    video_id=vid,
-                    output_dir=audio_dir,
-                ):
-                    logging.error("END download_audio video=%s FAIL (%.1fs)", vid, time.monotonic() - _t0)
-                    break
-                logging.info("END download_audio video=%s OK (%.1fs)", vid, time.monotonic() - _t0)
-                step_executed = True
-            elif s == "isolate_vocals":
-                logging.info("START isolate_vocals video=%s", vid)
-                _t0 = time.monotonic()
-                audio_path = os.path.join(audio_dir, f"{vid}.mp3")
-                if not isolate_vocals.run_isolate_vocals(
-                    input_file=audio_path, output_dir=vocals_dir
-                ):
-                    logging.error("END isolate_vocals video=%s FAIL (%.1fs)", vid, time.monotonic() - _t0)
-                    break
-                logging.info("END isolate_vocals video=%s OK (%.1fs)", vid, time.monotonic() - _t0)
-                step_executed = True
-            elif s == "transcribe_audio":
-                logging.info("START transcribe_audio video=%s", vid)
-                _t0 = time.monotonic()
-                # Prefer isolated vocals if available; fall back to original audio
-                vocals_path = os.path.join(vocals_dir, vid, "vocals.wav")
-                input_audio = (
-                    vocals_path
-                    if os.path.exists(vocals_path)
-                    else os.path.join(audio_dir, f"{vid}.mp3")
-                )
-                kr_srt = os.path.join(subtitles_dir, f"kr_{vid}.srt")
-
-                provider = config.get("transcription_provider", "local")
-
-                if not transcribe_audio.run_transcribe_audio(
-                    audio_path=input_audio,
-                    output_subtitle=kr_srt,
-                    provider=provider,
-                    model_size=(
-                        config.get("transcription_model_size", "large")
-                        if provider == "local"
-                        else None
-                    ),
-                    api_model=(
-                        config.get("transcription_api_model", "whisper-1")
-                        if provider == "openai"
-                        else None
-                    ),
-                ):
-                    logging.error("END transcribe_audio video=%s FAIL (%.1fs)", vid, time.monotonic() - _t0)
-                    break
-                logging.info("END transcribe_audio video=%s OK (%.1fs)", vid, time.monotonic() - _t0)
-                step_executed = True
-            elif s == "normalize_srt":
-                logging.info("START normalize_srt video=%s", vid)
-                _t0 = time.monotonic()
-                kr_srt = os.path.join(subtitles_dir, f"kr_{vid}.srt")
-                if not normalize_srt.run_normalize_srt(
-                    input_file=kr_srt, output_file=kr_srt
-                ):
-                    logging.error("END normalize_srt video=%s FAIL (%.1fs)", vid, time.monotonic() - _t0)
-                    break
-                logging.info("END normalize_srt video=%s OK (%.1fs)", vid, time.monotonic() - _t0)
-                step_executed = True
-            elif s == "translate_subtitles":
-                logging.info("START translate_subtitles video=%s", vid)
-                _t0 = time.monotonic()
-                kr_srt = os.path.join(subtitles_dir, f"kr_{vid}.srt")
-                en_srt = os.path.join(subtitles_dir, f"en_{vid}.srt")
-                if not translate_subtitles.run_translate_subtitles(
-                    input_file=kr_srt,
-                    output_file=en_srt,
-                    slang_file=slang_file,
-                    cache_dir=cache_dir,
-                ):
-                    logging.error("END translate_subtitles video=%s FAIL (%.1fs)", vid, time.monotonic() - _t0)
-                    break
-                logging.info("END translate_subtitles video=%s OK (%.1fs)", vid, time.monotonic() - _t0)
-                step_executed = True
-            elif s == "translate_title":
-                logging.info("START translate_title video=%s", vid)
-                _t0 = time.monotonic()
-                if not translate_title.run_translate_title(
-                    video_id=vid, metadata_dir=video_metadata_dir, cache_dir=cache_dir
-                ):
-                    logging.error("END translate_title video=%s FAIL (%.1fs)", vid, time.monotonic() - _t0)
-                    break
-                logging.info("END translate_title video=%s OK (%.1fs)", vid, time.monotonic() - _t0)
-                step_executed = True
-            elif s == "upload_subtitles":
-                logging.info("START upload_subtitles video=%s", vid)
-                _t0 = time.monotonic()
-                en_srt = os.path.join(subtitles_dir, f"en_{vid}.srt")
-                if not upload_subtitles.run_upload_subtitles(
-                    input_file=en_srt, cache_dir=cache_dir
-                ):
-                    logging.error("END upload_subtitles video=%s FAIL (%.1fs)", vid, time.monotonic() - _t0)
-                    break
-                logging.info("END upload_subtitles video=%s OK (%.1fs)", vid, time.monotonic() - _t0)
-                step_executed = True
+    def report_progress(_step, _video):
+        nonlocal current_op
+        with progress_lock:
+            current_op += 1
+            # Use a print statement that is distinct from logging
+            print(f"PROGRESS:{current_op}/{total_ops}", flush=True)  # noqa: T201
 
-            if step_executed:
-                current_op += 1
-                # Use a print statement that is distinct from logging
-                print(f"PROGRESS:{current_op}/{total_ops}")  # noqa: T201
-
-    # Prepare enriched videos path
-    enriched_videos = os.path.join(
-        os.path.dirname(os.path.abspath(video_list_file)), "videos_enriched.json"
-    )
-
-    # Execute remaining global steps in order
-    for s in steps:
-        if s == "google_sheet_write":
-            logging.info("START google_sheet_write")
-            _t0 = time.monotonic()
-            if not google_sheet_write.run_google_sheet_write(
-                video_list_file=video_list_file,
-                cache_dir=cache_dir,
-                spreadsheet=config.get("spreadsheet", ""),
-                worksheet=config.get("worksheet", ""),
-                column_name=config.get("sheet_column", ""),
-                service_account_file=config.get("service_account_file", ""),
-            ):
-                logging.error("google_sheet_write failed")
-            logging.info("END google_sheet_write OK (%.1fs)", time.monotonic() - _t0)
-        elif s == "build_videos_json":
-            logging.info("START build_videos_json")
-            _t0 = time.monotonic()
-            if not build_videos_json.run_build_videos_json(
-                video_list_file=video_list_file,
-                metadata_dir=video_metadata_dir,
-                cache_dir=cache_dir,
-                output=enriched_videos,
-            ):
-                logging.error("build_videos_json failed")
-            logging.info("END build_videos_json OK (%.1fs)", time.monotonic() - _t0)
-        elif s == "manifest_builder":
-            logging.info("START manifest_builder")
-            _t0 = time.monotonic()
-            manifest_out = os.path.join(website_dir, "subtitles.json")
-            # Use enriched videos list if it has been built in this run
-            videos_input = (
-                enriched_videos if "build_videos_json" in steps else video_list_file
-            )
-            if not manifest_builder.run_manifest_builder(
-                video_list_file=videos_input,
-                subtitles_dir=subtitles_dir,
-                output_file=manifest_out,
-                details_dir=video_metadata_dir,
-            ):
-                logging.error("manifest_builder failed")
-            logging.info("END manifest_builder OK (%.1fs)", time.monotonic() - _t0)
+    if concurrency:
+        logging.info("Concurrent scheduling with workers: %s", concurrency)
+        run_dag(steps, videos, ctx, concurrency, report_progress)
+    else:
+        # Process per-video steps in the specified order, then global steps.
+        # A failed step ends that video's steps
+        for v in videos:
+            for s in per_video_steps_in_run:
+                if not run_step(s, ctx, v):
+                    break
+                report_progress(s, v)
+        for s in steps:
+            if s not in allowed_per_video and not is_source_step(s):
+                run_step(s, ctx)
 
+    if ctx.get("state") is not None:
+        ctx["state"].close()
     logging.info("RUN END")
 
 
@@ -0,0 +1,104 @@
+import logging
+import threading
+from collections.abc import Hashable
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+
+def run_graph(  # noqa: C901
+    graph: dict,
+    run_node: Callable[[Hashable], bool],
+    pool_of: Callable[[Hashable], str],
+    workers: dict,
+    on_node_done: Optional[Callable[[Hashable], None]] = None,
+    skip: Optional[Callable[[Hashable], bool]] = None,
+) -> dict:
+    """Execute a dependency graph of nodes on bounded per-pool worker threads.
+
+    - ``graph`` maps node key to a list of ``(dep_key, strict)`` pairs. A node
+      runs once all its dependencies have finished; if a strict dependency
+      failed (or was skipped) the node is skipped too. Insertion order is the
+      submission priority when several nodes become ready together.
+    - ``run_node(key)`` executes one node and returns True on success.
+    - ``pool_of(key)`` names the worker pool for a node; ``workers`` maps pool
+      names to sizes (unlisted pools get one worker).
+    - ``on_node_done(key)`` is called after every successful node.
+    - ``skip(key)`` is asked when a node is about to start; a true result
+      marks it skipped without running it.
+
+    Returns a dict mapping each key to ``"ok"``, ``"failed"`` or ``"skipped"``.
+    """
+    status: dict = {}
+    if not graph:
+        return status
+
+    dependents: dict = {k: [] for k in graph}
+    waiting = {}
+    blocked = dict.fromkeys(graph, False)
+    for key, deps in graph.items():
+        waiting[key] = len(deps)
+        for dep, strict in deps:
+            dependents[dep].append((key, strict))
+
+    pools: dict = {}
+    lock = threading.Lock()
+    done = threading.Event()
+
+    def pool(name: str) -> ThreadPoolExecutor:
+        if name not in pools:
+            pools[name] = ThreadPoolExecutor(
+                max_workers=max(1, int(workers.get(name, 1))),
+                thread_name_prefix=str(name),
+            )
+        return pools[name]
+
+    def complete(key, result: str):
+        # Resolve this node and anything that becomes ready (or skipped) because of it
+        ready = []
+        with lock:
+            stack = [(key, result)]
+            while stack:
+                k, res = stack.pop()
+                status[k] = res
+                for child, strict in dependents[k]:
+                    if strict and res != "ok":
+                        blocked[child] = True
+                    waiting[child] -= 1
+                    if waiting[child] == 0:
+                        if blocked[child]:
+                            stack.append((child, "skipped"))
+                        else:
+                            ready.append(child)
+            if len(status) == len(graph):
+                done.set()
+        for k in sorted(ready, key=order.__getitem__):
+            pool(pool_of(k)).submit(execute, k)
+
+    def execute(key):
+        if skip is not None and skip(key):
+            complete(key, "skipped")
+            return
+        try:
+            ok = run_node(key)
+            if ok and on_node_done:
+                on_node_done(key)
+        except Exception as e:
+            logging.error("Node %s crashed: %s", key, e)
+            ok = False
+        complete(key, "ok" if ok else "failed")
+
+    order = {k: i for i, k in enumerate(graph)}
+    try:
+        with lock:
+            roots = [k for k in graph if waiting[k] == 0]
+            for k in roots:
+                pool(pool_of(k)).submit(execute, k)
+        done.wait()
+    except BaseException:
+        for p in list(pools.values()):
+            p.shutdown(wait=False, cancel_futures=True)
+        raise
+    for p in list(pools.values()):
+        p.shutdown(wait=True)
+    return status
+
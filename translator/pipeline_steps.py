@@ -0,0 +1,652 @@
+"""Declarative registry of pipeline steps and their artifacts.
+
+Each step declares the artifacts it reads and writes plus the resource class
+it mostly consumes. The orchestrator derives execution order and concurrency
+from these declarations instead of hard-coding per-step branches.
+"""
+import json
+import logging
+import os
+import threading
+from typing import Callable, Optional
+
+import audio_fingerprint
+import build_videos_json
+import download_audio
+import fetch_video_metadata
+import google_sheet_read
+import google_sheet_write
+import isolate_vocals
+import manifest_builder
+import normalize_srt
+import read_youtube_urls
+import transcribe_audio
+import translate_subtitles
+import translate_title
+import translation_cache
+import upload_subtitles
+
+# Resource classes used to bound concurrency across steps
+NETWORK = "network"
+CPU = "cpu"
+GPU = "gpu"
+LLM = "llm"
+RESOURCE_CLASSES = (NETWORK, CPU, GPU, LLM)
+
+PER_VIDEO = "per_video"
+GLOBAL = "global"
+
+
+def artifact_path(ctx: dict, name: str, vid: Optional[str] = None) -> str:  # noqa: C901
+    """Return the on-disk location of artifact ``name`` for video ``vid``.
+
+    ``ctx`` holds the resolved run directories (see ``build_context``).
+    """
+    if name == "video_list":
+        return ctx["video_list_file"]
+    if name == "videos_enriched":
+        return ctx["enriched_videos"]
+    if name == "manifest":
+        return os.path.join(ctx["website_dir"], "subtitles.json")
+    if name == "metadata":
+        return os.path.join(ctx["video_metadata_dir"], f"{vid}.json")
+    if name == "title_en":
+        return os.path.join(ctx["cache_dir"], f"title_{vid}.json")
+    if name == "audio":
+        return download_audio.audio_file(
+            ctx["audio_dir"], vid, ctx["config"].get("audio_format", "mp3")
+        )
+    if name == "vocals":
+        return os.path.join(ctx["vocals_dir"], vid, "vocals.wav")
+    if name == "kr_srt":
+        return os.path.join(ctx["subtitles_dir"], f"kr_{vid}.srt")
+    if name == "en_srt":
+        return os.path.join(ctx["subtitles_dir"], f"en_{vid}.srt")
+    if name == "slang":
+        return ctx["slang_file"]
+    if name == "pastebin_url":
+        return os.path.join(ctx["cache_dir"], f"pastebin_{vid}.json")
+    if name == "duplicate":
+        return os.path.join(ctx["cache_dir"], f"duplicate_{vid}.json")
+    raise KeyError(f"Unknown artifact: {name}")
+
+
+def build_context(config: dict, **paths: str) -> dict:
+    """Bundle the config and resolved run paths handed to every step."""
+    ctx = dict(paths)
+    ctx["config"] = config
+    ctx["steps"] = list(config.get("steps") or [])
+    ctx.setdefault(
+        "enriched_videos",
+        os.path.join(
+            os.path.dirname(os.path.abspath(ctx["video_list_file"])),
+            "videos_enriched.json",
+        ),
+    )
+    return ctx
+
+
+class StepSpec:
+    """Declarative description of a single pipeline step."""
+
+    def __init__(
+        self,
+        name: str,
+        scope: str,
+        resource: str,
+        inputs: tuple,
+        outputs: tuple,
+        run: Callable[..., bool],
+        fatal: bool = False,
+        params: Optional[Callable[[dict], dict]] = None,
+        prepare: Optional[Callable[[dict, list], None]] = None,
+    ):
+        self.name = name
+        self.scope = scope
+        self.resource = resource
+        self.inputs = inputs
+        self.outputs = outputs
+        self.run = run
+        # A failing fatal step aborts the whole pipeline
+        self.fatal = fatal
+        # Settings that change the step's outputs, recorded by the run-state store
+        self.params = params or (lambda ctx: {})
+        # Optional bulk pass over the whole video list before per-video runs
+        self.prepare = prepare
+
+    @property
+    def per_video(self) -> bool:
+        """Return True if the step runs once per video."""
+        return self.scope == PER_VIDEO
+
+
+# --- Per-video steps -------------------------------------------------------
+
+
+def _metadata_options(ctx: dict) -> dict:
+    config = ctx["config"]
+    return {
+        "extra_fields": tuple(config.get("metadata_extra_fields") or ()),
+        "keep_raw": bool(config.get("metadata_keep_raw", False)),
+    }
+
+
+def _run_fetch_video_metadata(ctx: dict, v: dict) -> bool:
+    return fetch_video_metadata.run_fetch_video_metadata(
+        video_id=v["v"], output_dir=ctx["video_metadata_dir"], **_metadata_options(ctx)
+    )
+
+
+def _prefetch_video_metadata(ctx: dict, videos: list) -> None:
+    fetch_video_metadata.run_fetch_video_metadata_bulk(
+        [v["v"] for v in videos],
+        ctx["video_metadata_dir"],
+        max_workers=ctx["config"].get("metadata_concurrency", 4),
+        **_metadata_options(ctx),
+    )
+
+
+def _translation_params(ctx: dict) -> dict:
+    config = ctx["config"]
+    return {
+        "model": config.get("translation_model", "gpt-4.1-mini"),
+        "chunk_size": config.get("translation_chunk_size", 50),
+        "overlap": config.get("translation_overlap", 5),
+    }
+
+
+def _transcription_params(ctx: dict) -> dict:
+    config = ctx["config"]
+    provider = config.get("transcription_provider", "local")
+    return {
+        "provider": provider,
+        "model_size": (
+            config.get("transcription_model_size", "large")
+            if provider in ("local", "worker")
+            else None
+        ),
+        "api_model": (
+            config.get("transcription_api_model", "whisper-1")
+            if provider == "openai"
+            else None
+        ),
+    }
+
+
+def _transcription_fingerprint(ctx: dict) -> dict:
+    # The worker runs the same local Whisper, so switching between them is not a change
+    params = _transcription_params(ctx)
+    if params["provider"] == "worker":
+        params["provider"] = "local"
+    # Only non-default modes are recorded so existing fingerprints stay valid
+    segment_mode = ctx["config"].get("transcription_segment_mode", "fixed")
+    if params["provider"] == "openai" and segment_mode != "fixed":
+        params["segment_mode"] = segment_mode
+    vad = ctx["config"].get("transcription_vad")
+    if vad:
+        # Custom thresholds are part of the fingerprint; plain true stays as before
+        params["vad"] = vad if isinstance(vad, dict) else True
+    segment_time = ctx["config"].get("transcription_segment_seconds", 600)
+    if params["provider"] == "openai" and segment_time != 600:
+        params["segment_time"] = segment_time
+    return params
+
+
+def _run_translate_title(ctx: dict, v: dict) -> bool:
+    return translate_title.run_translate_title(
+        video_id=v["v"],
+        metadata_dir=ctx["video_metadata_dir"],
+        cache_dir=ctx["cache_dir"],
+        model=_translation_params(ctx)["model"],
+    )
+
+
+def _saved_info(ctx: dict, vid: str) -> Optional[dict]:
+    """Return the yt-dlp info dict saved by ``fetch_video_metadata``, if any."""
+    try:
+        with open(artifact_path(ctx, "metadata", vid), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _run_download_audio(ctx: dict, v: dict) -> bool:
+    vid = v["v"]
+    audio = artifact_path(ctx, "audio", vid)
+    ok = download_audio.run_download_audio(
+        url=v.get("youtube_url", f"https://www.youtube.com/watch?v={vid}"),
+        video_id=vid,
+        output_dir=ctx["audio_dir"],
+        info=None if os.path.exists(audio) else _saved_info(ctx, vid),
+        audio_format=ctx["config"].get("audio_format", "mp3"),
+        fragments=int(ctx["config"].get("download_fragment_concurrency", 1)),
+    )
+    if ok:
+        ctx.setdefault("audio_ready", set()).add(vid)
+    return ok
+
+
+def _run_fingerprint_audio(ctx: dict, v: dict) -> bool:
+    vid = v["v"]
+    return audio_fingerprint.run_fingerprint_audio(
+        audio_path=artifact_path(ctx, "audio", vid),
+        video_id=vid,
+        subtitles_dir=ctx["subtitles_dir"],
+        cache_dir=ctx["cache_dir"],
+        index_path=ctx["config"].get("fingerprint_index"),
+    )
+
+
+def _derived_duplicate(ctx: dict, vid: str) -> bool:
+    """Return True if ``fingerprint_audio`` derived the subtitles from another video."""
+    try:
+        with open(artifact_path(ctx, "duplicate", vid), encoding="utf-8") as f:
+            return bool(json.load(f).get("derived"))
+    except (OSError, ValueError):
+        return False
+
+
+# One Demucs process at a time; a waiting worker usually finds its video done
+_isolate_lock = threading.Lock()
+
+
+def _isolation_batch(ctx: dict, vid: str) -> list:
+    """Audio of ``vid`` plus other videos of the run still waiting for isolation.
+
+    Only finished downloads are picked up, so a batch never reads an mp3 that
+    is still being written, and videos whose subtitles ``fingerprint_audio``
+    derived from a duplicate are left out. ``isolate_batch_size`` caps the batch.
+    """
+    batch = [artifact_path(ctx, "audio", vid)]
+    limit = int(ctx["config"].get("isolate_batch_size", 8))
+    downloading = "download_audio" in ctx["steps"]
+    ready = ctx.get("audio_ready", set())
+    for other in ctx.get("videos", []):
+        if len(batch) >= limit:
+            break
+        ovid = other["v"]
+        if ovid == vid or (downloading and ovid not in ready):
+            continue
+        audio = artifact_path(ctx, "audio", ovid)
+        if (
+            os.path.exists(audio)
+            and not os.path.exists(artifact_path(ctx, "vocals", ovid))
+            and not _derived_duplicate(ctx, ovid)
+            and not _isolation_skipped(ctx, ovid)
+        ):
+            batch.append(audio)
+    return batch
+
+
+def _isolation_params(ctx: dict) -> dict:
+    # Only non-default settings are recorded so existing fingerprints stay valid
+    config = ctx["config"]
+    params = {}
+    if config.get("isolate_window_seconds"):
+        params["window_seconds"] = config["isolate_window_seconds"]
+    if config.get("isolate_auto_skip"):
+        params["auto_skip"] = {
+            **isolate_vocals.DEFAULT_SKIP_THRESHOLDS,
+            **(config.get("isolate_skip_thresholds") or {}),
+        }
+    return params
+
+
+def _isolation_skipped(ctx: dict, vid: str) -> bool:
+    """Return True if ``isolate_auto_skip`` judged Demucs useless for this video."""
+    config = ctx["config"]
+    audio = artifact_path(ctx, "audio", vid)
+    if not config.get("isolate_auto_skip") or not os.path.exists(audio):
+        return False
+    decision = isolate_vocals.assess_isolation(
+        audio, ctx["vocals_dir"], config.get("isolate_skip_thresholds")
+    )
+    return not decision["isolate"]
+
+
+def _run_isolate_vocals(ctx: dict, v: dict) -> bool:
+    vid = v["v"]
+    if _derived_duplicate(ctx, vid):
+        logging.info(f"Skipping vocal isolation for {vid}: subtitles reused")
+        return True
+    if not os.path.exists(artifact_path(ctx, "vocals", vid)) and _isolation_skipped(
+        ctx, vid
+    ):
+        # transcribe_audio falls back to the original audio
+        logging.info(f"Skipping vocal isolation for {vid}: not needed")
+        return True
+    batch = _isolation_batch(ctx, vid)
+    with _isolate_lock:
+        results = isolate_vocals.run_isolate_vocals_batch(
+            batch,
+            output_dir=ctx["vocals_dir"],
+            window_seconds=ctx["config"].get("isolate_window_seconds"),
+        )
+    return results[batch[0]]
+
+
+def _run_transcribe_audio(ctx: dict, v: dict) -> bool:
+    vid = v["v"]
+    # Prefer isolated vocals if available; fall back to original audio
+    vocals_path = artifact_path(ctx, "vocals", vid)
+    input_audio = (
+        vocals_path
+        if os.path.exists(vocals_path)
+        else artifact_path(ctx, "audio", vid)
+    )
+    return transcribe_audio.run_transcribe_audio(
+        audio_path=input_audio,
+        output_subtitle=artifact_path(ctx, "kr_srt", vid),
+        worker_url=ctx["config"].get("transcription_worker_url"),
+        max_in_flight=ctx["config"].get("transcription_max_in_flight", 4),
+        segment_mode=ctx["config"].get("transcription_segment_mode", "fixed"),
+        segment_time=ctx["config"].get("transcription_segment_seconds", 600),
+        vad=ctx["config"].get("transcription_vad", False),
+        **_transcription_params(ctx),
+    )
+
+
+def _subtitle_filter(ctx: dict) -> Optional[dict]:
+    # true for the default thresholds, or a dict overriding some of them
+    options = ctx["config"].get("subtitle_filter")
+    if not options:
+        return None
+    return options if isinstance(options, dict) else {}
+
+
+def _run_normalize_srt(ctx: dict, v: dict) -> bool:
+    vid = v["v"]
+    kr_srt = artifact_path(ctx, "kr_srt", vid)
+    return normalize_srt.run_normalize_srt(
+        input_file=kr_srt,
+        output_file=kr_srt,
+        filter_options=_subtitle_filter(ctx),
+        report_file=os.path.join(ctx["cache_dir"], f"filter_{vid}.json"),
+    )
+
+
+def _normalize_params(ctx: dict) -> dict:
+    options = _subtitle_filter(ctx)
+    return {} if options is None else {"filter": options}
+
+
+def _run_translate_subtitles(ctx: dict, v: dict) -> bool:
+    vid = v["v"]
+    if _derived_duplicate(ctx, vid) and os.path.exists(
+        artifact_path(ctx, "en_srt", vid)
+    ):
+        logging.info(f"Skipping translation for {vid}: subtitles reused")
+        return True
+    return translate_subtitles.run_translate_subtitles(
+        input_file=artifact_path(ctx, "kr_srt", vid),
+        output_file=artifact_path(ctx, "en_srt", vid),
+        slang_file=ctx["slang_file"],
+        cache_dir=ctx["cache_dir"],
+        concurrency=ctx["config"].get("translation_concurrency", 4),
+        cache_max_bytes=translation_cache.config_max_bytes(ctx["config"]),
+        **_translation_params(ctx),
+    )
+
+
+def _run_upload_subtitles(ctx: dict, v: dict) -> bool:
+    return upload_subtitles.run_upload_subtitles(
+        input_file=artifact_path(ctx, "en_srt", v["v"]), cache_dir=ctx["cache_dir"]
+    )
+
+
+# --- Global steps ----------------------------------------------------------
+
+
+def _run_google_sheet_read(ctx: dict) -> bool:
+    config = ctx["config"]
+    return google_sheet_read.run_google_sheet_read(
+        spreadsheet=config.get("spreadsheet", ""),
+        worksheet=config.get("worksheet", ""),
+        output=ctx["video_list_file"],
+        service_account_file=config.get("service_account_file", ""),
+    )
+
+
+def _run_read_youtube_urls(ctx: dict) -> bool:
+    return read_youtube_urls.run_read_youtube_urls(
+        urls_file=ctx["config"].get("urls_file", ""), output=ctx["video_list_file"]
+    )
+
+
+def _run_google_sheet_write(ctx: dict) -> bool:
+    config = ctx["config"]
+    return google_sheet_write.run_google_sheet_write(
+        video_list_file=ctx["video_list_file"],
+        cache_dir=ctx["cache_dir"],
+        spreadsheet=config.get("spreadsheet", ""),
+        worksheet=config.get("worksheet", ""),
+        column_name=config.get("sheet_column", ""),
+        service_account_file=config.get("service_account_file", ""),
+    )
+
+
+def _run_build_videos_json(ctx: dict) -> bool:
+    return build_videos_json.run_build_videos_json(
+        video_list_file=ctx["video_list_file"],
+        metadata_dir=ctx["video_metadata_dir"],
+        cache_dir=ctx["cache_dir"],
+        output=ctx["enriched_videos"],
+    )
+
+
+def _run_manifest_builder(ctx: dict) -> bool:
+    # Use enriched videos list if it has been built in this run
+    videos_input = (
+        ctx["enriched_videos"]
+        if "build_videos_json" in ctx["steps"]
+        else ctx["video_list_file"]
+    )
+    return manifest_builder.run_manifest_builder(
+        video_list_file=videos_input,
+        subtitles_dir=ctx["subtitles_dir"],
+        output_file=artifact_path(ctx, "manifest"),
+        details_dir=ctx["video_metadata_dir"],
+        incremental=bool(ctx["config"].get("manifest_incremental", True)),
+        shard_by=ctx["config"].get("manifest_shard_by"),
+        # Build state stays out of the published website folder
+        state_file=os.path.join(ctx["cache_dir"], "manifest_state.json"),
+    )
+
+
+def _manifest_params(ctx: dict) -> dict:
+    # Only sharding changes what the step writes
+    shard_by = ctx["config"].get("manifest_shard_by")
+    return {"shard_by": shard_by} if shard_by else {}
+
+
+STEP_SPECS = {
+    spec.name: spec
+    for spec in (
+        StepSpec(
+            "fetch_video_metadata",
+            PER_VIDEO,
+            NETWORK,
+            inputs=(),
+            outputs=("metadata",),
+            run=_run_fetch_video_metadata,
+            prepare=_prefetch_video_metadata,
+        ),
+        StepSpec(
+            "translate_title",
+            PER_VIDEO,
+            LLM,
+            inputs=("metadata",),
+            outputs=("title_en",),
+            run=_run_translate_title,
+            params=lambda ctx: {"model": _translation_params(ctx)["model"]},
+        ),
+        StepSpec(
+            "download_audio",
+            PER_VIDEO,
+            NETWORK,
+            inputs=(),
+            outputs=("audio",),
+            run=_run_download_audio,
+        ),
+        StepSpec(
+            "fingerprint_audio",
+            PER_VIDEO,
+            CPU,
+            inputs=("audio",),
+            outputs=("kr_srt", "en_srt", "duplicate"),
+            run=_run_fingerprint_audio,
+        ),
+        StepSpec(
+            "isolate_vocals",
+            PER_VIDEO,
+            GPU,
+            inputs=("audio", "duplicate"),
+            outputs=("vocals",),
+            run=_run_isolate_vocals,
+            params=_isolation_params,
+        ),
+        StepSpec(
+            "transcribe_audio",
+            PER_VIDEO,
+            GPU,
+            inputs=("audio", "vocals"),
+            outputs=("kr_srt",),
+            run=_run_transcribe_audio,
+            params=_transcription_fingerprint,
+        ),
+        StepSpec(
+            "normalize_srt",
+            PER_VIDEO,
+            CPU,
+            inputs=("kr_srt",),
+            outputs=("kr_srt",),
+            run=_run_normalize_srt,
+            params=_normalize_params,
+        ),
+        StepSpec(
+            "translate_subtitles",
+            PER_VIDEO,
+            LLM,
+            inputs=("kr_srt", "slang", "duplicate"),
+            outputs=("en_srt",),
+            run=_run_translate_subtitles,
+            params=_translation_params,
+        ),
+        StepSpec(
+            "upload_subtitles",
+            PER_VIDEO,
+            NETWORK,
+            inputs=("en_srt",),
+            outputs=("pastebin_url",),
+            run=_run_upload_subtitles,
+        ),
+        StepSpec(
+            "google_sheet_read",
+            GLOBAL,
+            NETWORK,
+            inputs=(),
+            outputs=("video_list",),
+            run=_run_google_sheet_read,
+            fatal=True,
+        ),
+        StepSpec(
+            "read_youtube_urls",
+            GLOBAL,
+            CPU,
+            inputs=(),
+            outputs=("video_list",),
+            run=_run_read_youtube_urls,
+            fatal=True,
+        ),
+        StepSpec(
+            "google_sheet_write",
+            GLOBAL,
+            NETWORK,
+            inputs=("video_list", "pastebin_url"),
+            outputs=(),
+            run=_run_google_sheet_write,
+        ),
+        StepSpec(
+            "build_videos_json",
+            GLOBAL,
+            CPU,
+            inputs=("video_list", "metadata", "title_en"),
+            outputs=("videos_enriched",),
+            run=_run_build_videos_json,
+        ),
+        StepSpec(
+            "manifest_builder",
+            GLOBAL,
+            CPU,
+            inputs=("video_list", "videos_enriched", "en_srt", "metadata"),
+            outputs=("manifest",),
+            run=_run_manifest_builder,
+            params=_manifest_params,
+        ),
+    )
+}
+
+
+def is_source_step(name: str) -> bool:
+    """Return True if the step produces the video list itself."""
+    return "video_list" in STEP_SPECS[name].outputs
+
+
+def in_place_rewriters(name: str) -> list:
+    """Return the steps that rewrite in place an artifact ``name`` writes anew."""
+    spec = STEP_SPECS[name]
+    written = set(spec.outputs) - set(spec.inputs)
+    return [
+        other.name
+        for other in STEP_SPECS.values()
+        if other.name != name and written & set(other.inputs) & set(other.outputs)
+    ]
+
+
+def step_dependencies(steps: list) -> dict:
+    """Map each step to the earlier steps it depends on.
+
+    Step B depends on an earlier step A when A writes an artifact that B reads
+    or also writes. The configured order breaks ties, so steps that touch
+    unrelated artifacts (e.g. ``translate_title`` and ``download_audio``) are
+    independent and may overlap.
+    """
+    deps = {}
+    for j, b in enumerate(steps):
+        spec_b = STEP_SPECS[b]
+        touched = set(spec_b.inputs) | set(spec_b.outputs)
+        deps[b] = [a for a in steps[:j] if touched & set(STEP_SPECS[a].outputs)]
+    return deps
+
+
+def build_step_graph(steps: list, videos: list) -> dict:
+    """Expand configured steps into a node graph for ``run_graph``.
+
+    Keys are ``(step, video_index)`` for per-video steps and ``(step, None)``
+    for global steps. Each node lists ``(dep_key, strict)`` pairs: a strict
+    dependency must succeed (a failed step skips what builds on it for that
+    video), while a global step only waits for per-video producers to finish.
+    Source steps are excluded; they must run before the video list is known.
+    """
+    deps = step_dependencies(steps)
+    graph = {}
+    for name in steps:
+        if is_source_step(name):
+            continue
+        spec = STEP_SPECS[name]
+        producers = [a for a in deps[name] if not is_source_step(a)]
+        keys = (
+            [(name, i) for i in range(len(videos))] if spec.per_video else [(name, None)]
+        )
+        for key in keys:
+            node_deps = []
+            for a in producers:
+                if STEP_SPECS[a].per_video and spec.per_video:
+                    node_deps.append(((a, key[1]), True))
+                elif STEP_SPECS[a].per_video:
+                    node_deps.extend(((a, i), False) for i in range(len(videos)))
+                else:
+                    node_deps.append(((a, None), spec.per_video))
+            graph[key] = node_deps
+    return graph
+
@@ -1,9 +1,10 @@
-import json
 import logging
 import os
 import re
 from urllib.parse import parse_qs, urlparse
 
+from artifacts import write_json_atomic
+
 
 def extract_video_id(url: str) -> str:
     """Extract a YouTube video ID from a variety of URL formats."""
@@ -56,8 +57,7 @@ def run_read_youtube_urls(urls_file: str, output: str) -> bool:
                 seen.add(vid)
                 items.append({"v": vid, "youtube_url": line})
         os.makedirs(os.path.dirname(output), exist_ok=True)
-        with open(output, "w", encoding="utf-8") as f:
-            json.dump(items, f, ensure_ascii=False, indent=2)
+        write_json_atomic(output, items, ensure_ascii=False, indent=2)
         return True
     except Exception as e:
         logging.error("Error in read_youtube_urls: %s", e)
@@ -27,3 +27,28 @@ def compute_run_paths(urls_file: str) -> dict:
         "subtitles_dir": os.path.join(run_root, "subtitles"),
         "cache_dir": os.path.join(run_root, ".cache"),
     }
+
+
+def resolve_run_dirs(config: dict) -> dict:
+    """Return the pipeline directories a config resolves to.
+
+    Mirrors the orchestrator: the dirs come from the config, except that the
+    URL-list workflow (``read_youtube_urls`` with ``urls_file``) moves the
+    video list, audio, vocals, subtitles and cache into the per-run folder.
+    """
+    keys = (
+        "video_list_file",
+        "video_metadata_dir",
+        "audio_dir",
+        "vocals_dir",
+        "subtitles_dir",
+        "cache_dir",
+        "slang_file",
+        "website_dir",
+    )
+    dirs = {k: config.get(k) for k in keys}
+    if "read_youtube_urls" in config.get("steps", []) and config.get("urls_file"):
+        paths = compute_run_paths(config["urls_file"])
+        for k in ("video_list_file", "audio_dir", "vocals_dir", "subtitles_dir", "cache_dir"):
+            dirs[k] = paths[k]
+    return dirs
@@ -0,0 +1,207 @@
+"""Persistent run-state store for content-addressed skip decisions.
+
+Records, per ``(video, step)``, the hashes of the step's inputs, its
+parameters, the hashes of its outputs and how long it took. A step is only
+skipped when the recorded fingerprint still matches the files on disk, so
+truncated outputs and changed inputs are reprocessed instead of silently
+counting as done.
+"""
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+FRESH = "fresh"
+STALE = "stale"
+UNKNOWN = "unknown"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS step_runs (
+    video_id TEXT NOT NULL,
+    step TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    inputs TEXT NOT NULL,
+    params TEXT NOT NULL,
+    outputs TEXT NOT NULL,
+    duration REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (video_id, step)
+);
+CREATE TABLE IF NOT EXISTS file_hashes (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    sha256 TEXT NOT NULL
+);
+"""
+
+
+def _sha256_file(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+class RunState:
+    """SQLite-backed record of completed per-video step executions.
+
+    All records are loaded with one query per table when the store is opened,
+    so skip decisions for a large video list only cost a ``stat`` per file.
+    File contents are re-hashed only when size or mtime changed.
+    """
+
+    def __init__(self, db_path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+        self._runs = {
+            (vid, step): {"fingerprint": fp, "outputs": json.loads(outputs)}
+            for vid, step, fp, outputs in self._conn.execute(
+                "SELECT video_id, step, fingerprint, outputs FROM step_runs"
+            )
+        }
+        self._hashes = {
+            path: (size, mtime_ns, digest)
+            for path, size, mtime_ns, digest in self._conn.execute(
+                "SELECT path, size, mtime_ns, sha256 FROM file_hashes"
+            )
+        }
+
+    def close(self) -> None:
+        """Close the underlying database connection."""
+        with self._lock:
+            self._conn.close()
+
+    def file_digest(self, path: str) -> Optional[str]:
+        """Return the SHA-256 of ``path``, or None if it is missing or empty.
+
+        Digests are memoized by ``(path, size, mtime_ns)``.
+        """
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        if st.st_size == 0:
+            return None
+        key = os.path.abspath(path)
+        with self._lock:
+            cached = self._hashes.get(key)
+        if cached and cached[0] == st.st_size and cached[1] == st.st_mtime_ns:
+            return cached[2]
+        digest = _sha256_file(path)
+        with self._lock:
+            self._hashes[key] = (st.st_size, st.st_mtime_ns, digest)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO file_hashes VALUES (?, ?, ?, ?)",
+                (key, st.st_size, st.st_mtime_ns, digest),
+            )
+            self._conn.commit()
+        return digest
+
+    def fingerprint(self, inputs: dict, params: dict) -> tuple:
+        """Return ``(fingerprint, input_digests)`` for input paths and parameters."""
+        digests = {name: self.file_digest(path) for name, path in sorted(inputs.items())}
+        payload = json.dumps({"inputs": digests, "params": params}, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest(), digests
+
+    def check(self, video_id: str, step: str, fingerprint: str, outputs: dict) -> str:
+        """Classify a pending step as ``FRESH``, ``STALE`` or ``UNKNOWN``.
+
+        ``UNKNOWN`` means no record exists yet (e.g. outputs from before the
+        store was enabled); the step's own skip logic decides in that case.
+        """
+        with self._lock:
+            rec = self._runs.get((video_id, step))
+        if rec is None:
+            return UNKNOWN
+        if rec["fingerprint"] != fingerprint:
+            return STALE
+        for name, path in outputs.items():
+            if self.file_digest(path) != rec["outputs"].get(name):
+                return STALE
+        return FRESH
+
+    def record(
+        self,
+        video_id: str,
+        step: str,
+        fingerprint: str,
+        input_digests: dict,
+        params: dict,
+        outputs: dict,
+        duration: float,
+        superseded: tuple = (),
+    ) -> None:
+        """Store a successful execution and the digests of what it wrote.
+
+        Earlier writers of the same paths (e.g. ``transcribe_audio`` once
+        ``normalize_srt`` rewrote the SRT in place) have their output digests
+        updated, so they stay current. The records of ``superseded`` steps,
+        which rewrite these outputs in place, are dropped instead: they
+        described an older version of the file and must run again.
+        """
+        out_digests = {name: self.file_digest(path) for name, path in outputs.items()}
+        with self._lock:
+            self._runs[(video_id, step)] = {
+                "fingerprint": fingerprint,
+                "outputs": out_digests,
+            }
+            self._conn.execute(
+                "INSERT OR REPLACE INTO step_runs VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    video_id,
+                    step,
+                    fingerprint,
+                    json.dumps(input_digests, sort_keys=True),
+                    json.dumps(params, sort_keys=True),
+                    json.dumps(out_digests, sort_keys=True),
+                    duration,
+                    time.time(),
+                ),
+            )
+            for other in superseded:
+                if self._runs.pop((video_id, other), None) is not None:
+                    self._conn.execute(
+                        "DELETE FROM step_runs WHERE video_id = ? AND step = ?",
+                        (video_id, other),
+                    )
+            for (vid, other), rec in self._runs.items():
+                if vid != video_id or other == step:
+                    continue
+                changed = False
+                for name, digest in out_digests.items():
+                    if name in rec["outputs"] and rec["outputs"][name] != digest:
+                        rec["outputs"][name] = digest
+                        changed = True
+                if changed:
+                    self._conn.execute(
+                        "UPDATE step_runs SET outputs = ? WHERE video_id = ? AND step = ?",
+                        (json.dumps(rec["outputs"], sort_keys=True), vid, other),
+                    )
+            self._conn.commit()
+
+    def forget(self, video_id: str, step: str) -> None:
+        """Drop the record for a step (e.g. after it failed)."""
+        with self._lock:
+            if self._runs.pop((video_id, step), None) is not None:
+                self._conn.execute(
+                    "DELETE FROM step_runs WHERE video_id = ? AND step = ?",
+                    (video_id, step),
+                )
+                self._conn.commit()
+
+
+def invalidate_outputs(paths: list) -> None:
+    """Remove stale outputs so the step's own existence checks rerun it."""
+    for path in paths:
+        if os.path.isfile(path):
+            logging.info("Removing stale output %s", path)
+            os.remove(path)
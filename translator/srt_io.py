@@ -0,0 +1,301 @@
+"""Shared SRT parsing and writing for every subtitle stage.
+
+Subtitles are read line by line in a single pass: no whole-file string, no
+backtracking regex. The parser accepts a UTF-8 BOM, CRLF line endings,
+missing or bogus index lines, lenient timestamps (``59.9``, ``1:2:3.4``) and
+cues that are not separated by a blank line; blocks without a readable
+timing line are skipped. Cue times are held as integer milliseconds and are
+only formatted as ``HH:MM:SS,mmm`` when written.
+
+Timeline edits (``shift_cues``, ``scale_cues``, ``clamp_cues``) work on the
+start/end columns of a whole cue list at once, with NumPy when installed.
+Float seconds from Whisper or audio analysis are converted once, with
+``seconds_to_ms``, at the boundary.
+"""
+import logging
+import re
+from collections.abc import Iterable, Iterator
+from typing import Optional
+
+from artifacts import atomic_write
+
+try:
+    import numpy as np
+except ImportError:  # optional speed-up
+    np = None
+
+ARROW = "-->"
+# "HH:MM:SS,mmm --> HH:MM:SS,mmm" is read without int() calls: every field
+# is looked up in a table of its value in milliseconds
+_CANONICAL = re.compile(
+    r"(\d\d):(\d\d):(\d\d)[,.](\d\d\d)\s*-->\s*(\d\d):(\d\d):(\d\d)[,.](\d\d\d)"
+)
+_HOURS = {f"{i:02d}": i * 3600000 for i in range(100)}
+_MINUTES = {f"{i:02d}": i * 60000 for i in range(100)}
+_SECONDS = {f"{i:02d}": i * 1000 for i in range(100)}
+_MILLIS = {f"{i:03d}": i for i in range(1000)}
+
+
+class Cue:
+    """One subtitle: 1-based ``index``, ``start``/``end`` in ms, text ``lines``."""
+
+    __slots__ = ("end", "index", "lines", "start")
+
+    def __init__(self, index: int, start: int, end: int, lines: list):
+        self.index = index
+        self.start = start
+        self.end = end
+        self.lines = lines
+
+    @property
+    def text(self) -> str:
+        """The cue's lines joined with newlines."""
+        return "\n".join(self.lines)
+
+    def to_srt_block(self) -> str:
+        """Serialize the cue as an SRT block (without the separating blank line)."""
+        return (
+            f"{self.index}\n{format_timestamp(self.start)} --> "
+            f"{format_timestamp(self.end)}\n{self.text}\n"
+        )
+
+    def __repr__(self) -> str:
+        return f"Cue({self.index}, {self.start}, {self.end}, {self.lines!r})"
+
+
+def parse_timestamp(ts: str) -> int:
+    """Milliseconds of an SRT timestamp.
+
+    Accepts ``HH:MM:SS,mmm`` as well as shortened forms like ``MM:SS.m`` or
+    ``SS``; out-of-range fields carry over (``00:00:60,000`` is one minute).
+    Raises ``ValueError`` if ``ts`` is not a timestamp.
+    """
+    ts = ts.strip()
+    if "," in ts:
+        base, frac = ts.split(",", 1)
+    elif "." in ts:
+        base, frac = ts.split(".", 1)
+    else:
+        base, frac = ts, "0"
+    if not frac.isdigit():
+        raise ValueError(f"Bad timestamp: {ts!r}")
+    total = 0
+    parts = base.split(":")
+    if len(parts) > 3:
+        raise ValueError(f"Bad timestamp: {ts!r}")
+    for part in parts:
+        if not part.isdigit():
+            raise ValueError(f"Bad timestamp: {ts!r}")
+        total = total * 60 + int(part)
+    # Exactly three digits of milliseconds
+    return total * 1000 + int((frac + "000")[:3])
+
+
+def format_timestamp(ms: int) -> str:
+    """``HH:MM:SS,mmm`` for a (non-negative) time in milliseconds."""
+    s, ms = divmod(max(0, int(ms)), 1000)
+    m, s = divmod(s, 60)
+    h, m = divmod(m, 60)
+    return f"{h:02d}:{m:02d}:{s:02d},{ms:03d}"
+
+
+def seconds_to_ms(seconds: float) -> int:
+    """Round a time in seconds to whole milliseconds."""
+    return round(float(seconds) * 1000)
+
+
+def _columns(cues: list) -> tuple:
+    n = len(cues)
+    starts = np.fromiter((c.start for c in cues), dtype=np.int64, count=n)
+    ends = np.fromiter((c.end for c in cues), dtype=np.int64, count=n)
+    return starts, ends
+
+
+def _store(cues: list, starts, ends) -> None:
+    for cue, start, end in zip(cues, starts.tolist(), ends.tolist()):
+        cue.start = start
+        cue.end = end
+
+
+def shift_cues(cues: list, offset_ms: int) -> list:
+    """Move every cue by ``offset_ms`` (in place); returns ``cues``."""
+    if not offset_ms:
+        return cues
+    if np is not None and cues:
+        starts, ends = _columns(cues)
+        _store(cues, starts + offset_ms, ends + offset_ms)
+        return cues
+    for cue in cues:
+        cue.start += offset_ms
+        cue.end += offset_ms
+    return cues
+
+
+def scale_cues(cues: list, factor: float, origin_ms: int = 0) -> list:
+    """Stretch cue times by ``factor`` around ``origin_ms`` (in place)."""
+    if np is not None and cues:
+        starts, ends = _columns(cues)
+        starts = np.rint((starts - origin_ms) * factor).astype(np.int64) + origin_ms
+        ends = np.rint((ends - origin_ms) * factor).astype(np.int64) + origin_ms
+        _store(cues, starts, ends)
+        return cues
+    for cue in cues:
+        cue.start = round((cue.start - origin_ms) * factor) + origin_ms
+        cue.end = round((cue.end - origin_ms) * factor) + origin_ms
+    return cues
+
+
+def clamp_cues(cues: list, lo: int = 0, hi: Optional[int] = None) -> list:
+    """Cues overlapping ``(lo, hi)`` with their times clipped to that range.
+
+    Cues entirely outside the range are dropped; the others are clipped in
+    place.
+    """
+    if hi is None:
+        hi = 1 << 62
+    if np is not None and cues:
+        starts, ends = _columns(cues)
+        keep = ((ends > lo) & (starts < hi)).tolist()
+        _store(cues, np.clip(starts, lo, hi), np.clip(ends, lo, hi))
+        return [cue for cue, k in zip(cues, keep) if k]
+    kept = []
+    for cue in cues:
+        if cue.end <= lo or cue.start >= hi:
+            continue
+        cue.start = min(max(cue.start, lo), hi)
+        cue.end = min(max(cue.end, lo), hi)
+        kept.append(cue)
+    return kept
+
+
+def _parse_timing(line: str) -> Optional[tuple]:
+    m = _CANONICAL.match(line)
+    if m:
+        h, mi, s, ms, h2, mi2, s2, ms2 = m.groups()
+        return (
+            _HOURS[h] + _MINUTES[mi] + _SECONDS[s] + _MILLIS[ms],
+            _HOURS[h2] + _MINUTES[mi2] + _SECONDS[s2] + _MILLIS[ms2],
+        )
+    start, _, rest = line.partition(ARROW)
+    fields = rest.split()
+    if not fields:
+        return None
+    try:
+        # Anything after the end time (e.g. position hints) is ignored
+        return parse_timestamp(start), parse_timestamp(fields[0])
+    except ValueError:
+        return None
+
+
+def iter_cues(lines: Iterable[str]) -> Iterator[Cue]:  # noqa: C901
+    """Yield cues from an iterable of SRT lines (e.g. an open file).
+
+    Cues keep the index found in the input; a missing or invalid index is
+    replaced by the previous index plus one.
+    """
+    index = None
+    timing = None
+    text = []
+    last = 0
+    skipped = 0
+    first = True
+    for line in lines:
+        stripped = line.strip()
+        if first:
+            stripped = stripped.lstrip("\ufeff").strip()
+            first = False
+        if timing is None:
+            if not stripped:
+                index = None
+            elif ARROW in stripped:
+                timing = _parse_timing(stripped)
+                if timing is None:
+                    skipped += 1
+                    # Drop the block; its text lines are skipped below
+                    timing = False
+            elif stripped.isdigit() and index is None:
+                index = int(stripped)
+            else:
+                index = None
+            continue
+        if stripped and ARROW in stripped and (not text or text[-1].isdigit()):
+            # A new cue starts without a separating blank line
+            pending_index = int(text.pop()) if text else None
+            if timing:
+                last = index if index is not None else last + 1
+                yield Cue(last, timing[0], timing[1], text)
+            index, text = pending_index, []
+            timing = _parse_timing(stripped)
+            if timing is None:
+                skipped += 1
+                timing = False
+            continue
+        if stripped:
+            text.append(stripped)
+            continue
+        if timing:
+            last = index if index is not None else last + 1
+            yield Cue(last, timing[0], timing[1], text)
+        index, timing, text = None, None, []
+    if timing:
+        last = index if index is not None else last + 1
+        yield Cue(last, timing[0], timing[1], text)
+    if skipped:
+        logging.debug(f"Skipped {skipped} SRT block(s) with unreadable timing")
+
+
+def iter_srt_file(path: str) -> Iterator[Cue]:
+    """Lazily yield the cues of the SRT file at ``path``."""
+    with open(path, encoding="utf-8-sig", errors="replace", newline="") as f:
+        yield from iter_cues(f)
+
+
+def read_srt(path: str) -> list:
+    """Return all cues of the SRT file at ``path``."""
+    return list(iter_srt_file(path))
+
+
+def parse_srt(text: str) -> list:
+    """Return all cues of an SRT document held in a string."""
+    return list(iter_cues(text.splitlines()))
+
+
+def format_srt(cues: Iterable[Cue]) -> str:
+    """SRT document text for ``cues``."""
+    return "".join(cue.to_srt_block() + "\n" for cue in cues)
+
+
+class SrtWriter:
+    """Streaming SRT writer that replaces ``path`` atomically on close.
+
+    With ``renumber`` every written cue gets the next index starting at 1.
+    """
+
+    def __init__(self, path: str, renumber: bool = False):
+        self._atomic = atomic_write(path)
+        self._file = None
+        self.renumber = renumber
+        self.count = 0
+
+    def __enter__(self) -> "SrtWriter":
+        self._file = self._atomic.__enter__()
+        return self
+
+    def __exit__(self, *exc) -> bool:
+        return self._atomic.__exit__(*exc)
+
+    def write(self, cue: Cue) -> None:
+        """Append ``cue``, renumbered if ``renumber`` is set."""
+        self.count += 1
+        if self.renumber:
+            cue.index = self.count
+        self._file.write(cue.to_srt_block())
+        self._file.write("\n")
+
+
+def write_srt(path: str, cues: Iterable[Cue], renumber: bool = False) -> int:
+    """Write ``cues`` to ``path`` atomically; returns the number written."""
+    with SrtWriter(path, renumber=renumber) as writer:
+        for cue in cues:
+            writer.write(cue)
+    return writer.count
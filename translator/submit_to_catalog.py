@@ -19,9 +19,12 @@ from typing import Any, Dict, List, Optional
 
 import urllib.request
 import urllib.error
-import re
 import hashlib
 
+import translation_cache
+from srt_io import read_srt, write_srt
+from translate_subtitles import chunk_cache_key, chunk_subtitles, merge_chunks
+
 
 def _is_trivial_srt(file_path: str) -> bool:
     """Return True if the SRT looks like a stub or too small to be meaningful.
@@ -35,18 +38,12 @@ def _is_trivial_srt(file_path: str) -> bool:
         size = os.path.getsize(file_path)
         if size < 128:
             return True
-        text = open(file_path, encoding="utf-8", errors="ignore").read()
         # Count blocks
-        blocks = re.findall(
-            r"\n?\d+\s+\d{2}:\d{2}:\d{2},\d{3} --> \d{2}:\d{2}:\d{2},\d{3}\s+[\s\S]*?(?=\n\n|\Z)",
-            text,
-            flags=re.MULTILINE,
-        )
-        if len(blocks) < 3:
+        cues = read_srt(file_path)
+        if len(cues) < 3:
             return True
         # Extremely short total content
-        payload = re.sub(r"\d+\s+\d{2}:\d{2}:\d{2},\d{3} --> .*", "", text)
-        payload = re.sub(r"\s+", " ", payload).strip()
+        payload = " ".join(" ".join(cue.lines) for cue in cues).strip()
         if len(payload) < 64:
             return True
         return False
@@ -138,56 +135,62 @@ def choose_title(item: Dict[str, Any], base_dir: Optional[str], vid: str) -> str
     return ""
 
 
-def _reconstruct_en_from_cache(cache_dir: str, vid: str, subtitles_dir: str) -> Optional[str]:
-    """Attempt to reconstruct en_{vid}.srt from cached translated chunks.
-
-    Looks for files like {cache_dir}/kr_{vid}_chunk{N}.json with a 'translation' field
-    containing SRT text. Parses and concatenates in chunk order while renumbering.
+def _reconstruct_en_from_cache(
+    cache_dir: str,
+    vid: str,
+    subtitles_dir: str,
+    slang_file: Optional[str] = None,
+    model: str = "gpt-4.1-mini",
+    chunk_size: int = 50,
+    overlap: int = 5,
+) -> Optional[str]:
+    """Attempt to reconstruct en_{vid}.srt from the translation cache.
+
+    Re-chunks kr_{vid}.srt from ``subtitles_dir`` the way translate_subtitles
+    does and looks every chunk up in {cache_dir}/translations.sqlite under the
+    same key (chunk text, ``model``, prompt version and the glossary in
+    ``slang_file``). Succeeds only if every chunk is cached.
     Returns the output file path if reconstruction succeeds, else None.
     """
     try:
-        base = f"kr_{vid}"
-        if not os.path.isdir(cache_dir):
+        kr_srt = os.path.join(subtitles_dir, f"kr_{vid}.srt")
+        db_file = os.path.join(cache_dir, translation_cache.CACHE_FILE)
+        if not slang_file or not all(
+            os.path.exists(p) for p in (kr_srt, db_file, slang_file)
+        ):
             return None
-        # Collect chunk files in order
-        chunk_files = []
-        for name in os.listdir(cache_dir):
-            m = re.match(rf"{re.escape(base)}_chunk(\d+)\.json$", name)
-            if m:
-                chunk_files.append((int(m.group(1)), os.path.join(cache_dir, name)))
-        if not chunk_files:
-            return None
-        chunk_files.sort(key=lambda x: x[0])
-
-        # Helper to parse SRT blocks
-        pat = re.compile(r"(\d+)\s+(\d{2}:\d{2}:\d{2},\d{3}) --> (\d{2}:\d{2}:\d{2},\d{3})\s+([\s\S]*?)(?=\n\n|\Z)", re.MULTILINE)
-        merged_blocks: List[str] = []
-        for idx, path in chunk_files:
-            with open(path, encoding="utf-8") as f:
-                data = json.load(f)
-            text = (data.get("translation") or "").strip()
-            if not text:
-                continue
-            # Extract SRT blocks as raw text segments to keep simple
-            for m in pat.finditer(text):
-                block = f"{m.group(2)} --> {m.group(3)}\n{m.group(4).strip()}\n"
-                merged_blocks.append(block)
-        if not merged_blocks:
+        with open(slang_file, encoding="utf-8") as f:
+            slang_text = f.read()
+        cache = translation_cache.open_cache(cache_dir)
+        translated = []
+        for chunk in chunk_subtitles(read_srt(kr_srt), chunk_size, overlap):
+            cached = cache.get(chunk_cache_key(chunk, model, slang_text))
+            if cached is None:
+                return None
+            text, origin_ms = cached
+            translated.append(translation_cache.retime(text, chunk, origin_ms))
+        merged = merge_chunks(translated, overlap)
+        if not merged:
             return None
         # Renumber and write
-        os.makedirs(subtitles_dir, exist_ok=True)
         out_path = os.path.join(subtitles_dir, f"en_{vid}.srt")
-        with open(out_path, "w", encoding="utf-8") as out:
-            for i, blk in enumerate(merged_blocks, start=1):
-                out.write(str(i) + "\n")
-                out.write(blk)
-                out.write("\n")
+        write_srt(out_path, merged, renumber=True)
         return out_path
     except Exception:
         return None
 
 
-def run(catalog_base: str, api_key: str, videos_json: str, subtitles_dir: str) -> bool:
+def run(
+    catalog_base: str,
+    api_key: str,
+    videos_json: str,
+    subtitles_dir: str,
+    slang_file: Optional[str] = None,
+    model: str = "gpt-4.1-mini",
+    chunk_size: int = 50,
+    overlap: int = 5,
+    cache_dir: Optional[str] = None,
+) -> bool:
     def _fetch_hashes(ids: list[str]) -> dict[str, Optional[str]]:
         """Fetch remote subtitle hashes in batches to avoid long URLs.
 
@@ -248,6 +251,13 @@ def run(catalog_base: str, api_key: str, videos_json: str, subtitles_dir: str) -
     skipped_invalid = 0
     submitted_count = 0
     base_dir = os.path.dirname(os.path.abspath(videos_json))
+    cache_dir = cache_dir or os.path.join(base_dir, ".cache")
+    translation = {
+        "slang_file": slang_file,
+        "model": model,
+        "chunk_size": chunk_size,
+        "overlap": overlap,
+    }
     # Preflight: fetch remote hashes for all candidate IDs up front
     video_ids: list[str] = []
     for it in items:
@@ -266,7 +276,7 @@ def run(catalog_base: str, api_key: str, videos_json: str, subtitles_dir: str) -
             reconstructed = None
             try:
                 reconstructed = _reconstruct_en_from_cache(
-                    os.path.join(base_dir, ".cache"), vid, subtitles_dir
+                    cache_dir, vid, subtitles_dir, **translation
                 )
             except Exception:
                 reconstructed = None
@@ -296,7 +306,7 @@ def run(catalog_base: str, api_key: str, videos_json: str, subtitles_dir: str) -
         if _is_trivial_srt(en_srt):
             # Try to replace with reconstruction if possible
             reconstructed = _reconstruct_en_from_cache(
-                os.path.join(base_dir, ".cache"), vid, subtitles_dir
+                cache_dir, vid, subtitles_dir, **translation
             )
             if reconstructed and not _is_trivial_srt(reconstructed):
                 en_srt = reconstructed
@@ -390,8 +400,24 @@ def main() -> int:
     ap.add_argument("--api-key", required=True)
     ap.add_argument("--videos-json", required=True)
     ap.add_argument("--subtitles-dir", required=True)
+    # Must match the translation run for cached chunks to be found
+    ap.add_argument("--slang-file", default="slang/KoreanSlang.txt")
+    ap.add_argument("--model", default="gpt-4.1-mini")
+    ap.add_argument("--chunk-size", type=int, default=50)
+    ap.add_argument("--overlap", type=int, default=5)
+    ap.add_argument("--cache-dir", help="Default: .cache next to --videos-json")
     args = ap.parse_args()
-    ok = run(args.catalog_base, args.api_key, args.videos_json, args.subtitles_dir)
+    ok = run(
+        args.catalog_base,
+        args.api_key,
+        args.videos_json,
+        args.subtitles_dir,
+        slang_file=args.slang_file,
+        model=args.model,
+        chunk_size=args.chunk_size,
+        overlap=args.overlap,
+        cache_dir=args.cache_dir,
+    )
     return 0 if ok else 1
 
 
@@ -0,0 +1,49 @@
+import os
+
+import pytest
+
+from artifacts import atomic_write, quarantine_partial_outputs, write_json_atomic
+
+
+def test_atomic_write_keeps_old_file_on_error(tmp_path):
+    target = tmp_path / "out.srt"
+    target.write_text("old", encoding="utf-8")
+
+    with pytest.raises(RuntimeError):
+        with atomic_write(str(target)) as f:
+            f.write("half written")
+            raise RuntimeError("boom")
+
+    assert target.read_text(encoding="utf-8") == "old"
+    assert os.listdir(tmp_path) == ["out.srt"]
+
+
+def test_write_json_atomic_replaces_target(tmp_path):
+    target = tmp_path / "sub" / "data.json"
+    write_json_atomic(str(target), {"a": 1})
+    write_json_atomic(str(target), {"a": 2})
+
+    assert target.read_text(encoding="utf-8") == '{"a": 2}'
+    assert os.listdir(target.parent) == ["data.json"]
+
+
+def test_quarantine_moves_partial_files_and_dirs(tmp_path):
+    (tmp_path / "vid.mp3").write_bytes(b"ok")
+    (tmp_path / "vid.webm.part").write_bytes(b"x")
+    nested = tmp_path / "vid"
+    nested.mkdir()
+    (nested / "kr.srt.1234abcd.partial").write_text("x", encoding="utf-8")
+    scratch = tmp_path / ".other.partial"
+    scratch.mkdir()
+    (scratch / "vocals.wav").write_bytes(b"x")
+
+    moved = quarantine_partial_outputs([str(tmp_path), str(tmp_path / "missing")])
+
+    assert len(moved) == 2
+    assert (tmp_path / "vid.mp3").exists()
+    # yt-dlp resumes from its own .part files
+    assert (tmp_path / "vid.webm.part").exists()
+    assert (tmp_path / ".quarantine" / ".other.partial" / "vocals.wav").exists()
+    assert (nested / ".quarantine" / "kr.srt.1234abcd.partial").exists()
+    # A second sweep finds nothing new
+    assert quarantine_partial_outputs([str(tmp_path)]) == []
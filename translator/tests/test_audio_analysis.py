@@ -0,0 +1,115 @@
+import math
+import wave
+from array import array
+
+import pytest
+
+import audio_analysis
+from audio_analysis import crossfade, find_split_points, frame_levels
+
+RATE = audio_analysis.SAMPLE_RATE
+
+
+def pcm(segments):
+    """Build s16le PCM from (seconds, amplitude) pairs of a 440 Hz tone."""
+    samples = array("h")
+    for seconds, amp in segments:
+        for i in range(int(seconds * RATE)):
+            samples.append(int(amp * 32767 * math.sin(2 * math.pi * 440 * i / RATE)))
+    return samples.tobytes()
+
+
+def blocks(data, size=4096):
+    return [data[i : i + size] for i in range(0, len(data), size)]
+
+
+def test_frame_levels_streams_across_block_edges():
+    data = pcm([(1.0, 0.5), (0.5, 0.0)])
+    levels = frame_levels(blocks(data, 999))
+
+    assert len(levels) == 75  # 1.5s of 20ms frames
+    assert levels[10] == pytest.approx(0.5 / math.sqrt(2), rel=0.05)
+    assert levels[-1] == 0.0
+
+
+def test_split_points_land_in_silence_before_target():
+    # Speech with short pauses at 7.0-7.4s and 15.5-15.8s
+    data = pcm([(7.0, 0.4), (0.4, 0.0), (8.1, 0.4), (0.3, 0.0), (4.2, 0.4)])
+    levels = frame_levels(blocks(data))
+
+    cuts = find_split_points(levels, target_seconds=10, search_seconds=4)
+
+    assert len(cuts) == 2
+    assert 7.0 <= cuts[0] <= 7.4
+    assert 15.5 <= cuts[1] <= 15.8
+
+
+def test_split_points_fall_back_to_target_without_silence():
+    levels = array("f", [0.3] * 1000)  # 20s of constant level
+
+    assert find_split_points(levels, target_seconds=8, search_seconds=2) == [8.0, 16.0]
+
+
+def test_speech_regions_bridge_pauses_and_drop_blips():
+    # 2s silence, 1s speech, 0.3s pause, 1s speech, 3s silence, 0.1s click, 2s silence
+    data = pcm([(2, 0), (1, 0.3), (0.3, 0), (1, 0.3), (3, 0), (0.1, 0.5), (2, 0)])
+    regions = audio_analysis.speech_regions(frame_levels(blocks(data)))
+
+    assert len(regions) == 1
+    start, end = regions[0]
+    assert start == pytest.approx(1.8, abs=0.05)
+    assert end == pytest.approx(4.5, abs=0.05)
+
+
+def test_regions_wav_and_time_map_round_trip(tmp_path):
+
+    data = pcm([(1, 0), (0.5, 0.3), (2, 0), (0.5, 0.3)])
+    regions = [(1.0, 1.5), (3.5, 4.0)]
+    out = tmp_path / "speech.wav"
+    with open(out, "wb") as f:
+        mapping = audio_analysis.write_regions_wav(
+            blocks(data, 1001), regions, f, gap_seconds=0.5
+        )
+
+    with wave.open(str(out)) as w:
+        assert w.getnframes() == int(1.5 * RATE)  # 0.5 + gap 0.5 + 0.5
+    assert [m["source_start"] for m in mapping] == [1.0, 3.5]
+    assert audio_analysis.map_to_source(0.25, mapping) == pytest.approx(1.25)
+    assert audio_analysis.map_to_source(1.2, mapping) == pytest.approx(3.7)
+    # Times inside the inserted gap clamp to the end of the previous region
+    assert audio_analysis.map_to_source(0.8, mapping) == pytest.approx(1.5)
+
+
+def test_crossfade_ramps_between_blocks():
+    tail = array("h", [1000, -1000] * 4).tobytes()
+    head = array("h", [0, 0] * 4).tobytes()
+
+    out = array("h")
+    out.frombytes(crossfade(tail, head, channels=2))
+
+    assert list(out[0::2]) == [875, 625, 375, 125]
+    assert list(out[1::2]) == [-875, -625, -375, -125]
+
+
+def test_isolation_metrics_floor_ratio_separates_voice_from_music_bed():
+    rate = 8000
+
+    def tone(seconds, amp, freq):
+        n = int(seconds * rate)
+        return [amp * math.sin(2 * math.pi * freq * i / rate) for i in range(n)]
+
+    def to_pcm(samples):
+        return array("h", [int(s * 32767) for s in samples]).tobytes()
+
+    # Phrases with pauses between them
+    voice = (tone(0.4, 0.5, 220) + [0.0] * int(0.4 * rate)) * 4
+    bed = tone(len(voice) / rate, 0.2, 97)
+
+    alone = audio_analysis.isolation_metrics(blocks(to_pcm(voice)), sample_rate=rate)
+    mixed = audio_analysis.isolation_metrics(
+        blocks(to_pcm([a + b for a, b in zip(voice, bed)])), sample_rate=rate
+    )
+
+    assert alone["frames"] == mixed["frames"] == 100
+    assert alone["floor_ratio"] < 0.05
+    assert mixed["floor_ratio"] > 0.2
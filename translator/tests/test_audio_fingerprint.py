@@ -0,0 +1,70 @@
+import json
+import random
+
+import audio_fingerprint
+from audio_fingerprint import (
+    FingerprintIndex,
+    fingerprint_levels,
+    run_fingerprint_audio,
+)
+
+
+def _levels(seed, n):
+    rng = random.Random(seed)
+    return [rng.uniform(0.01, 0.5) if rng.random() > 0.05 else 0.0 for _ in range(n)]
+
+
+def test_find_match_reports_offset_of_trimmed_reupload(tmp_path):
+    original = _levels(1, 3000)
+    index = FingerprintIndex(str(tmp_path / "fp.sqlite"))
+    index.add("orig", fingerprint_levels(original), str(tmp_path))
+    index.add("other", fingerprint_levels(_levels(2, 3000)), str(tmp_path))
+
+    # Re-upload with the first 5s cut and slightly different levels
+    reupload = [v * 1.01 for v in original[100:2500]]
+    match = index.find_match("mirror", fingerprint_levels(reupload))
+    assert match["source"] == "orig"
+    assert match["offset"] == 5.0
+    assert match["similarity"] > 0.95
+
+    assert index.find_match("new", fingerprint_levels(_levels(3, 2000))) is None
+    index.close()
+
+
+def test_duplicate_gets_shifted_subtitles(tmp_path, monkeypatch):
+    subs = tmp_path / "subs"
+    subs.mkdir()
+    cache = tmp_path / "cache"
+    for lang, text in (("kr", "안녕"), ("en", "Hello")):
+        (subs / f"{lang}_orig.srt").write_text(
+            "1\n00:00:02,000 --> 00:00:03,000\nintro\n\n"
+            f"2\n00:00:10,000 --> 00:00:12,500\n{text}\n\n",
+            encoding="utf-8",
+        )
+    original = _levels(1, 3000)
+    fingerprints = {"orig.mp3": original, "mirror.mp3": original[100:]}
+    monkeypatch.setattr(
+        audio_fingerprint,
+        "compute_fingerprint",
+        lambda path: fingerprint_levels(fingerprints[path.rsplit("/", 1)[-1]]),
+    )
+    for vid in ("orig", "mirror"):
+        (tmp_path / f"{vid}.mp3").write_bytes(b"x")
+
+    assert run_fingerprint_audio(
+        str(tmp_path / "orig.mp3"), "orig", str(subs), str(cache)
+    )
+    assert not (cache / "duplicate_orig.json").exists()
+    assert run_fingerprint_audio(
+        str(tmp_path / "mirror.mp3"), "mirror", str(subs), str(cache)
+    )
+
+    marker = json.loads((cache / "duplicate_mirror.json").read_text())
+    assert marker["source"] == "orig"
+    assert marker["offset"] == 5.0
+    assert marker["derived"] is True
+    # The intro cue falls before the cut and is dropped
+    assert (subs / "en_mirror.srt").read_text(encoding="utf-8") == (
+        "1\n00:00:05,000 --> 00:00:07,500\nHello\n\n"
+    )
+    assert "안녕" in (subs / "kr_mirror.srt").read_text(encoding="utf-8")
@@ -0,0 +1,244 @@
+import json
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import ClassVar
+
+import pytest
+from openai import OpenAI
+
+import batch_translate
+import translation_cache
+from translate_subtitles import chunk_cache_key, parse_srt_file
+
+SRT = "".join(
+    f"{i}\n00:00:0{i},000 --> 00:00:0{i},500\n라인 {i}\n\n" for i in range(1, 5)
+)
+
+
+class FakeBatchAPI(BaseHTTPRequestHandler):
+    """Minimal stand-in for the OpenAI files and batches endpoints."""
+
+    files: ClassVar[dict] = {}
+    batches: ClassVar[dict] = {}
+
+    def log_message(self, *args):
+        pass
+
+    def _json(self, payload, status=200):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        raw = self.rfile.read(int(self.headers["Content-Length"]))
+        if self.path == "/v1/files":
+            # Pull the uploaded file out of the multipart body
+            m = re.search(rb'name="file"[^\r\n]*\r\n(?:[^\r\n]+\r\n)*\r\n(.*?)\r\n--', raw, re.S)
+            file_id = f"file-{len(self.files)}"
+            self.files[file_id] = m.group(1).decode("utf-8")
+            self._json({"id": file_id, "object": "file", "purpose": "batch"})
+        elif self.path == "/v1/batches":
+            req = json.loads(raw)
+            batch_id = f"batch-{len(self.batches)}"
+            out_lines = []
+            for line in self.files[req["input_file_id"]].splitlines():
+                item = json.loads(line)
+                user = item["body"]["messages"][-1]["content"]
+                if item["custom_id"].startswith("title:"):
+                    reply = "EN " + user.split("\n")[1]
+                else:
+                    reply = user.split("---\n")[1]
+                out_lines.append(
+                    json.dumps(
+                        {
+                            "custom_id": item["custom_id"],
+                            "response": {
+                                "status_code": 200,
+                                "body": {"choices": [{"message": {"content": reply}}]},
+                            },
+                            "error": None,
+                        }
+                    )
+                )
+            out_id = f"file-{len(self.files)}"
+            self.files[out_id] = "\n".join(out_lines) + "\n"
+            self.batches[batch_id] = {"polls": 0, "output": out_id}
+            self._json(self._batch(batch_id, "validating"))
+
+    def do_GET(self):
+        m = re.fullmatch(r"/v1/batches/([\w-]+)", self.path)
+        if m:
+            state = self.batches[m.group(1)]
+            state["polls"] += 1
+            status = "completed" if state["polls"] > 1 else "in_progress"
+            self._json(self._batch(m.group(1), status))
+            return
+        m = re.fullmatch(r"/v1/files/([\w-]+)/content", self.path)
+        body = self.files[m.group(1)].encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _batch(self, batch_id, status):
+        done = status == "completed"
+        return {
+            "id": batch_id,
+            "object": "batch",
+            "endpoint": "/v1/chat/completions",
+            "input_file_id": "file-0",
+            "completion_window": "24h",
+            "created_at": 0,
+            "status": status,
+            "output_file_id": self.batches[batch_id]["output"] if done else None,
+            "error_file_id": None,
+        }
+
+
+@pytest.fixture
+def batch_server():
+    FakeBatchAPI.files = {}
+    FakeBatchAPI.batches = {}
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeBatchAPI)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield OpenAI(api_key="test", base_url=f"http://127.0.0.1:{server.server_port}/v1")
+    server.shutdown()
+
+
+def test_batch_fills_title_and_chunk_caches(tmp_path, batch_server):
+    meta_dir = tmp_path / "metadata"
+    subs_dir = tmp_path / "subtitles"
+    cache_dir = tmp_path / ".cache"
+    for d in (meta_dir, subs_dir, cache_dir):
+        d.mkdir()
+    slang = tmp_path / "slang.txt"
+    slang.write_text("", encoding="utf-8")
+    for vid in ("a", "b"):
+        (meta_dir / f"{vid}.json").write_text(
+            json.dumps({"title": f"제목 {vid}"}), encoding="utf-8"
+        )
+        (subs_dir / f"kr_{vid}.srt").write_text(SRT, encoding="utf-8")
+    # Chunk 0 of video a is already cached and must not be resubmitted
+    subs = parse_srt_file(str(subs_dir / "kr_a.srt"))
+    keys = [chunk_cache_key(subs[i : i + 2], "test-model", "") for i in (0, 2)]
+    cache = translation_cache.open_cache(str(cache_dir))
+    cache.put(keys[0], "cached", 1000)
+
+    ok = batch_translate.run_batch_translate(
+        [{"v": "a"}, {"v": "b"}],
+        metadata_dir=str(meta_dir),
+        subtitles_dir=str(subs_dir),
+        cache_dir=str(cache_dir),
+        slang_file=str(slang),
+        model="test-model",
+        chunk_size=2,
+        overlap=0,
+        poll_interval=0,
+        client=batch_server,
+    )
+
+    assert ok is True
+    submitted = FakeBatchAPI.files["file-0"].splitlines()
+    # Both videos share their chunks: 2 titles + the one uncached chunk
+    assert len(submitted) == 3
+    title = json.loads((cache_dir / "title_b.json").read_text(encoding="utf-8"))
+    assert title["title_en"] == "EN 제목 b"
+    assert cache.get(keys[0]) == ("cached", 1000)
+    assert "라인 3" in cache.get(keys[1])[0]
+    assert not (cache_dir / "batch_translate.json").exists()
+
+    # Everything is cached now, so a second run submits nothing
+    assert batch_translate.run_batch_translate(
+        [{"v": "a"}, {"v": "b"}],
+        metadata_dir=str(meta_dir),
+        subtitles_dir=str(subs_dir),
+        cache_dir=str(cache_dir),
+        slang_file=str(slang),
+        model="test-model",
+        chunk_size=2,
+        overlap=0,
+        poll_interval=0,
+        client=batch_server,
+    )
+    assert len(FakeBatchAPI.batches) == 1
+
+
+class _FailingSecondBatch:
+    """Client wrapper whose second ``batches.create`` call fails."""
+
+    def __init__(self, client):
+        self.files = client.files
+        self.batches = self
+        self._client = client
+        self.created = 0
+
+    def create(self, **kwargs):
+        self.created += 1
+        if self.created == 2:
+            raise RuntimeError("network down")
+        return self._client.batches.create(**kwargs)
+
+    def retrieve(self, batch_id):
+        return self._client.batches.retrieve(batch_id)
+
+
+def test_submitted_batches_survive_a_failed_submission(
+    tmp_path, batch_server, monkeypatch
+):
+    meta_dir = tmp_path / "metadata"
+    subs_dir = tmp_path / "subtitles"
+    cache_dir = tmp_path / ".cache"
+    for d in (meta_dir, subs_dir, cache_dir):
+        d.mkdir()
+    slang = tmp_path / "slang.txt"
+    slang.write_text("", encoding="utf-8")
+    (meta_dir / "a.json").write_text(json.dumps({"title": "제목"}), encoding="utf-8")
+    (subs_dir / "kr_a.srt").write_text(SRT, encoding="utf-8")
+    monkeypatch.setattr(batch_translate, "MAX_REQUESTS_PER_BATCH", 2)
+    kwargs = {
+        "metadata_dir": str(meta_dir),
+        "subtitles_dir": str(subs_dir),
+        "cache_dir": str(cache_dir),
+        "slang_file": str(slang),
+        "model": "test-model",
+        "chunk_size": 2,
+        "overlap": 0,
+        "poll_interval": 0,
+    }
+
+    assert not batch_translate.run_batch_translate(
+        [{"v": "a"}], client=_FailingSecondBatch(batch_server), **kwargs
+    )
+    state = json.loads((cache_dir / "batch_translate.json").read_text("utf-8"))
+    assert state["batch_ids"] == ["batch-0"]
+
+    # The next run resumes the paid batch instead of resubmitting it...
+    assert batch_translate.run_batch_translate(
+        [{"v": "a"}], client=batch_server, **kwargs
+    )
+    assert len(FakeBatchAPI.batches) == 1
+    # ...and a later run submits only what never made it into a batch
+    assert batch_translate.run_batch_translate(
+        [{"v": "a"}], client=batch_server, **kwargs
+    )
+    assert len(FakeBatchAPI.batches) == 2
+    # file-2 was uploaded by the failed submission; file-3 is the new input
+    assert len(FakeBatchAPI.files["file-3"].splitlines()) == 1
+
+
+def test_pre_cache_chunk_targets_are_ignored(tmp_path):
+    legacy = tmp_path / "kr_a_chunk0.json"
+    row = {
+        "custom_id": "chunk:a:0",
+        "response": {
+            "status_code": 200,
+            "body": {"choices": [{"message": {"content": "1\n00:00:00,000"}}]},
+        },
+    }
+    targets = {"chunk:a:0": {"kind": "chunk", "cache": str(legacy)}}
+    assert batch_translate.apply_results(json.dumps(row), targets) == 0
+    assert not legacy.exists()
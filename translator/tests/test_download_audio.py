@@ -4,7 +4,7 @@ import sys
 sys.path.insert(0, os.getcwd())
 
 
-from download_audio import run_download_audio
+from download_audio import HostThrottle, audio_file, run_download_audio
 
 
 def test_skip_existing(tmp_path, caplog):
@@ -60,3 +60,100 @@ def test_download_creates_file(tmp_path, monkeypatch):
     assert calls == [["http://example.com"]]
     assert ok is True
     assert os.path.exists(audio_dir / "vid123.mp3")
+
+
+def test_saved_info_skips_probe(tmp_path, monkeypatch):
+    audio_dir = tmp_path / "audio"
+    formats = []
+
+    class DummyYDL:
+        def __init__(self, opts):
+            self.opts = opts
+
+        def extract_info(self, url, download=False):
+            raise AssertionError("probe should be skipped")
+
+        def download(self, urls):
+            formats.append(self.opts["format"])
+            (audio_dir / "vid123.mp3").write_text("dummy", encoding="utf-8")
+
+    monkeypatch.setattr("download_audio.yt_dlp.YoutubeDL", DummyYDL)
+    info = {
+        "formats": [
+            {"format_id": "251", "ext": "webm", "vcodec": "none", "acodec": "opus"}
+        ]
+    }
+
+    ok = run_download_audio(
+        url="http://example.com",
+        video_id="vid123",
+        output_dir=str(audio_dir),
+        info=info,
+    )
+    assert ok is True
+    assert formats == ["251"]
+
+
+def test_native_format_keeps_stream(tmp_path, monkeypatch):
+
+    audio_dir = tmp_path / "audio"
+    seen = []
+
+    class DummyYDL:
+        def __init__(self, opts):
+            self.opts = opts
+
+        def download(self, urls):
+            seen.append(self.opts["postprocessors"])
+            (audio_dir / "vid123.webm").write_text("dummy", encoding="utf-8")
+
+    monkeypatch.setattr("download_audio.yt_dlp.YoutubeDL", DummyYDL)
+    info = {
+        "formats": [
+            {"format_id": "251", "ext": "webm", "vcodec": "none", "acodec": "opus"}
+        ]
+    }
+
+    ok = run_download_audio(
+        "http://example.com",
+        "vid123",
+        str(audio_dir),
+        info=info,
+        audio_format="native",
+    )
+    assert ok is True
+    assert seen == [[]]
+    assert audio_file(str(audio_dir), "vid123", "native").endswith("vid123.webm")
+
+
+def test_rate_limit_backs_off_and_retries(tmp_path, monkeypatch):
+
+    audio_dir = tmp_path / "audio"
+    throttle = HostThrottle(max_concurrent=4, base_backoff=0.0)
+    attempts = []
+
+    class DummyYDL:
+        def __init__(self, opts):
+            self.opts = opts
+
+        def download(self, urls):
+            attempts.append(throttle.limit("www.youtube.com"))
+            if len(attempts) < 3:
+                raise Exception("ERROR: HTTP Error 429: Too Many Requests")
+            (audio_dir / "vid123.wav").write_text("dummy", encoding="utf-8")
+
+    monkeypatch.setattr("download_audio.yt_dlp.YoutubeDL", DummyYDL)
+    info = {"formats": [{"format_id": "140", "ext": "m4a", "vcodec": "none"}]}
+
+    ok = run_download_audio(
+        "https://www.youtube.com/watch?v=vid123",
+        "vid123",
+        str(audio_dir),
+        info=info,
+        audio_format="wav",
+        throttle=throttle,
+    )
+    assert ok is True
+    # Each 429 halves the host's slots; the success gives one back
+    assert attempts == [4, 2, 1]
+    assert throttle.limit("www.youtube.com") == 2
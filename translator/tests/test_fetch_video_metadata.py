@@ -1,6 +1,8 @@
+import gzip
 import json
 import os
 import sys
+import threading
 from unittest.mock import MagicMock, patch
 
 import pytest
@@ -8,7 +10,8 @@ import pytest
 # Add the project root to the Python path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
-from fetch_video_metadata import run_fetch_video_metadata
+import fetch_video_metadata
+from fetch_video_metadata import run_compact_metadata, run_fetch_video_metadata
 
 
 @pytest.fixture
@@ -55,3 +58,112 @@ def test_fetch_video_metadata_fetches_and_saves(mock_yt_dlp, tmp_path):
         data = json.load(f)
 
     assert data == expected_info
+
+
+def test_bulk_fetch_reuses_one_session_per_worker(tmp_path, monkeypatch):
+
+
+    sessions = []
+    lock = threading.Lock()
+
+    class FakeYDL:
+        def __init__(self, opts):
+            self.urls = []
+            self.closed = False
+            with lock:
+                sessions.append(self)
+
+        def extract_info(self, url, download=False):
+            self.urls.append(url)
+            return {"id": url.rsplit("=", 1)[-1]}
+
+        def close(self):
+            self.closed = True
+
+    monkeypatch.setattr(fetch_video_metadata.yt_dlp, "YoutubeDL", FakeYDL)
+    (tmp_path / "cached.json").write_text("{}", encoding="utf-8")
+    ids = ["cached"] + [f"v{i}" for i in range(10)]
+
+    results = fetch_video_metadata.run_fetch_video_metadata_bulk(
+        ids, str(tmp_path), max_workers=3
+    )
+
+    assert results == dict.fromkeys(ids, True)
+    assert 1 <= len(sessions) <= 3
+    assert sum(len(s.urls) for s in sessions) == 10
+    assert all(s.closed for s in sessions)
+    with open(tmp_path / "v7.json") as f:
+        assert json.load(f) == {"id": "v7"}
+
+
+FULL_INFO = {
+    "id": "abc",
+    "title": "경기",
+    "uploader": "Caster",
+    "upload_date": "20240102",
+    "description": "long text",
+    "thumbnails": [{"url": "https://i.ytimg.com/x.jpg"}] * 50,
+    "automatic_captions": {"ko": [{"url": "https://example.com/cap"}]},
+    "formats": [
+        {
+            "format_id": "140",
+            "ext": "m4a",
+            "vcodec": "none",
+            "acodec": "mp4a",
+            "abr": 129,
+            "url": "https://rr1.googlevideo.com/...",
+        },
+        {
+            "format_id": "137",
+            "ext": "mp4",
+            "vcodec": "avc1",
+            "acodec": "none",
+            "url": "https://rr1.googlevideo.com/...",
+        },
+    ],
+}
+
+
+def test_metadata_is_stored_compactly(mock_yt_dlp, tmp_path):
+
+    mock_yt_dlp.extract_info.return_value = FULL_INFO
+
+    assert run_fetch_video_metadata(
+        "abc", str(tmp_path), extra_fields=("description",), keep_raw=True
+    )
+
+    with open(tmp_path / "abc.json", encoding="utf-8") as f:
+        record = json.load(f)
+    assert record == {
+        "id": "abc",
+        "title": "경기",
+        "uploader": "Caster",
+        "upload_date": "20240102",
+        "description": "long text",
+        "formats": [
+            {
+                "format_id": "140",
+                "ext": "m4a",
+                "vcodec": "none",
+                "acodec": "mp4a",
+                "abr": 129,
+            }
+        ],
+    }
+    with gzip.open(tmp_path / "abc.info.json.gz", "rt", encoding="utf-8") as f:
+        assert json.load(f) == FULL_INFO
+
+
+def test_compact_existing_dumps(tmp_path):
+
+    (tmp_path / "abc.json").write_text(json.dumps(FULL_INFO), encoding="utf-8")
+    (tmp_path / "small.json").write_text('{"title": "x"}', encoding="utf-8")
+
+    assert run_compact_metadata(str(tmp_path))
+
+    with open(tmp_path / "abc.json", encoding="utf-8") as f:
+        record = json.load(f)
+    assert "thumbnails" not in record and "description" not in record
+    assert record["uploader"] == "Caster"
+    assert (tmp_path / "small.json").read_text(encoding="utf-8") == '{"title": "x"}'
+    assert not (tmp_path / "abc.info.json.gz").exists()
@@ -1,10 +1,17 @@
+import json
 import os
 import sys
+import wave
+from array import array
+
+import pytest
 
 sys.path.insert(0, os.getcwd())
 
 
-from isolate_vocals import run_isolate_vocals
+import isolate_vocals
+import pipeline_steps
+from isolate_vocals import run_isolate_vocals, run_isolate_vocals_batch
 
 
 def test_skip_existing(tmp_path, caplog):
@@ -63,3 +70,208 @@ def test_isolate_creates_file(tmp_path, monkeypatch):
     assert ok is True
     out_path = output_dir / "vid" / "vocals.wav"
     assert os.path.exists(out_path)
+
+
+def test_batch_runs_one_demucs_for_pending_files(tmp_path, monkeypatch):
+    audio_dir = tmp_path / "audio"
+    audio_dir.mkdir()
+    files = []
+    for vid in ("a", "b", "c"):
+        f = audio_dir / f"{vid}.mp3"
+        f.write_text("", encoding="utf-8")
+        files.append(str(f))
+    output_dir = tmp_path / "vocals"
+    (output_dir / "b").mkdir(parents=True)
+    (output_dir / "b" / "vocals.wav").write_text("old", encoding="utf-8")
+
+    calls = []
+
+    def fake_run(cmd, check):
+        # Demucs layout: <out>/<model>/<track>/vocals.wav
+        calls.append(cmd)
+        out = cmd[cmd.index("--out") + 1]
+        for f in cmd[cmd.index("--out") + 2 :]:
+            vid = os.path.splitext(os.path.basename(f))[0]
+            os.makedirs(os.path.join(out, "htdemucs", vid))
+            with open(os.path.join(out, "htdemucs", vid, "vocals.wav"), "w") as fh:
+                fh.write(vid)
+
+    monkeypatch.setattr("isolate_vocals.subprocess.run", fake_run)
+
+    results = run_isolate_vocals_batch(
+        [*files, str(audio_dir / "missing.mp3")], output_dir=str(output_dir)
+    )
+
+    assert len(calls) == 1
+    assert calls[0][-2:] == [files[0], files[2]]
+    assert results == {
+        files[0]: True,
+        files[1]: True,
+        files[2]: True,
+        str(audio_dir / "missing.mp3"): False,
+    }
+    assert (output_dir / "a" / "vocals.wav").read_text(encoding="utf-8") == "a"
+    assert (output_dir / "b" / "vocals.wav").read_text(encoding="utf-8") == "old"
+    # The scratch folder is gone
+    assert sorted(os.listdir(output_dir)) == ["a", "b", "c"]
+
+
+def test_pipeline_batches_downloaded_videos(tmp_path, monkeypatch):
+
+    ctx = {
+        "audio_dir": str(tmp_path / "audio"),
+        "vocals_dir": str(tmp_path / "vocals"),
+        "cache_dir": str(tmp_path / "cache"),
+        "config": {"isolate_batch_size": 3},
+        "steps": ["download_audio", "isolate_vocals"],
+        "videos": [{"v": v} for v in ("a", "b", "c", "d", "e")],
+        # e is still downloading
+        "audio_ready": {"a", "b", "c", "d"},
+    }
+    os.makedirs(ctx["audio_dir"])
+    for vid in "abcde":
+        open(os.path.join(ctx["audio_dir"], f"{vid}.mp3"), "w").close()
+    os.makedirs(os.path.join(ctx["vocals_dir"], "b"))
+    open(os.path.join(ctx["vocals_dir"], "b", "vocals.wav"), "w").close()
+
+    batches = []
+
+    def fake_batch(files, output_dir, **kwargs):
+        batches.append([os.path.basename(f) for f in files])
+        return dict.fromkeys(files, True)
+
+    monkeypatch.setattr(
+        pipeline_steps.isolate_vocals, "run_isolate_vocals_batch", fake_batch
+    )
+    assert pipeline_steps._run_isolate_vocals(ctx, {"v": "c"}) is True
+    assert batches == [["c.mp3", "a.mp3", "d.mp3"]]
+
+    # Videos whose subtitles were derived from a duplicate are not batched
+    os.makedirs(ctx["cache_dir"])
+    with open(os.path.join(ctx["cache_dir"], "duplicate_d.json"), "w") as f:
+        json.dump({"derived": True}, f)
+    assert pipeline_steps._run_isolate_vocals(ctx, {"v": "c"}) is True
+    assert batches[-1] == ["c.mp3", "a.mp3"]
+
+
+def test_windowed_isolation_stitches_windows(tmp_path, monkeypatch):
+
+    rate = 1000
+    source = array("h", [(i * 7) % 2000 - 1000 for i in range(2500)])
+    inputs = [tmp_path / "vid.mp3", tmp_path / "vid2.mp3"]
+    for input_file in inputs:
+        input_file.write_bytes(b"")
+    output_dir = tmp_path / "vocals"
+    demucs_inputs = []
+    cut = []
+
+    def write_wav(path, samples):
+        with wave.open(str(path), "wb") as w:
+            w.setnchannels(1)
+            w.setsampwidth(2)
+            w.setframerate(rate)
+            w.writeframes(samples.tobytes())
+
+    def fake_run(cmd, check):
+        if cmd[0] == "ffmpeg":
+            start = int(float(cmd[cmd.index("-ss") + 1]) * rate)
+            length = round(float(cmd[cmd.index("-t") + 1]) * rate)
+            write_wav(cmd[-1], source[start : start + length])
+            cut.append(cmd[-1])
+            return
+        # Identity "separation": vocals are the window itself
+        out = cmd[cmd.index("--out") + 1]
+        tracks = cmd[cmd.index("--out") + 2 :]
+        demucs_inputs.append(tracks)
+        # Only the windows of the file being separated exist in scratch
+        assert sorted(p for p in cut if os.path.exists(p)) == sorted(tracks)
+        for track in tracks:
+            name = os.path.splitext(os.path.basename(track))[0]
+            os.makedirs(os.path.join(out, "htdemucs", name))
+            with wave.open(track, "rb") as src:
+                frames = array("h")
+                frames.frombytes(src.readframes(src.getnframes()))
+            write_wav(os.path.join(out, "htdemucs", name, "vocals.wav"), frames)
+
+    monkeypatch.setattr("isolate_vocals.subprocess.run", fake_run)
+
+    results = run_isolate_vocals_batch(
+        [str(p) for p in inputs],
+        output_dir=str(output_dir),
+        window_seconds=1.0,
+        overlap_seconds=0.2,
+    )
+
+    assert results == {str(p): True for p in inputs}
+    # Three windows (1.2s, 1.2s, 0.5s) per file, one Demucs call per file
+    assert [len(tracks) for tracks in demucs_inputs] == [3, 3]
+    for vid in ("vid", "vid2"):
+        with wave.open(str(output_dir / vid / "vocals.wav"), "rb") as w:
+            stitched = array("h")
+            stitched.frombytes(w.readframes(w.getnframes()))
+        assert stitched == source
+    assert sorted(os.listdir(output_dir)) == ["vid", "vid2"]
+
+
+def test_assess_isolation_records_decision(tmp_path, monkeypatch):
+
+
+    input_file = tmp_path / "vid.mp3"
+    input_file.write_bytes(b"mp3")
+    analysed = []
+
+    def fake_metrics(blocks):
+        analysed.append(1)
+        return {"frames": 500, "floor_ratio": 0.02, "out_of_band": None}
+
+    monkeypatch.setattr(isolate_vocals, "decode_pcm", lambda path, sample_rate: [])
+    monkeypatch.setattr(isolate_vocals, "isolation_metrics", fake_metrics)
+
+    vocals_dir = str(tmp_path / "vocals")
+    decision = isolate_vocals.assess_isolation(str(input_file), vocals_dir)
+    assert decision["isolate"] is False
+    saved = json.loads((tmp_path / "vocals" / "vid" / "isolation.json").read_text())
+    assert saved["metrics"]["floor_ratio"] == 0.02
+    assert saved["thresholds"] == isolate_vocals.DEFAULT_SKIP_THRESHOLDS
+
+    # Cached while the audio and thresholds are unchanged
+    isolate_vocals.assess_isolation(str(input_file), vocals_dir)
+    assert len(analysed) == 1
+    decision = isolate_vocals.assess_isolation(
+        str(input_file), vocals_dir, {"floor_ratio": 0.01}
+    )
+    assert decision["isolate"] is True
+    assert decision["reasons"] == ["floor_ratio"]
+    assert len(analysed) == 2
+
+    # A re-download of the same size is analysed again
+    mtime = input_file.stat().st_mtime_ns
+    os.utime(input_file, ns=(mtime + 10**9, mtime + 10**9))
+    isolate_vocals.assess_isolation(str(input_file), vocals_dir, {"floor_ratio": 0.01})
+    assert len(analysed) == 3
+
+
+def test_pipeline_skips_isolation_when_not_needed(tmp_path, monkeypatch):
+
+    ctx = {
+        "audio_dir": str(tmp_path / "audio"),
+        "vocals_dir": str(tmp_path / "vocals"),
+        "cache_dir": str(tmp_path / "cache"),
+        "config": {"isolate_auto_skip": True},
+        "steps": ["isolate_vocals"],
+    }
+    os.makedirs(ctx["audio_dir"])
+    open(os.path.join(ctx["audio_dir"], "talk.mp3"), "w").close()
+    monkeypatch.setattr(
+        pipeline_steps.isolate_vocals,
+        "assess_isolation",
+        lambda audio, output_dir, thresholds: {"isolate": False},
+    )
+    monkeypatch.setattr(
+        pipeline_steps.isolate_vocals,
+        "run_isolate_vocals_batch",
+        lambda *a, **k: pytest.fail("Demucs should not run"),
+    )
+
+    assert pipeline_steps._run_isolate_vocals(ctx, {"v": "talk"}) is True
+    assert pipeline_steps._isolation_params(ctx)["auto_skip"]["floor_ratio"] == 0.2
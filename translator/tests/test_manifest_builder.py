@@ -5,6 +5,7 @@ import sys
 sys.path.insert(0, os.getcwd())
 
 
+import manifest_builder
 from manifest_builder import run_manifest_builder
 
 
@@ -101,3 +102,88 @@ def test_build_manifest_sheet_keys(tmp_path):
     assert e["creator"] == "CX"
     assert e["subtitleUrl"] == "urlX"
     assert e["tags"] == ["x"]
+
+
+def test_manifest_incremental_and_shards(tmp_path, monkeypatch):
+
+    metadata = [
+        {"v": "a", "title_en": "A", "creator": "Kim"},
+        {"v": "b", "title_en": "B", "creator": "Lee"},
+        {"v": "c", "title_en": "C", "creator": "index"},
+    ]
+    videos_json = tmp_path / "videos.json"
+    videos_json.write_text(json.dumps(metadata), encoding="utf-8")
+    details_dir = tmp_path / "details"
+    details_dir.mkdir()
+    subs_dir = tmp_path / "subs"
+    subs_dir.mkdir()
+    for vid in ("a", "b", "c"):
+        (subs_dir / f"en_{vid}.srt").write_text("", encoding="utf-8")
+    out = tmp_path / "site" / "subtitles.json"
+    args = (str(videos_json), str(subs_dir), str(details_dir), str(out))
+    state = str(tmp_path / "cache" / "manifest_state.json")
+
+    assert run_manifest_builder(*args, shard_by="creator", state_file=state)
+    shards = tmp_path / "site" / "subtitles" / "shards"
+    assert (shards / "Kim.json").exists()
+    index = json.loads((tmp_path / "site" / "subtitles" / "index.json").read_text())
+    assert [s["key"] for s in index["shards"]] == ["Kim", "Lee", "index"]
+    # A creator named "index" gets a shard without clobbering the index
+    assert index["shards"][2]["file"] == "shards/index.json"
+    # Build state lives in the cache, not in the website folder
+    assert os.path.exists(state)
+    assert sorted(os.listdir(tmp_path / "site")) == ["subtitles", "subtitles.json"]
+
+    looked_up = []
+    real = manifest_builder.metadata_index.read_metadata
+    monkeypatch.setattr(
+        manifest_builder.metadata_index,
+        "read_metadata",
+        lambda d, ids: looked_up.append(list(ids)) or real(d, ids),
+    )
+    mtime = out.stat().st_mtime_ns
+    assert run_manifest_builder(*args, shard_by="creator", state_file=state)
+    assert looked_up == [] and out.stat().st_mtime_ns == mtime
+
+    metadata[1]["title_en"] = "B2"
+    videos_json.write_text(json.dumps(metadata), encoding="utf-8")
+    (subs_dir / "en_a.srt").unlink()
+    assert run_manifest_builder(*args, shard_by="creator", state_file=state)
+    assert looked_up == [["b"]]
+    data = json.loads(out.read_text(encoding="utf-8"))
+    assert [(e["v"], e["title"]) for e in data] == [("b", "B2"), ("c", "C")]
+    assert not (shards / "Kim.json").exists()
+
+
+def test_manifest_layout_change_removes_old_shards(tmp_path):
+
+    metadata = [{"v": "a", "title_en": "A", "creator": "Kim"}]
+    videos_json = tmp_path / "videos.json"
+    videos_json.write_text(json.dumps(metadata), encoding="utf-8")
+    details_dir = tmp_path / "details"
+    details_dir.mkdir()
+    subs_dir = tmp_path / "subs"
+    subs_dir.mkdir()
+    (subs_dir / "en_a.srt").write_text("", encoding="utf-8")
+    out = tmp_path / "site" / "subtitles.json"
+    args = (str(videos_json), str(subs_dir), str(details_dir), str(out))
+    state = str(tmp_path / "cache" / "manifest_state.json")
+    index_dir = tmp_path / "site" / "subtitles"
+
+    # Leftovers of the old flat layout, which had no state file
+    index_dir.mkdir(parents=True)
+    (index_dir / "Old.json").write_text("[]", encoding="utf-8")
+    (index_dir / "index.json").write_text(
+        json.dumps({"shardBy": "creator", "shards": [{"file": "Old.json"}]}),
+        encoding="utf-8",
+    )
+    assert run_manifest_builder(*args, shard_by="creator", state_file=state)
+    assert sorted(os.listdir(index_dir)) == ["index.json", "shards"]
+    assert os.listdir(index_dir / "shards") == ["Kim.json"]
+
+    assert run_manifest_builder(*args, shard_by="month", state_file=state)
+    assert os.listdir(index_dir / "shards") == ["unknown.json"]
+
+    assert run_manifest_builder(*args, state_file=state)
+    assert not index_dir.exists()
+    assert out.exists()
@@ -0,0 +1,46 @@
+import json
+import os
+
+import metadata_index
+from metadata_index import MetadataIndex
+from translate_title import save_title_cache
+
+
+def _write(path, data):
+    path.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+
+
+def test_index_serves_fresh_rows_without_opening_files(tmp_path, monkeypatch):
+    index = MetadataIndex(str(tmp_path / "index.sqlite"))
+    _write(tmp_path / "a.json", {"title": "A", "uploader": "Ua"})
+    _write(tmp_path / "b.json", {"title": "B", "uploader": "Ub"})
+
+    first = index.get_many("metadata", str(tmp_path), ["a", "b", "missing"])
+    assert first == {
+        "a": {"title": "A", "uploader": "Ua"},
+        "b": {"title": "B", "uploader": "Ub"},
+    }
+
+    def no_open(*args, **kwargs):
+        raise AssertionError("fresh entries must come from the index")
+
+    monkeypatch.setattr(metadata_index, "open", no_open, raising=False)
+    assert index.get_many("metadata", str(tmp_path), ["b", "a"]) == first
+    monkeypatch.undo()
+
+    # A file rewritten by another tool is re-read and re-indexed
+    _write(tmp_path / "a.json", {"title": "A2", "uploader": "Ua", "extra": 1})
+    os.utime(tmp_path / "a.json", ns=(1, 1))
+    assert index.get_many("metadata", str(tmp_path), ["a"])["a"]["title"] == "A2"
+    index.close()
+
+
+def test_title_writer_updates_index(tmp_path):
+    cache = tmp_path / "cache"
+    cache.mkdir()
+    save_title_cache(str(cache / "title_v1.json"), "v1", "Hello", "hash")
+
+    assert os.path.exists(cache / metadata_index.INDEX_FILE)
+    assert metadata_index.read_titles(str(cache), ["v1", "v2"]) == {
+        "v1": {"video_id": "v1", "title_en": "Hello", "source_hash": "hash"}
+    }
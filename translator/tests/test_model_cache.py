@@ -0,0 +1,122 @@
+import threading
+
+import pytest
+
+from model_cache import ModelCache, estimate_model_bytes
+
+
+class FakeLoader:
+    def __init__(self):
+        self.loads = []
+
+    def __call__(self, model_size, device):
+        self.loads.append((model_size, device))
+        return {"name": model_size}
+
+
+def _cache(loader, **kwargs):
+    sizes = {"small": 1, "medium": 3, "large": 6}
+    return ModelCache(
+        loader=loader,
+        size_of=lambda m: sizes[m["name"]],
+        estimate=lambda name: sizes[name],
+        **kwargs,
+    )
+
+
+def test_model_loaded_once_and_reused():
+    loader = FakeLoader()
+    cache = _cache(loader, max_models=2)
+
+    for _ in range(3):
+        with cache.use("small", "cpu") as model:
+            assert model == {"name": "small"}
+
+    assert loader.loads == [("small", "cpu")]
+    assert cache.loaded() == [("small", "cpu")]
+
+
+def test_lru_eviction_by_count():
+    loader = FakeLoader()
+    cache = _cache(loader, max_models=2)
+
+    for size in ("small", "medium", "small", "large"):
+        with cache.use(size, "cpu"):
+            pass
+
+    # medium was least recently used when large arrived
+    assert cache.loaded() == [("small", "cpu"), ("large", "cpu")]
+    assert len(loader.loads) == 3
+
+
+def test_memory_ceiling_evicts_idle_models():
+    loader = FakeLoader()
+    cache = _cache(loader, max_models=5, max_bytes=9)
+
+    with cache.use("small", "cpu"):
+        pass
+    with cache.use("medium", "cpu"):
+        pass
+    with cache.use("large", "cpu"):
+        pass
+
+    # 1 + 3 + 6 exceeds 9, so the oldest (small) goes
+    assert cache.loaded() == [("medium", "cpu"), ("large", "cpu")]
+
+    cache.configure(max_bytes=6)
+    assert cache.loaded() == [("large", "cpu")]
+
+
+def test_models_in_use_are_not_evicted():
+    loader = FakeLoader()
+    cache = _cache(loader, max_models=1)
+
+    with cache.use("small", "cpu"):
+        with cache.use("medium", "cpu"):
+            assert len(cache.loaded()) == 2
+        assert cache.loaded() == [("small", "cpu")]
+    assert cache.loaded() == [("small", "cpu")]
+
+
+def test_failed_load_is_not_cached():
+    calls = []
+
+    def loader(size, device):
+        calls.append(size)
+        if len(calls) == 1:
+            raise RuntimeError("out of memory")
+        return {"name": size}
+
+    cache = _cache(loader)
+    with pytest.raises(RuntimeError):
+        with cache.use("small", "cpu"):
+            pass
+    assert cache.loaded() == []
+    with cache.use("small", "cpu"):
+        pass
+    assert calls == ["small", "small"]
+
+
+def test_concurrent_users_share_one_load():
+    loader = FakeLoader()
+    cache = _cache(loader)
+    barrier = threading.Barrier(4)
+
+    def worker():
+        barrier.wait()
+        with cache.use("small", "cpu"):
+            pass
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert loader.loads == [("small", "cpu")]
+
+
+def test_estimate_model_bytes():
+    assert estimate_model_bytes("large-v3") == estimate_model_bytes("large")
+    assert estimate_model_bytes("base.en") > 0
+    assert estimate_model_bytes("unknown") == 0
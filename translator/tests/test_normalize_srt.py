@@ -1,9 +1,10 @@
+import json
 import os
 import sys
 
 sys.path.insert(0, os.getcwd())
 
-from normalize_srt import normalize_timestamp, run_normalize_srt
+from normalize_srt import collapse_repeats, normalize_timestamp, run_normalize_srt
 
 SAMPLE_RAW = """1
 59.9 --> 69.9
@@ -38,6 +39,73 @@ def test_parse_srt_file(tmp_path):
     assert "World" in text
 
 
+def test_normalize_in_place_streams_cues(tmp_path):
+    # Output may replace the input; cues are renumbered after collapsing
+    path = tmp_path / "sub.srt"
+    path.write_text(SAMPLE_RAW.replace("3\n", "9\n"), encoding="utf-8")
+    assert run_normalize_srt(str(path), str(path))
+    assert path.read_text(encoding="utf-8") == (
+        "1\n00:00:59,900 --> 00:01:19,900\nHello\n\n"
+        "2\n00:01:20,000 --> 00:01:21,000\nWorld\n\n"
+    )
+
+
+def test_filter_drops_hallucinations_and_loops(tmp_path):
+    blocks = [
+        ("00:00:01,000", "00:00:03,000", "저그가 앞마당을 가져갑니다"),
+        ("00:00:04,000", "00:00:06,000", "저그가 앞마당을 가져갑니다!"),
+        ("00:00:07,000", "00:00:09,000", "네 네 네 네 네 좋습니다"),
+        ("00:00:10,000", "00:00:12,000", "감사합니다"),
+        ("00:00:13,000", "00:00:15,000", "좋아요"),
+        ("00:00:16,000", "00:00:18,000", "감사합니다"),
+        ("00:00:19,000", "00:00:21,000", "좋아요"),
+        ("00:00:22,000", "00:00:24,000", "감사합니다"),
+        ("00:00:25,000", "00:00:25,100", "아주 길고 빠르게 지나가는 말도 안 되는 자막"),
+        ("00:00:30,000", "00:00:40,000", "시청해 주셔서 감사합니다."),
+    ]
+    raw = tmp_path / "raw.srt"
+    raw.write_text(
+        "".join(f"{i}\n{a} --> {b}\n{t}\n\n" for i, (a, b, t) in enumerate(blocks, 1)),
+        encoding="utf-8",
+    )
+    out = tmp_path / "out.srt"
+    report = tmp_path / "filter.json"
+    assert run_normalize_srt(str(raw), str(out), {}, str(report))
+
+    text = out.read_text(encoding="utf-8")
+    assert "1\n00:00:01,000 --> 00:00:06,000\n저그가 앞마당을 가져갑니다\n" in text
+    assert "2\n00:00:07,000 --> 00:00:09,000\n네 좋습니다\n" in text
+    assert text.count("감사합니다") == 2 and text.count("좋아요") == 2
+    assert "시청" not in text and "빠르게" not in text
+
+    stats = json.loads(report.read_text(encoding="utf-8"))
+    assert stats["cues_in"] == 10 and stats["cues_out"] == 6
+    assert stats["dropped"] == {
+        "hallucination": 1,
+        "repetition": 1,
+        "dense": 1,
+        "empty": 0,
+    }
+    assert stats["merged"] == 1 and stats["shortened"] == 1
+    assert stats["tokens_saved"] > 0 and 0 < stats["saved_ratio"] < 1
+
+
+def test_collapse_repeats():
+    assert collapse_repeats("go go go go") == "go"
+    assert collapse_repeats("감사합니다감사합니다감사합니다") == "감사합니다"
+    assert collapse_repeats("ㅋㅋㅋㅋㅋㅋㅋ") == "ㅋㅋㅋ"
+    assert collapse_repeats("no no, really") == "no no, really"
+
+
+def test_collapse_repeats_keeps_numbers_and_laughter():
+    assert collapse_repeats("상금 1000000원") == "상금 1000000원"
+    assert collapse_repeats("hahaha") == "hahaha"
+    assert collapse_repeats("ㅋㅋㅋㅋㅋㅋ") == "ㅋㅋㅋ"
+    # A short loop inside a longer sentence is real speech, not a hallucination
+    text = "오늘 방송에서 정말 많은 일이 있었는데 감사합니다감사합니다감사합니다"
+    assert collapse_repeats(text) == text
+
+
 def test_normalize_timestamp_overflow():
     # No overflow remains unchanged except zero-padding
     assert normalize_timestamp("00:00:10,005") == "00:00:10,005"
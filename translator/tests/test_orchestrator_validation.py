@@ -29,3 +29,27 @@ def test_orchestrator_mutually_exclusive_sources(tmp_path):
         check=False,
     )
     assert proc.returncode != 0
+
+
+def test_orchestrator_rejects_unknown_concurrency_step(tmp_path):
+    cfg = {
+        "video_list_file": str(tmp_path / "videos.json"),
+        "video_metadata_dir": str(tmp_path / "metadata"),
+        "audio_dir": str(tmp_path / "audio"),
+        "vocals_dir": str(tmp_path / "vocals"),
+        "subtitles_dir": str(tmp_path / "subtitles"),
+        "cache_dir": str(tmp_path / ".cache"),
+        "slang_file": str(tmp_path / "slang.txt"),
+        "website_dir": str(tmp_path / "website"),
+        "steps": ["download_audio"],
+        "concurrency": {"manifest_builder": 2},
+    }
+    (tmp_path / "videos.json").write_text("[]", encoding="utf-8")
+    cfg_path = tmp_path / "config.json"
+    cfg_path.write_text(json.dumps(cfg), encoding="utf-8")
+
+    proc = subprocess.run(
+        [sys.executable, "pipeline_orchestrator.py", "--config", str(cfg_path)],
+        check=False,
+    )
+    assert proc.returncode != 0
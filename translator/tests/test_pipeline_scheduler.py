@@ -0,0 +1,172 @@
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.getcwd())
+
+import pipeline_orchestrator
+from pipeline_scheduler import run_graph
+from pipeline_steps import build_step_graph, step_dependencies
+
+
+def _chain(videos, steps):
+    graph = {}
+    for i in range(len(videos)):
+        for j, step in enumerate(steps):
+            graph[(step, i)] = [((steps[j - 1], i), True)] if j else []
+    return graph
+
+
+def test_graph_keeps_per_video_order_and_skips_after_failure():
+    videos = ["a", "b", "c"]
+    steps = ["download_audio", "transcribe_audio", "translate_subtitles"]
+    seen = {"a": [], "b": [], "c": []}
+    lock = threading.Lock()
+
+    def run_node(key):
+        step, i = key
+        with lock:
+            seen[videos[i]].append(step)
+        # Video b fails transcription; its translation must not run
+        return not (videos[i] == "b" and step == "transcribe_audio")
+
+    done = []
+    status = run_graph(
+        _chain(videos, steps),
+        run_node,
+        pool_of=lambda key: key[0],
+        workers={"download_audio": 2, "translate_subtitles": 3},
+        on_node_done=done.append,
+    )
+    assert sorted(seen["a"]) == sorted(steps)
+    assert seen["c"] == steps
+    assert seen["b"] == ["download_audio", "transcribe_audio"]
+    assert len(done) == 7
+    assert status[("transcribe_audio", 1)] == "failed"
+    assert status[("translate_subtitles", 1)] == "skipped"
+
+
+def test_graph_overlaps_nodes_in_the_same_pool():
+    videos = list(range(4))
+    active = {"n": 0, "peak": 0}
+    lock = threading.Lock()
+
+    def run_node(key):
+        if key[0] == "download_audio":
+            with lock:
+                active["n"] += 1
+                active["peak"] = max(active["peak"], active["n"])
+            time.sleep(0.05)
+            with lock:
+                active["n"] -= 1
+        return True
+
+    run_graph(
+        _chain(videos, ["download_audio", "transcribe_audio"]),
+        run_node,
+        pool_of=lambda key: key[0],
+        workers={"download_audio": 4},
+    )
+    assert active["peak"] > 1
+
+
+def test_graph_treats_exceptions_as_failures():
+    calls = []
+
+    def run_node(key):
+        calls.append(key[0])
+        if key[0] == "download_audio":
+            raise RuntimeError("boom")
+        return True
+
+    status = run_graph(
+        _chain([0], ["download_audio", "isolate_vocals"]),
+        run_node,
+        pool_of=lambda key: key[0],
+        workers={},
+    )
+    assert calls == ["download_audio"]
+    assert status[("isolate_vocals", 0)] == "skipped"
+
+
+def test_step_dependencies_follow_artifacts():
+    steps = [
+        "read_youtube_urls",
+        "fetch_video_metadata",
+        "translate_title",
+        "build_videos_json",
+        "download_audio",
+        "isolate_vocals",
+        "transcribe_audio",
+        "normalize_srt",
+        "translate_subtitles",
+        "manifest_builder",
+    ]
+    deps = step_dependencies(steps)
+    assert deps["translate_title"] == ["fetch_video_metadata"]
+    assert deps["download_audio"] == []
+    assert deps["transcribe_audio"] == ["download_audio", "isolate_vocals"]
+    assert deps["translate_subtitles"] == ["transcribe_audio", "normalize_srt"]
+
+    graph = build_step_graph(steps, [{"v": "a"}, {"v": "b"}])
+    # Source steps run before the graph; audio work does not wait for titles
+    assert ("read_youtube_urls", None) not in graph
+    assert graph[("download_audio", 0)] == []
+    # Global steps wait for every video, but do not require success
+    assert (("translate_title", 1), False) in graph[("build_videos_json", None)]
+
+
+def test_duplicate_marker_orders_fingerprint_before_consumers():
+    deps = step_dependencies(
+        ["download_audio", "fingerprint_audio", "isolate_vocals", "translate_subtitles"]
+    )
+    assert deps["isolate_vocals"] == ["download_audio", "fingerprint_audio"]
+    assert deps["translate_subtitles"] == ["fingerprint_audio"]
+
+
+def test_global_step_runs_after_failed_producers():
+    graph = build_step_graph(
+        ["fetch_video_metadata", "translate_title", "build_videos_json"],
+        [{"v": "a"}, {"v": "b"}],
+    )
+    ran = []
+
+    def run_node(key):
+        ran.append(key)
+        return key != ("fetch_video_metadata", 0)
+
+    status = run_graph(graph, run_node, pool_of=lambda key: key[0], workers={})
+    assert status[("translate_title", 0)] == "skipped"
+    assert status[("translate_title", 1)] == "ok"
+    assert status[("build_videos_json", None)] == "ok"
+    assert ran[-1] == ("build_videos_json", None)
+
+
+def test_dag_stops_a_video_after_its_first_failure(monkeypatch):
+    videos = [{"v": "a"}, {"v": "b"}]
+    steps = ["download_audio", "fetch_video_metadata", "translate_title"]
+    b_failed = threading.Event()
+    seen = {"a": [], "b": []}
+    lock = threading.Lock()
+
+    def fake_run_step(step, ctx, video):
+        with lock:
+            seen[video["v"]].append(step)
+        if video["v"] == "b" and step == "download_audio":
+            b_failed.set()
+            return False
+        if video["v"] == "a" and step == "fetch_video_metadata":
+            # b's metadata fetch queues behind this one in the 1-worker pool
+            assert b_failed.wait(5)
+        return True
+
+    monkeypatch.setattr(pipeline_orchestrator, "run_step", fake_run_step)
+    status = pipeline_orchestrator.run_dag(
+        steps, videos, {}, {"fetch_video_metadata": 1}, lambda s, v: None
+    )
+    # Like the serial loop: nothing after b's failed download runs for b
+    assert sorted(seen["a"]) == sorted(steps)
+    assert seen["b"] == ["download_audio"]
+    assert status[("fetch_video_metadata", 1)] == "skipped"
+    assert status[("translate_title", 1)] == "skipped"
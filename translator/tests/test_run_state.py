@@ -0,0 +1,111 @@
+import json
+import os
+import sys
+
+sys.path.insert(0, os.getcwd())
+
+import pipeline_orchestrator
+import pipeline_steps
+from run_state import FRESH, STALE, UNKNOWN, RunState
+
+
+def test_fingerprint_tracks_inputs_params_and_outputs(tmp_path):
+    audio = tmp_path / "a.mp3"
+    srt = tmp_path / "kr_a.srt"
+    audio.write_bytes(b"audio")
+    srt.write_text("1\n00:00:00,000 --> 00:00:01,000\nX\n", encoding="utf-8")
+    state = RunState(str(tmp_path / "state.sqlite"))
+
+    fp, digests = state.fingerprint({"audio": str(audio)}, {"provider": "local"})
+    outputs = {"kr_srt": str(srt)}
+    assert state.check("a", "transcribe_audio", fp, outputs) == UNKNOWN
+    state.record("a", "transcribe_audio", fp, digests, {"provider": "local"}, outputs, 1.0)
+    assert state.check("a", "transcribe_audio", fp, outputs) == FRESH
+
+    # Different parameters produce a different fingerprint
+    fp2, _ = state.fingerprint({"audio": str(audio)}, {"provider": "openai"})
+    assert state.check("a", "transcribe_audio", fp2, outputs) == STALE
+
+    # A truncated output no longer matches the recorded digest
+    srt.write_text("1\n00:00", encoding="utf-8")
+    assert state.check("a", "transcribe_audio", fp, outputs) == STALE
+    state.close()
+
+
+def test_records_survive_reopen_and_in_place_rewrites(tmp_path):
+    srt = tmp_path / "kr_a.srt"
+    srt.write_text("raw", encoding="utf-8")
+    db = str(tmp_path / "state.sqlite")
+    state = RunState(db)
+    outputs = {"kr_srt": str(srt)}
+    fp, d = state.fingerprint({}, {})
+    state.record("a", "transcribe_audio", fp, d, {}, outputs, 0.1)
+    # normalize_srt rewrites the same artifact in place
+    srt.write_text("normalized", encoding="utf-8")
+    state.record("a", "normalize_srt", fp, d, {}, outputs, 0.1)
+    state.close()
+
+    reopened = RunState(db)
+    assert reopened.check("a", "transcribe_audio", fp, outputs) == FRESH
+    assert reopened.check("a", "normalize_srt", fp, outputs) == FRESH
+    reopened.close()
+
+
+def test_retranscription_invalidates_normalize_srt(tmp_path):
+    srt = tmp_path / "kr_a.srt"
+    db = str(tmp_path / "state.sqlite")
+    state = RunState(db)
+    outputs = {"kr_srt": str(srt)}
+    fp, d = state.fingerprint({}, {})
+    rewriters = tuple(pipeline_steps.in_place_rewriters("transcribe_audio"))
+    assert rewriters == ("normalize_srt",)
+
+    srt.write_text("raw", encoding="utf-8")
+    state.record("a", "transcribe_audio", fp, d, {}, outputs, 0.1, rewriters)
+    srt.write_text("normalized", encoding="utf-8")
+    state.record("a", "normalize_srt", fp, d, {}, outputs, 0.1)
+
+    # The vocals changed: transcribe_audio writes a new raw transcript
+    new_fp, new_d = state.fingerprint({}, {"vocals": "changed"})
+    assert state.check("a", "transcribe_audio", new_fp, outputs) == STALE
+    srt.write_text("raw again", encoding="utf-8")
+    state.record("a", "transcribe_audio", new_fp, new_d, {}, outputs, 0.1, rewriters)
+    state.close()
+
+    reopened = RunState(db)
+    assert reopened.check("a", "transcribe_audio", new_fp, outputs) == FRESH
+    assert reopened.check("a", "normalize_srt", fp, outputs) != FRESH
+    reopened.close()
+
+
+def test_orchestrator_skips_fresh_steps(tmp_path, monkeypatch, caplog):
+    monkeypatch.chdir(tmp_path)
+    subs = tmp_path / "subs"
+    subs.mkdir()
+    (subs / "kr_a.srt").write_text(
+        "1\n00:00:01,000 --> 00:00:02,000\nhi\n", encoding="utf-8"
+    )
+    (tmp_path / "videos.json").write_text(json.dumps([{"v": "a"}]), encoding="utf-8")
+    cfg = {
+        "video_list_file": "videos.json",
+        "video_metadata_dir": "meta",
+        "audio_dir": "audio",
+        "vocals_dir": "vocals",
+        "subtitles_dir": "subs",
+        "cache_dir": ".cache",
+        "slang_file": "slang.txt",
+        "website_dir": "web",
+        "steps": ["normalize_srt"],
+        "run_state": True,
+    }
+    (tmp_path / "cfg.json").write_text(json.dumps(cfg), encoding="utf-8")
+    monkeypatch.setattr(sys, "argv", ["prog", "--config", "cfg.json"])
+    caplog.set_level("INFO")
+
+    pipeline_orchestrator.main()
+    assert "fingerprint unchanged" not in caplog.text
+    assert os.path.exists(tmp_path / ".cache" / "run_state.sqlite")
+
+    caplog.clear()
+    pipeline_orchestrator.main()
+    assert "Skipping normalize_srt video=a: fingerprint unchanged" in caplog.text
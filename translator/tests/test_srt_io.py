@@ -0,0 +1,72 @@
+import os
+import sys
+
+sys.path.insert(0, os.getcwd())
+
+from srt_io import (
+    Cue,
+    clamp_cues,
+    format_srt,
+    iter_srt_file,
+    parse_srt,
+    parse_timestamp,
+    scale_cues,
+    seconds_to_ms,
+    shift_cues,
+    write_srt,
+)
+
+
+def test_parse_handles_bom_crlf_and_malformed_blocks(tmp_path):
+    raw = (
+        "\ufeff1\r\n00:00:01,000 --> 00:00:02,500\r\nHello\r\nthere\r\n\r\n"
+        "garbage block\r\n\r\n"
+        "2\r\nnot a time --> also not\r\nDropped\r\n\r\n"
+        "3\r\n00:00:03,000 --> 00:00:04,000 X1:10 X2:20\r\nWorld\r\n"
+        "4\r\n00:00:05,000 --> 00:00:06,000\r\nNo blank line before me\r\n"
+    )
+    path = tmp_path / "in.srt"
+    path.write_bytes(raw.encode("utf-8"))
+
+    cues = list(iter_srt_file(str(path)))
+    assert [(c.index, c.start, c.end, c.lines) for c in cues] == [
+        (1, 1000, 2500, ["Hello", "there"]),
+        (3, 3000, 4000, ["World"]),
+        (4, 5000, 6000, ["No blank line before me"]),
+    ]
+
+
+def test_missing_index_and_lenient_timestamps():
+    cues = parse_srt("59.9 --> 1:09.9\nA\n\n7\n1:2:3.4 --> 01:02:04,000\nB\n")
+    assert [(c.index, c.start, c.end) for c in cues] == [
+        (1, 59900, 69900),
+        (7, 3723400, 3724000),
+    ]
+    assert parse_timestamp("00:00:60,000") == 60000
+
+
+def test_write_round_trip_and_renumber(tmp_path):
+    out = tmp_path / "out.srt"
+    cues = [Cue(5, 0, 1500, ["a"]), Cue(9, 3_600_000, 3_601_001, ["b", "c"])]
+    assert write_srt(str(out), cues, renumber=True) == 2
+    text = out.read_text(encoding="utf-8")
+    assert text == (
+        "1\n00:00:00,000 --> 00:00:01,500\na\n\n"
+        "2\n01:00:00,000 --> 01:00:01,001\nb\nc\n\n"
+    )
+    assert format_srt(parse_srt(text)) == text
+
+
+def test_timeline_ops_stay_in_integer_milliseconds():
+    cues = [Cue(1, 500, 1500, ["a"]), Cue(2, 2000, 3000, ["b"]), Cue(3, 9000, 9500, [])]
+    shift_cues(cues, -1000)
+    assert [(c.start, c.end) for c in cues] == [(-500, 500), (1000, 2000), (8000, 8500)]
+    kept = clamp_cues(cues, 0, 8000)
+    assert [(c.index, c.start, c.end) for c in kept] == [(1, 0, 500), (2, 1000, 2000)]
+    scale_cues(kept, 1.002)
+    assert [(c.start, c.end) for c in kept] == [(0, 501), (1002, 2004)]
+    # Float seconds are rounded once, never to a ",1000" millisecond field
+    assert seconds_to_ms(0.9996) == 1000
+    assert format_srt([Cue(1, seconds_to_ms(0.9996), 2000, ["x"])]).startswith(
+        "1\n00:00:01,000 -->"
+    )
@@ -7,6 +7,9 @@ sys.path.insert(0, os.getcwd())
 
 import translator.submit_to_catalog as sub
 
+import translation_cache
+from translate_subtitles import chunk_cache_key, chunk_subtitles, parse_srt_file
+
 
 def test_skips_when_missing_and_no_stub(tmp_path, monkeypatch, capsys):
     vids = tmp_path / "videos.json"
@@ -44,3 +47,41 @@ def test_skips_trivial_subs(tmp_path, monkeypatch, capsys):
     assert ok is False
     assert "invalid/trivial" in captured.lower()
 
+
+
+def test_reconstructs_en_from_translation_cache(tmp_path):
+    subs_dir = tmp_path / "subs"
+    subs_dir.mkdir()
+    kr = subs_dir / "kr_abc123.srt"
+    kr.write_text(
+        "1\n00:00:01,000 --> 00:00:02,000\n안녕\n\n"
+        "2\n00:00:03,000 --> 00:00:04,000\n반가워\n",
+        encoding="utf-8",
+    )
+    slang = tmp_path / "slang.txt"
+    slang.write_text("gg = good game", encoding="utf-8")
+    cache_dir = tmp_path / ".cache"
+    (chunk,) = chunk_subtitles(parse_srt_file(str(kr)), 50, 5)
+    cache = translation_cache.open_cache(str(cache_dir))
+    cache.put(
+        chunk_cache_key(chunk, "gpt-4.1-mini", "gg = good game"),
+        "1\n00:00:01,000 --> 00:00:02,000\nHi\n\n"
+        "2\n00:00:03,000 --> 00:00:04,000\nNice to meet you\n",
+        chunk[0].start,
+    )
+
+    # Another glossary gives other keys, so nothing is reconstructed
+    other = tmp_path / "other.txt"
+    other.write_text("", encoding="utf-8")
+    assert (
+        sub._reconstruct_en_from_cache(
+            str(cache_dir), "abc123", str(subs_dir), slang_file=str(other)
+        )
+        is None
+    )
+
+    out = sub._reconstruct_en_from_cache(
+        str(cache_dir), "abc123", str(subs_dir), slang_file=str(slang)
+    )
+    assert out == str(subs_dir / "en_abc123.srt")
+    assert [c.lines for c in parse_srt_file(out)] == [["Hi"], ["Nice to meet you"]]
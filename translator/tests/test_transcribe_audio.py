@@ -1,14 +1,19 @@
 import importlib
+import math
 import os
 import sys
+import threading
+import time
+from array import array
 from unittest.mock import MagicMock
 
 sys.path.insert(0, os.getcwd())
 
 import pytest
 
-from transcribe_audio import format_timestamp, run_transcribe_audio
+import audio_analysis
 import transcribe_audio as stt
+from transcribe_audio import format_timestamp, run_transcribe_audio
 
 
 class DummyModel:
@@ -148,6 +153,183 @@ def test_transcribe_audio_openai_chunking(tmp_path, monkeypatch, mock_imports):
     assert "2\n00:00:01,000 --> 00:00:01,500\nB" in data
 
 
+def test_transcribe_audio_openai_parallel_chunks(tmp_path, monkeypatch, mock_imports):
+    audio = tmp_path / "long.mp3"
+    audio.write_bytes(b"0" * 100)
+    output_srt = tmp_path / "out.srt"
+
+    chunks_dir = tmp_path / "chunks"
+    chunks_dir.mkdir()
+    chunks = []
+    for i in range(4):
+        c = chunks_dir / f"chunk_{i:03d}.mp3"
+        c.write_text(str(i), encoding="utf-8")
+        chunks.append(str(c))
+    monkeypatch.setattr(
+        "transcribe_audio._ffmpeg_segment", lambda *a, **k: list(chunks)
+    )
+
+    state = {"in_flight": 0, "max": 0}
+    lock = threading.Lock()
+
+    def fake_create(model, file, language, response_format):
+        with lock:
+            state["in_flight"] += 1
+            state["max"] = max(state["max"], state["in_flight"])
+        name = file.read().decode("utf-8")
+        # Later chunks finish first so ordering is not accidental
+        time.sleep(0.05 * (4 - int(name)))
+        with lock:
+            state["in_flight"] -= 1
+        return f"1\n00:00:00,000 --> 00:00:00,500\nPart {name}\n\n"
+
+    mock_imports.audio.transcriptions.create.side_effect = fake_create
+
+    ok = run_transcribe_audio(
+        audio_path=str(audio),
+        output_subtitle=str(output_srt),
+        provider="openai",
+        max_upload_bytes=1,
+        segment_time=10,
+        max_in_flight=2,
+    )
+    assert ok is True
+    assert state["max"] == 2
+    data = output_srt.read_text(encoding="utf-8")
+    assert [data.index(f"Part {i}") for i in range(4)] == sorted(
+        data.index(f"Part {i}") for i in range(4)
+    )
+    assert "4\n00:00:30,000 --> 00:00:30,500\nPart 3" in data
+    for c in chunks:
+        assert os.path.exists(os.path.splitext(c)[0] + ".srt")
+
+
+def test_transcribe_audio_openai_silence_segments(tmp_path, monkeypatch, mock_imports):
+
+
+    rate = audio_analysis.SAMPLE_RATE
+    samples = array("h")
+    # Speech, a pause at 9.3-9.7s, more speech
+    for seconds, amp in ((9.3, 0.4), (0.4, 0.0), (5.0, 0.4)):
+        for i in range(int(seconds * rate)):
+            samples.append(int(amp * 32767 * math.sin(2 * math.pi * 440 * i / rate)))
+    data = samples.tobytes()
+    monkeypatch.setattr(
+        audio_analysis,
+        "decode_pcm",
+        lambda path: (data[i : i + 8192] for i in range(0, len(data), 8192)),
+    )
+    extracted = []
+
+    def fake_extract(audio_path, out_path, start, duration):
+        extracted.append((start, duration))
+        with open(out_path, "w", encoding="utf-8") as f:
+            f.write(str(len(extracted) - 1))
+
+    monkeypatch.setattr("transcribe_audio._ffmpeg_extract", fake_extract)
+
+    replies = {
+        # The straddling cue appears in both overlapping chunks
+        "0": "1\n00:00:01,000 --> 00:00:02,000\nA\n\n"
+        "2\n00:00:09,600 --> 00:00:10,200\nStraddle\n\n",
+        "1": "1\n00:00:01,100 --> 00:00:01,700\nStraddle\n\n"
+        "2\n00:00:03,000 --> 00:00:04,000\nB\n\n",
+    }
+    mock_imports.audio.transcriptions.create.side_effect = (
+        lambda model, file, language, response_format: replies[file.read().decode()]
+    )
+
+    audio = tmp_path / "vod.mp3"
+    audio.write_bytes(b"0" * 100)
+    output_srt = tmp_path / "out.srt"
+    kwargs = {
+        "audio_path": str(audio),
+        "output_subtitle": str(output_srt),
+        "provider": "openai",
+        "max_upload_bytes": 1,
+        "segment_time": 10,
+        "segment_mode": "silence",
+    }
+    assert run_transcribe_audio(**kwargs) is True
+
+    assert len(extracted) == 2
+    cut = extracted[1][0] + 1.0  # second chunk starts one overlap before the cut
+    assert 9.3 <= cut <= 9.7
+    assert extracted[0][0] == 0.0
+    data_out = output_srt.read_text(encoding="utf-8")
+    assert data_out.count("Straddle") == 1
+    assert data_out.index("A") < data_out.index("Straddle") < data_out.index("B")
+    assert "3\n" in data_out and "\nB\n" in data_out
+    manifest = tmp_path / "vod_silence_chunks" / "segments.json"
+    assert manifest.exists()
+
+    # A rerun reuses the manifest and cached chunk transcripts
+    output_srt.unlink()
+    assert run_transcribe_audio(**kwargs) is True
+    assert len(extracted) == 2
+    assert mock_imports.audio.transcriptions.create.call_count == 2
+
+
+def test_transcribe_audio_vad_maps_times_back(tmp_path, monkeypatch, mock_imports):
+
+
+    rate = audio_analysis.SAMPLE_RATE
+    samples = array("h")
+    # 3s silence, 1s speech, 2s silence, 1.5s speech
+    for seconds, amp in ((3.0, 0.0), (1.0, 0.4), (2.0, 0.0), (1.5, 0.4)):
+        for i in range(int(seconds * rate)):
+            samples.append(int(amp * 32767 * math.sin(2 * math.pi * 440 * i / rate)))
+    data = samples.tobytes()
+    decodes = []
+
+    def fake_decode(path):
+        decodes.append(path)
+        return (data[i : i + 8192] for i in range(0, len(data), 8192))
+
+    monkeypatch.setattr(audio_analysis, "decode_pcm", fake_decode)
+
+    vocals = tmp_path / "vocals.wav"
+    vocals.write_bytes(b"RIFF")
+    output_srt = tmp_path / "kr.srt"
+    ok = run_transcribe_audio(
+        audio_path=str(vocals),
+        output_subtitle=str(output_srt),
+        provider="local",
+        model_size="dummy",
+        vad=True,
+    )
+
+    assert ok is True
+    assert len(decodes) == 2  # level pass + compact WAV pass
+    assert (tmp_path / "vocals_speech.wav").exists()
+    text = output_srt.read_text(encoding="utf-8")
+    # "Hello" is 0.5s into the compact file; its region starts at 3.0s - 0.2s pad
+    assert "00:00:03,300 --> 00:00:04,050\nHello" in text
+    assert "World" in text
+
+    kwargs = {
+        "audio_path": str(vocals),
+        "output_subtitle": str(output_srt),
+        "provider": "local",
+        "model_size": "dummy",
+    }
+    # Unchanged source and options: the speech WAV and map are reused
+    output_srt.unlink()
+    assert run_transcribe_audio(vad=True, **kwargs) is True
+    assert len(decodes) == 2
+    # A re-isolated file of the same size gets a new map
+    output_srt.unlink()
+    st = os.stat(vocals)
+    os.utime(vocals, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    assert run_transcribe_audio(vad=True, **kwargs) is True
+    assert len(decodes) == 4
+    # So do different VAD options, and the old speech transcript is not reused
+    output_srt.unlink()
+    assert run_transcribe_audio(vad={"pad": 0.0}, **kwargs) is True
+    assert len(decodes) == 6
+    assert "00:00:03,500 --> " in output_srt.read_text(encoding="utf-8")
+
+
 def test_transcribe_audio_missing_file(tmp_path):
     ok = run_transcribe_audio(
         audio_path="no_such.mp3", output_subtitle=str(tmp_path / "out.srt")
@@ -234,34 +416,18 @@ def test_transcribe_audio_openai_insufficient_quota_short_circuit(tmp_path, mock
     assert calls_after == calls_before
 
 
-def test_transcribe_audio_openai_reuse_existing_chunks_skips_segment(tmp_path, mock_imports, monkeypatch):
-    # Create a big audio to trigger chunking
-    audio = tmp_path / "big.mp3"
-    audio.write_bytes(b"0" * (25_000_000))
+def test_transcribe_audio_openai_rate_limit_is_retried(tmp_path, mock_imports, monkeypatch):
+    audio = tmp_path / "audio.mp3"
+    audio.write_text("", encoding="utf-8")
     output_srt = tmp_path / "out.srt"
+    sleeps = []
+    monkeypatch.setattr(stt.time, "sleep", sleeps.append)
 
-    # Precreate persistent chunks next to audio so we reuse them
-    chunks_dir = tmp_path / "big_chunks"
-    chunks_dir.mkdir()
-    c1 = chunks_dir / "chunk_000.mp3"
-    c2 = chunks_dir / "chunk_001.mp3"
-    c1.write_bytes(b"dummy")
-    c2.write_bytes(b"dummy")
-
-    # Track if ffmpeg segmenter gets called (it should not)
-    called = {"v": False}
-
-    def fake_segment(path, out_dir, segment_time=600, bitrate="64k"):
-        called["v"] = True
-        return [str(c1), str(c2)]
-
-    monkeypatch.setattr("transcribe_audio._ffmpeg_segment", fake_segment)
-
-    # Mock API to return simple srt for each chunk
     mock_client = mock_imports
+    # A plain rate limit (no quota code) must not block the audio
     mock_client.audio.transcriptions.create.side_effect = [
-        "1\n00:00:00,000 --> 00:00:00,500\nX\n\n",
-        "1\n00:00:00,500 --> 00:00:01,000\nY\n\n",
+        Exception("Error code: 429 - {\"error\": {\"code\": \"rate_limit_exceeded\"}}"),
+        "1\n00:00:00,500 --> 00:00:01,000\nOK\n\n",
     ]
 
     ok = run_transcribe_audio(
@@ -270,46 +436,95 @@ def test_transcribe_audio_openai_reuse_existing_chunks_skips_segment(tmp_path, m
         provider="openai",
         api_model="whisper-1",
         language="ko",
-        max_upload_bytes=1,
-        segment_time=1,
     )
     assert ok is True
-    assert called["v"] is False  # did not call segmenter
-    assert output_srt.exists()
+    assert stt.quota_blocked() is False
+    assert not os.path.exists(stt._quota_marker_path(str(audio)))
+    assert sleeps == [2.0]
+
 
+def _fake_segmenter(calls):
+    """Stand-in for ffmpeg that writes one chunk per ``segment_time`` of 2s audio."""
 
-def test_transcribe_audio_openai_reuse_chunk_srt_cache_skips_api(tmp_path, mock_imports):
-    # Create big audio and matching persistent chunk directory with cached SRTs
+    def fake_segment(path, out_dir, segment_time=600, bitrate="64k"):
+        calls.append(segment_time)
+        os.makedirs(out_dir, exist_ok=True)
+        paths = []
+        for i in range(2 // segment_time):
+            paths.append(os.path.join(out_dir, f"chunk_{i:03d}.mp3"))
+            with open(paths[-1], "w", encoding="utf-8") as f:
+                f.write(str(i))
+        return paths
+
+    return fake_segment
+
+
+def test_transcribe_audio_openai_reuse_existing_chunks_skips_segment(tmp_path, mock_imports, monkeypatch):
+    # Create a big audio to trigger chunking
+    audio = tmp_path / "big.mp3"
+    audio.write_bytes(b"0" * (25_000_000))
+    output_srt = tmp_path / "out.srt"
+
+    calls = []
+    monkeypatch.setattr("transcribe_audio._ffmpeg_segment", _fake_segmenter(calls))
+
+    # Mock API to return simple srt for each chunk
+    mock_client = mock_imports
+    mock_client.audio.transcriptions.create.side_effect = [
+        "1\n00:00:00,000 --> 00:00:00,500\nX\n\n",
+        "1\n00:00:00,500 --> 00:00:01,000\nY\n\n",
+    ]
+    kwargs = {
+        "audio_path": str(audio),
+        "output_subtitle": str(output_srt),
+        "provider": "openai",
+        "api_model": "whisper-1",
+        "language": "ko",
+        "max_upload_bytes": 1,
+        "segment_time": 1,
+    }
+
+    assert run_transcribe_audio(**kwargs) is True
+    assert (tmp_path / "big_chunks" / "segments.json").exists()
+    # Rerun with the same parameters: chunks and their SRT caches are reused
+    output_srt.unlink()
+    assert run_transcribe_audio(**kwargs) is True
+    assert calls == [1]
+    assert mock_client.audio.transcriptions.create.call_count == 2
+    assert "X" in output_srt.read_text(encoding="utf-8")
+
+
+def test_transcribe_audio_openai_resegments_when_params_change(tmp_path, mock_imports, monkeypatch):
     audio = tmp_path / "big2.mp3"
     audio.write_bytes(b"0" * (25_000_000))
     output_srt = tmp_path / "out2.srt"
-    chunks_dir = tmp_path / "big2_chunks"
-    chunks_dir.mkdir()
-    c1 = chunks_dir / "chunk_000.mp3"
-    c2 = chunks_dir / "chunk_001.mp3"
-    s1 = chunks_dir / "chunk_000.srt"
-    s2 = chunks_dir / "chunk_001.srt"
-    c1.write_bytes(b"dummy")
-    c2.write_bytes(b"dummy")
-    s1.write_text("1\n00:00:00,000 --> 00:00:00,500\nA\n\n", encoding="utf-8")
-    s2.write_text("1\n00:00:00,500 --> 00:00:01,000\nB\n\n", encoding="utf-8")
-
+    calls = []
+    monkeypatch.setattr("transcribe_audio._ffmpeg_segment", _fake_segmenter(calls))
     mock_client = mock_imports
-
-    ok = run_transcribe_audio(
-        audio_path=str(audio),
-        output_subtitle=str(output_srt),
-        provider="openai",
-        api_model="whisper-1",
-        language="ko",
-        max_upload_bytes=1,
-        segment_time=1,
-    )
-    assert ok is True
-    # With per-chunk srt caches present, we shouldn't hit the API
-    assert mock_client.audio.transcriptions.create.call_count == 0
+    mock_client.audio.transcriptions.create.side_effect = [
+        "1\n00:00:00,000 --> 00:00:00,500\nA\n\n",
+        "1\n00:00:00,000 --> 00:00:00,500\nB\n\n",
+        "1\n00:00:00,000 --> 00:00:00,500\nWhole\n\n",
+    ]
+    kwargs = {
+        "audio_path": str(audio),
+        "output_subtitle": str(output_srt),
+        "provider": "openai",
+        "api_model": "whisper-1",
+        "language": "ko",
+        "max_upload_bytes": 1,
+    }
+    assert run_transcribe_audio(segment_time=1, **kwargs) is True
+    assert "2\n00:00:01,000 --> 00:00:01,500\nB" in output_srt.read_text("utf-8")
+
+    # A different segment_time must not stitch the old chunks or SRT caches
+    output_srt.unlink()
+    assert run_transcribe_audio(segment_time=2, **kwargs) is True
+    assert calls == [1, 2]
+    assert mock_client.audio.transcriptions.create.call_count == 3
     data = output_srt.read_text(encoding="utf-8")
-    assert "A" in data and "B" in data
+    assert "Whole" in data and "B" not in data
+    assert not (tmp_path / "big2_chunks" / "chunk_001.srt").exists()
 
 
 def test_transcribe_audio_skip_when_output_exists(tmp_path, mock_imports, monkeypatch):
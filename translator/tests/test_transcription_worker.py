@@ -0,0 +1,91 @@
+import socket
+import threading
+
+import pytest
+
+import transcribe_audio
+from transcribe_audio import run_transcribe_audio
+from transcription_worker import make_server
+
+SRT = "1\n00:00:00,500 --> 00:00:01,250\n안녕\n\n"
+
+
+@pytest.fixture
+def fake_local(monkeypatch):
+    calls = []
+
+    def fake(audio_path, output_subtitle, model_size, language):
+        calls.append((threading.current_thread().name, model_size))
+        with open(output_subtitle, "w", encoding="utf-8") as f:
+            f.write(SRT)
+
+    monkeypatch.setattr(transcribe_audio, "transcribe_audio_local", fake)
+    return calls
+
+
+@pytest.fixture
+def worker():
+    server = make_server("127.0.0.1", 0)
+    thread = threading.Thread(
+        target=server.serve_forever, name="worker-server", daemon=True
+    )
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def test_worker_provider_runs_job_in_worker(tmp_path, fake_local, worker):
+    audio = tmp_path / "a.wav"
+    audio.write_bytes(b"x")
+    out = tmp_path / "subs" / "kr_a.srt"
+    out.parent.mkdir()
+
+    ok = run_transcribe_audio(
+        str(audio), str(out), provider="worker", model_size="tiny", worker_url=worker
+    )
+
+    assert ok is True
+    assert "안녕" in out.read_text(encoding="utf-8")
+    assert len(fake_local) == 1
+    # Ran on the server's request thread, not in the caller
+    assert fake_local[0][0] != threading.current_thread().name
+    assert fake_local[0][1] == "tiny"
+
+
+def test_worker_provider_falls_back_in_process(tmp_path, fake_local):
+    audio = tmp_path / "a.wav"
+    audio.write_bytes(b"x")
+    out = tmp_path / "kr_a.srt"
+
+    ok = run_transcribe_audio(
+        str(audio),
+        str(out),
+        provider="worker",
+        model_size="tiny",
+        worker_url=f"http://127.0.0.1:{_free_port()}",
+    )
+
+    assert ok is True
+    assert fake_local == [(threading.current_thread().name, "tiny")]
+
+
+def test_worker_failure_is_reported(tmp_path, monkeypatch, worker):
+    def broken(*args):
+        raise RuntimeError("CUDA out of memory")
+
+    monkeypatch.setattr(transcribe_audio, "transcribe_audio_local", broken)
+    audio = tmp_path / "a.wav"
+    audio.write_bytes(b"x")
+
+    ok = run_transcribe_audio(
+        str(audio), str(tmp_path / "kr_a.srt"), provider="worker", worker_url=worker
+    )
+
+    assert ok is False
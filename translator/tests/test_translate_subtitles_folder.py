@@ -19,18 +19,7 @@ def test_translate_all_srt_files(tmp_path, monkeypatch):
     file2 = input_dir / "c.srt"
     file2.write_text("1\n00:00:02,000 --> 00:00:03,000\nWorld\n", encoding="utf-8")
 
-    # Intercept calls to parse_srt_file and translate_srt_file to avoid real work
-    proc_calls = []
-
-    def fake_process(input_file, output_file):
-        proc_calls.append((input_file, output_file))
-        os.makedirs(os.path.dirname(output_file), exist_ok=True)
-        Path(output_file).write_text("cleaned", encoding="utf-8")
-
-    monkeypatch.setattr(
-        translate_subtitles_folder, "run_normalize_srt", lambda inp, out: fake_process(inp, out)
-    )
-
+    # Intercept translate calls to avoid real work
     trans_calls = []
 
     def fake_translate(
@@ -42,10 +31,11 @@ def test_translate_all_srt_files(tmp_path, monkeypatch):
         os.makedirs(os.path.dirname(output_file), exist_ok=True)
         Path(output_file).write_text("translated", encoding="utf-8")
 
-    monkeypatch.setattr(
-        translate_subtitles_folder,
-        "run_translate_subtitles",
-        lambda **kwargs: fake_translate(
+    normalize_flags = []
+
+    def fake_run(**kwargs):
+        normalize_flags.append(kwargs["normalize"])
+        fake_translate(
             kwargs["input_file"],
             kwargs["output_file"],
             kwargs["slang_file"],
@@ -54,8 +44,8 @@ def test_translate_all_srt_files(tmp_path, monkeypatch):
             kwargs["cache_dir"],
             kwargs["model"],
         )
-        or True,
-    )
+
+    monkeypatch.setattr(translate_subtitles_folder, "run_translate_subtitles", fake_run)
 
     # Run the folder translation script with custom flags
     out_dir = tmp_path / "out"
@@ -78,26 +68,17 @@ def test_translate_all_srt_files(tmp_path, monkeypatch):
     ]
     translate_subtitles_folder.main()
 
-    # Expected post-processing and translation calls for .srt inputs only
+    # Raw inputs are translated (and normalized on read) without a temp copy
     # Order: leaf directories first (a.srt), then top-level (c.srt)
-    rel1 = str(file1)
-    rel2 = str(file2)
-    # Processed paths should be under the temp clean root; suffix matches original filenames
-    assert proc_calls[0][0] == rel1
-    assert proc_calls[1][0] == rel2
-    assert proc_calls[0][1].endswith(os.path.join("pvp", "a.srt"))
-    assert proc_calls[1][1].endswith(os.path.join("c.srt"))
-
-    # Translate should consume the cleaned outputs
     expected_out1 = str(out_dir / "pvp" / "en_a.srt")
     expected_out2 = str(out_dir / "en_c.srt")
     assert len(trans_calls) == 2
-    # translation input_file args should match the clean path produced above
-    assert trans_calls[0][0] == proc_calls[0][1]
-    assert trans_calls[1][0] == proc_calls[1][1]
+    assert trans_calls[0][0] == str(file1)
+    assert trans_calls[1][0] == str(file2)
     # translation output paths are correct
     assert trans_calls[0][1] == expected_out1
     assert trans_calls[1][1] == expected_out2
+    assert normalize_flags == [True, True]
 
 
 def test_missing_required_args_shows_usage(monkeypatch, capsys):
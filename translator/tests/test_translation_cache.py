@@ -0,0 +1,91 @@
+import os
+import sys
+
+sys.path.insert(0, os.getcwd())
+
+import translation_cache
+from srt_io import Cue
+from translate_subtitles import chunk_cache_key, run_translate_subtitles
+from translation_cache import TranslationCache, retime
+
+SRT = "".join(
+    f"{i}\n00:00:0{i},000 --> 00:00:0{i},500\n라인 {i}\n\n" for i in range(1, 5)
+)
+
+
+def _cues(start_ms: int) -> list:
+    return [Cue(1, start_ms, start_ms + 500, ["라인 1"]), Cue(2, 0, 0, ["라인 2"])]
+
+
+def test_key_covers_text_model_and_glossary():
+    key = chunk_cache_key(_cues(0), "m", "glossary")
+    # Timings and indexes are not part of the key
+    assert chunk_cache_key(_cues(9000), "m", "glossary") == key
+    assert chunk_cache_key(_cues(0)[:1], "m", "glossary") != key
+    assert chunk_cache_key(_cues(0), "other", "glossary") != key
+    assert chunk_cache_key(_cues(0), "m", "edited glossary") != key
+
+
+def test_retime_moves_hit_onto_new_cues():
+    reply = (
+        "1\n00:00:01,000 --> 00:00:01,500\nLine 1\n\n"
+        "2\n00:00:02,000 --> 00:00:03,000\nLine 2\n"
+    )
+    chunk = _cues(60000)
+    chunk[1].start, chunk[1].end = 61000, 62000
+    cues = retime(reply, chunk, 1000)
+    assert [(c.start, c.end) for c in cues] == [(60000, 60500), (61000, 62000)]
+    # A reply that merged cues is shifted as a whole
+    cues = retime(reply, chunk[:1], 1000)
+    assert [(c.start, c.end) for c in cues] == [(60000, 60500), (61000, 62000)]
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = TranslationCache(str(tmp_path / "t.sqlite"), max_bytes=250)
+    for key in "abc":
+        cache.put(key, key * 100, 0)
+    assert "a" not in cache and "b" in cache and "c" in cache
+    cache.get("b")
+    cache.put("d", "d" * 100, 0)
+    assert "b" in cache and "c" not in cache
+    cache.close()
+    # The stored size survives reopening
+    assert TranslationCache(str(tmp_path / "t.sqlite"))._total == 200
+
+
+def test_same_chunks_hit_across_files_and_folders(tmp_path, monkeypatch):
+    calls = []
+
+    def fake_call(prompt, model=None, temperature=None):
+        calls.append(prompt)
+        return prompt.split("---\n")[1]
+
+    monkeypatch.setattr("translate_subtitles.call_openai_api", fake_call)
+    slang = tmp_path / "slang.txt"
+    slang.write_text("", encoding="utf-8")
+    for folder in ("a", "b"):
+        (tmp_path / folder).mkdir()
+        (tmp_path / folder / "kr_x.srt").write_text(SRT, encoding="utf-8")
+
+    def translate(folder: str, chunk_size: int) -> str:
+        out = tmp_path / folder / "en_x.srt"
+        assert run_translate_subtitles(
+            input_file=str(tmp_path / folder / "kr_x.srt"),
+            output_file=str(out),
+            slang_file=str(slang),
+            chunk_size=chunk_size,
+            overlap=0,
+            cache_dir=str(tmp_path / "cache"),
+            model="test-model",
+        )
+        return out.read_text(encoding="utf-8")
+
+    first = translate("a", 2)
+    assert len(calls) == 2
+    # Same file name elsewhere: identical chunks are reused
+    assert translate("b", 2) == first
+    assert len(calls) == 2
+    # Re-chunking must not reuse replies of differently sized chunks
+    assert translate("b", 4) == first
+    assert len(calls) == 3
+    assert os.path.exists(tmp_path / "cache" / translation_cache.CACHE_FILE)
@@ -0,0 +1,211 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import openai
+import pytest
+
+import translate_subtitles
+import translation_cache
+import translation_engine
+from translate_subtitles import chunk_cache_key, parse_srt_file, run_translate_subtitles
+from translation_engine import ChatEngine, TokenBucket, parse_duration
+
+HEADERS = {
+    "x-ratelimit-limit-requests": "500",
+    "x-ratelimit-remaining-requests": "499",
+    "x-ratelimit-reset-requests": "120ms",
+    "x-ratelimit-limit-tokens": "200000",
+    "x-ratelimit-remaining-tokens": "190000",
+    "x-ratelimit-reset-tokens": "3s",
+}
+
+
+class _Message:
+    def __init__(self, content):
+        self.content = content
+
+
+class _Choice:
+    def __init__(self, content):
+        self.message = _Message(content)
+
+
+class _Completion:
+    def __init__(self, content):
+        self.choices = [_Choice(content)]
+
+
+class _Raw:
+    def __init__(self, content):
+        self.headers = HEADERS
+        self._content = content
+
+    def parse(self):
+        return _Completion(self._content)
+
+
+class FakeAsyncClient:
+    """Echoes the SRT part of each prompt, tracking requests in flight."""
+
+    def __init__(self, fail_first=None):
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.calls = 0
+        self.fail_first = fail_first
+        self.chat = self
+        self.completions = self
+        self.with_raw_response = self
+
+    async def create(self, model, messages, temperature, max_tokens):
+        self.calls += 1
+        if self.fail_first is not None and self.calls == 1:
+            raise self.fail_first
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.02)
+        self.in_flight -= 1
+        return _Raw(messages[-1]["content"].split("---\n")[1])
+
+
+class _Response429:
+    status_code = 429
+    request = None
+
+    def __init__(self, headers):
+        self.headers = headers
+
+
+@pytest.fixture
+def fresh_limits(monkeypatch):
+    monkeypatch.setattr(translation_engine, "request_bucket", TokenBucket())
+    monkeypatch.setattr(translation_engine, "token_bucket", TokenBucket())
+
+
+def _srt(n):
+    return "".join(
+        f"{i}\n00:00:{i:02d},000 --> 00:00:{i:02d},900\nLine {i}\n\n"
+        for i in range(1, n + 1)
+    )
+
+
+def test_shared_client_is_created_once(monkeypatch):
+    created = []
+
+    def slow_client(**kwargs):
+        time.sleep(0.01)
+        created.append(object())
+        return created[-1]
+
+    monkeypatch.setattr(translation_engine, "_client", None)
+    monkeypatch.setattr(translation_engine.openai, "AsyncOpenAI", slow_client)
+    with ThreadPoolExecutor(8) as pool:
+        clients = list(pool.map(lambda _: translation_engine.get_client(), range(8)))
+    assert len(created) == 1
+    assert all(c is created[0] for c in clients)
+
+
+def test_sync_client_is_created_once(monkeypatch):
+    created = []
+
+    class SlowClient:
+        def __init__(self, **kwargs):
+            time.sleep(0.01)
+            created.append(self)
+            self.chat = self
+            self.completions = self
+
+        def create(self, **kwargs):
+            return _Completion("ok")
+
+    monkeypatch.setattr(translate_subtitles, "_sync_client", None)
+    monkeypatch.setattr(translate_subtitles, "OpenAI", SlowClient)
+    with ThreadPoolExecutor(8) as pool:
+        replies = list(
+            pool.map(lambda _: translate_subtitles.call_openai_api("p"), range(8))
+        )
+    assert len(created) == 1
+    assert replies == ["ok"] * 8
+
+
+def test_parse_duration():
+    assert parse_duration("1s") == 1.0
+    assert parse_duration("6m0s") == 360.0
+    assert parse_duration("20ms") == pytest.approx(0.02)
+    assert parse_duration("2") == 2.0
+    assert parse_duration(None) is None
+
+
+def test_bucket_follows_headers_and_waits():
+    bucket = TokenBucket()
+    bucket.update("100", "0", "50ms")
+    assert bucket.capacity == 100
+    assert bucket.rate == pytest.approx(2000.0)
+
+    start = time.monotonic()
+    asyncio.run(bucket.acquire(10))
+    assert time.monotonic() - start >= 0.004
+
+
+def test_concurrent_chunks_are_cached(tmp_path, monkeypatch, fresh_limits):
+    client = FakeAsyncClient()
+    monkeypatch.setattr(translation_engine, "get_client", lambda: client)
+    src = tmp_path / "kr_vid.srt"
+    src.write_text(_srt(8), encoding="utf-8")
+    slang = tmp_path / "slang.txt"
+    slang.write_text("", encoding="utf-8")
+    cache_dir = tmp_path / "cache"
+    out = tmp_path / "en_vid.srt"
+
+    ok = run_translate_subtitles(
+        input_file=str(src),
+        output_file=str(out),
+        slang_file=str(slang),
+        chunk_size=2,
+        overlap=0,
+        cache_dir=str(cache_dir),
+        model="test-model",
+        concurrency=3,
+    )
+
+    assert ok is True
+    assert client.calls == 4
+    assert 1 < client.max_in_flight <= 3
+    text = out.read_text(encoding="utf-8")
+    assert text.index("Line 1") < text.index("Line 8")
+    cache = translation_cache.open_cache(str(cache_dir))
+    subs = parse_srt_file(str(src))
+    for i in range(4):
+        assert chunk_cache_key(subs[2 * i : 2 * i + 2], "test-model", "") in cache
+    assert translation_engine.token_bucket.capacity == 200000
+
+
+def test_exhausted_quota_is_not_retried(monkeypatch, fresh_limits):
+    error = openai.RateLimitError(
+        "You exceeded your current quota",
+        response=_Response429({}),
+        body={"code": "insufficient_quota"},
+    )
+    client = FakeAsyncClient(fail_first=error)
+    monkeypatch.setattr(translation_engine, "get_client", lambda: client)
+    engine = ChatEngine(model="m", system_prompt="s")
+
+    with pytest.raises(openai.RateLimitError):
+        translation_engine.run(engine.complete("x---\nhello---\n"))
+    assert client.calls == 1
+
+
+def test_rate_limit_pauses_and_retries(monkeypatch, fresh_limits):
+    response = _Response429({"retry-after-ms": "30"})
+    client = FakeAsyncClient(
+        fail_first=openai.RateLimitError("slow down", response=response, body=None)
+    )
+    monkeypatch.setattr(translation_engine, "get_client", lambda: client)
+    engine = ChatEngine(model="m", system_prompt="s", concurrency=2)
+
+    start = time.monotonic()
+    result = translation_engine.run(engine.complete("x---\nhello---\n"))
+
+    assert result == "hello"
+    assert client.calls == 2
+    assert time.monotonic() - start >= 0.03
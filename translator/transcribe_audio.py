@@ -1,15 +1,22 @@
 import importlib
+import json
 import logging
 import os
-
-from dotenv import load_dotenv
-import subprocess
-import tempfile
 import re
+import subprocess
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
 
-from normalize_srt import run_normalize_srt
+from dotenv import load_dotenv
 
+import audio_analysis
+import srt_io
+from artifacts import atomic_write, write_json_atomic, write_text_atomic
+from model_cache import whisper_models
+from normalize_srt import run_normalize_srt
+from transcription_worker import WorkerUnavailableError, submit_job
 
 # Global flag indicating the last call experienced a quota error.
 # Note: This is informational only; do not use it to gate future calls,
@@ -22,6 +29,10 @@ def _quota_marker_path(audio_path: str) -> str:
     return f"{audio_path}.quota_blocked"
 
 
+class _ChunkSkippedError(Exception):
+    """A chunk was not sent because an earlier chunk of the same audio failed."""
+
+
 def _mark_quota_exceeded():
     global _quota_blocked
     _quota_blocked = True
@@ -31,13 +42,43 @@ def quota_blocked() -> bool:
     return _quota_blocked
 
 
+def _is_quota_error(ex: Exception) -> bool:
+    """Return True for an exhausted account quota, which retrying cannot fix."""
+    return getattr(ex, "code", None) == "insufficient_quota" or (
+        "insufficient_quota" in str(ex)
+    )
+
+
+def _rate_limit_delay(ex: Exception, attempt: int) -> Optional[float]:
+    """Seconds to back off after an HTTP 429 rate limit, or None for other errors."""
+    if getattr(ex, "status_code", None) != 429 and not re.search(r"\b429\b", str(ex)):
+        return None
+    headers = getattr(getattr(ex, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return min(60.0, 2.0 * 2**attempt)
+
+
 def format_timestamp(seconds: float) -> str:
     """Format a seconds float into an SRT timestamp string (HH:MM:SS,mmm)."""
-    ms = round((seconds - int(seconds)) * 1000)
-    h = int(seconds // 3600)
-    m = int((seconds % 3600) // 60)
-    s = int(seconds % 60)
-    return f"{h:02d}:{m:02d}:{s:02d},{ms:03d}"
+    return srt_io.format_timestamp(srt_io.seconds_to_ms(seconds))
+
+
+def _write_segments(output_subtitle: str, segments) -> None:
+    """Write ``(start_seconds, end_seconds, text)`` segments as an SRT file."""
+    srt_io.write_srt(
+        output_subtitle,
+        (
+            srt_io.Cue(
+                i,
+                srt_io.seconds_to_ms(start),
+                srt_io.seconds_to_ms(end),
+                [text.strip()],
+            )
+            for i, (start, end, text) in enumerate(segments, start=1)
+        ),
+    )
 
 
 def transcribe_audio_openai(
@@ -61,13 +102,10 @@ def transcribe_audio_openai(
             timestamp_granularities=["segment"],
         )
 
-    os.makedirs(os.path.dirname(output_subtitle), exist_ok=True)
-    with open(output_subtitle, "w", encoding="utf-8") as f:
-        # The response object is a Pydantic model. We access segments via attributes.
-        for i, segment in enumerate(result.segments, start=1):
-            start = format_timestamp(segment.start)
-            end = format_timestamp(segment.end)
-            f.write(f"{i}\n{start} --> {end}\n{segment.text.strip()}\n\n")
+    # The response object is a Pydantic model. We access segments via attributes.
+    _write_segments(
+        output_subtitle, ((seg.start, seg.end, seg.text) for seg in result.segments)
+    )
 
 
 def transcribe_audio_local(
@@ -77,57 +115,35 @@ def transcribe_audio_local(
     language: str,
 ):
     """Transcribe audio locally using the Whisper library and write SRT output."""
-    # Lazy import of whisper to avoid top-level import errors
-    whisper = importlib.import_module("whisper")
-    model = whisper.load_model(model_size)
+    # The model stays loaded for later videos of this process (see model_cache)
+    with whisper_models.use(model_size) as model:
+        result = model.transcribe(audio_path, language=language)
 
-    result = model.transcribe(audio_path, language=language)
-
-    os.makedirs(os.path.dirname(output_subtitle), exist_ok=True)
-    with open(output_subtitle, "w", encoding="utf-8") as f:
-        for i, segment in enumerate(result.get("segments", []), start=1):
-            start = format_timestamp(segment["start"])
-            end = format_timestamp(segment["end"])
-            f.write(f"{i}\n{start} --> {end}\n{segment['text'].strip()}\n\n")
-
-
-def _parse_srt(srt_text: str):
-    pattern = re.compile(
-        r"(\d+)\s+(\d{2}:\d{2}:\d{2},\d{3}) --> (\d{2}:\d{2}:\d{2},\d{3})\s+([\s\S]*?)(?=\n\n|\Z)",
-        re.MULTILINE,
+    _write_segments(
+        output_subtitle,
+        ((seg["start"], seg["end"], seg["text"]) for seg in result.get("segments", [])),
     )
-    blocks = []
-    for m in pattern.finditer(srt_text):
-        blocks.append(
-            (
-                int(m.group(1)),
-                m.group(2),
-                m.group(3),
-                m.group(4).strip(),
-            )
-        )
-    return blocks
-
 
-def _time_to_seconds(ts: str) -> float:
-    h, m, rest = ts.split(":")
-    s, ms = rest.split(",")
-    return int(h) * 3600 + int(m) * 60 + int(s) + int(ms) / 1000.0
 
-
-def _shift_timestamp(ts: str, offset_sec: float) -> str:
-    return format_timestamp(_time_to_seconds(ts) + offset_sec)
+def _transcribe_via_worker(
+    audio_path: str,
+    output_subtitle: str,
+    model_size: str,
+    language: str,
+    worker_url: Optional[str],
+) -> bool:
+    """Run the job on a warm transcription worker; False if none is reachable."""
+    try:
+        submit_job(audio_path, output_subtitle, model_size, language, url=worker_url)
+    except WorkerUnavailableError as e:
+        logging.info(f"No transcription worker reachable ({e}); transcribing in-process")
+        return False
+    return True
 
 
-def _shift_srt(srt_text: str, offset_sec: float) -> str:
-    blocks = _parse_srt(srt_text)
-    out_lines = []
-    for i, (_, start, end, text) in enumerate(blocks, start=1):
-        out_lines.append(str(i))
-        out_lines.append(f"{_shift_timestamp(start, offset_sec)} --> {_shift_timestamp(end, offset_sec)}")
-        out_lines.append(text)
-        out_lines.append("")
-    return "\n".join(out_lines) + "\n"
+def _shift_srt(srt_text: str, offset_ms: int) -> list:
+    """Cues of a chunk's SRT moved ``offset_ms`` later."""
+    return srt_io.shift_cues(srt_io.parse_srt(srt_text), offset_ms)
 
 
 def _ffmpeg_segment(audio_path: str, out_dir: str, segment_time: int = 600, bitrate: str = "64k") -> list:
@@ -155,7 +171,216 @@ def _ffmpeg_segment(audio_path: str, out_dir: str, segment_time: int = 600, bitr
     return chunks
 
 
-def run_transcribe_audio(
+def _source_id(audio_path: str) -> dict:
+    st = os.stat(audio_path)
+    return {"source_size": st.st_size, "source_mtime_ns": st.st_mtime_ns}
+
+
+def _reusable_chunks(out_dir: str, params: dict) -> Optional[list]:
+    """Chunk entries of ``<out_dir>/segments.json`` if cut with ``params``."""
+    manifest_path = os.path.join(out_dir, "segments.json")
+    try:
+        with open(manifest_path, encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get("params") != params or not all(
+        os.path.exists(os.path.join(out_dir, c["file"])) for c in manifest["chunks"]
+    ):
+        return None
+    return manifest["chunks"]
+
+
+def _clear_chunks(out_dir: str) -> None:
+    """Remove chunk audio and per-chunk SRT caches cut with other parameters."""
+    if not os.path.isdir(out_dir):
+        return
+    for name in os.listdir(out_dir):
+        if name.startswith("chunk_") or name == "segments.json":
+            os.remove(os.path.join(out_dir, name))
+
+
+def _fixed_segment(audio_path: str, out_dir: str, segment_time: int) -> list:
+    """Split ``audio_path`` every ``segment_time`` seconds; return chunk paths.
+
+    Like ``_silence_segment``, the chunks are recorded in ``segments.json``
+    and only reused (with their ``.srt`` caches) while the source file and
+    parameters are unchanged.
+    """
+    params = {"mode": "fixed", "segment_time": segment_time, **_source_id(audio_path)}
+    chunks = _reusable_chunks(out_dir, params)
+    if chunks is not None:
+        logging.info(
+            "Reusing %d existing chunks from %s (skip re-segmentation)",
+            len(chunks),
+            out_dir,
+        )
+        return [os.path.join(out_dir, c["file"]) for c in chunks]
+    _clear_chunks(out_dir)
+    paths = _ffmpeg_segment(audio_path, out_dir, segment_time=segment_time)
+    write_json_atomic(
+        os.path.join(out_dir, "segments.json"),
+        {"params": params, "chunks": [{"file": os.path.basename(p)} for p in paths]},
+        indent=2,
+    )
+    return paths
+
+
+def _ffmpeg_extract(
+    audio_path: str, out_path: str, start: float, duration: float, bitrate: str = "64k"
+) -> None:
+    cmd = [
+        "ffmpeg",
+        "-y",
+        "-ss",
+        f"{start:.3f}",
+        "-t",
+        f"{duration:.3f}",
+        "-i",
+        audio_path,
+        "-ac",
+        "1",
+        "-b:a",
+        bitrate,
+        out_path,
+    ]
+    subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def _silence_segment(
+    audio_path: str,
+    out_dir: str,
+    segment_time: float,
+    overlap: float = 1.0,
+    search: Optional[float] = None,
+) -> list:
+    """Split ``audio_path`` at quiet moments and return the chunk manifest.
+
+    One streaming energy pass over the decoded PCM picks a cut in the last
+    ``search`` seconds (default 10% of ``segment_time``, at most 30s) before
+    every boundary. Chunks extend ``overlap`` seconds past their cuts; each
+    entry records its true ``start`` plus the ``keep_start``/``keep_end``
+    span whose cues it owns. The manifest is saved next to the chunks and
+    reused while the source file and parameters match; otherwise the old
+    chunks and their ``.srt`` caches are removed first.
+    """
+    if search is None:
+        search = min(30.0, segment_time * 0.1)
+    params = {
+        "mode": "silence",
+        "segment_time": segment_time,
+        "overlap": overlap,
+        "search": search,
+        **_source_id(audio_path),
+    }
+    manifest_path = os.path.join(out_dir, "segments.json")
+    reused = _reusable_chunks(out_dir, params)
+    if reused is not None:
+        logging.info(
+            "Reusing %d silence-aligned chunks from %s", len(reused), out_dir
+        )
+        return reused
+    _clear_chunks(out_dir)
+
+    levels = audio_analysis.frame_levels(audio_analysis.decode_pcm(audio_path))
+    duration = len(levels) * audio_analysis.FRAME_SECONDS
+    cuts = audio_analysis.find_split_points(levels, segment_time, search)
+    bounds = [0.0, *cuts, duration]
+    os.makedirs(out_dir, exist_ok=True)
+    chunks = []
+    for idx in range(len(bounds) - 1):
+        start = max(0.0, bounds[idx] - overlap)
+        end = min(duration, bounds[idx + 1] + overlap)
+        name = f"chunk_{idx:03d}.mp3"
+        _ffmpeg_extract(audio_path, os.path.join(out_dir, name), start, end - start)
+        chunks.append(
+            {
+                "file": name,
+                "start": round(start, 3),
+                "duration": round(end - start, 3),
+                "keep_start": bounds[idx] if idx else None,
+                "keep_end": bounds[idx + 1] if idx < len(bounds) - 2 else None,
+            }
+        )
+    write_json_atomic(manifest_path, {"params": params, "chunks": chunks}, indent=2)
+    logging.info(
+        "Split %s into %d chunks at quiet points %s", audio_path, len(chunks), cuts
+    )
+    return chunks
+
+
+def _place_chunk_srt(srt_text: str, span: dict) -> list:
+    """Shift a chunk's cues to its true offset, keeping only the cues it owns.
+
+    A cue belongs to the chunk whose keep span contains its midpoint, so
+    speech inside an overlap region is emitted exactly once.
+    """
+    cues = _shift_srt(srt_text, srt_io.seconds_to_ms(span["start"]))
+    # Compare doubled values so the midpoint stays an integer
+    lo = hi = None
+    if span["keep_start"] is not None:
+        lo = 2 * srt_io.seconds_to_ms(span["keep_start"])
+    if span["keep_end"] is not None:
+        hi = 2 * srt_io.seconds_to_ms(span["keep_end"])
+    return [
+        cue
+        for cue in cues
+        if (lo is None or lo <= cue.start + cue.end)
+        and (hi is None or cue.start + cue.end < hi)
+    ]
+
+
+def _speech_only_audio(audio_path: str, vad_options: Optional[dict] = None) -> tuple:
+    """Return ``(speech_wav, mapping)`` holding only the voiced parts of ``audio_path``.
+
+    Built once with two streaming decode passes (levels, then the WAV) and
+    reused while the source size and mtime and the ``vad_options`` (keyword
+    arguments of ``audio_analysis.speech_regions``) are unchanged. A rebuild
+    also drops the transcript of the previous speech WAV.
+    """
+    stem = os.path.splitext(audio_path)[0]
+    wav_path = f"{stem}_speech.wav"
+    map_path = f"{stem}_speech.json"
+    key = {**_source_id(audio_path), "vad": vad_options or {}}
+    if os.path.exists(wav_path) and os.path.exists(map_path):
+        with open(map_path, encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("key") == key:
+            return wav_path, data["mapping"]
+    for stale in (map_path, f"{stem}_speech.srt"):
+        if os.path.exists(stale):
+            os.remove(stale)
+
+    levels = audio_analysis.frame_levels(audio_analysis.decode_pcm(audio_path))
+    regions = audio_analysis.speech_regions(levels, **(vad_options or {}))
+    with atomic_write(wav_path, "wb") as f:
+        mapping = audio_analysis.write_regions_wav(
+            audio_analysis.decode_pcm(audio_path), regions, f
+        )
+    # Written last: a map on disk means the WAV is complete
+    write_json_atomic(map_path, {"key": key, "mapping": mapping}, indent=2)
+    logging.info(
+        "VAD kept %.0fs of %.0fs in %d speech regions of %s",
+        sum(m["duration"] for m in mapping),
+        len(levels) * audio_analysis.FRAME_SECONDS,
+        len(mapping),
+        audio_path,
+    )
+    return wav_path, mapping
+
+
+def _remap_srt(speech_srt: str, output_subtitle: str, mapping: list) -> None:
+    """Rewrite cues from the compact speech timeline onto the source timeline."""
+    to_source = audio_analysis.source_mapper(mapping)
+    cues = srt_io.read_srt(speech_srt)
+    for cue in cues:
+        # The map holds float seconds; convert at this boundary only
+        cue.start = srt_io.seconds_to_ms(to_source(cue.start / 1000))
+        cue.end = srt_io.seconds_to_ms(to_source(cue.end / 1000))
+    srt_io.write_srt(output_subtitle, cues, renumber=True)
+
+
+def run_transcribe_audio(  # noqa: C901
     audio_path: str,
     output_subtitle: str,
     provider: str = "local",
@@ -164,8 +389,23 @@ def run_transcribe_audio(
     api_model: str = "whisper-1",
     max_upload_bytes: int = 24_500_000,
     segment_time: int = 600,
+    worker_url: Optional[str] = None,
+    max_in_flight: int = 1,
+    segment_mode: str = "fixed",
+    vad=False,
 ) -> bool:
-    """Transcribe an audio file and normalize the resulting SRT file."""
+    """Transcribe an audio file and normalize the resulting SRT file.
+
+    ``provider`` is ``local`` (Whisper in this process), ``worker`` (a warm
+    ``transcription_worker`` at ``worker_url``, falling back to ``local`` when
+    none is running) or ``openai``. Long audio sent to OpenAI is split into
+    ``segment_time`` chunks, up to ``max_in_flight`` of which are transcribed
+    at once. ``segment_mode="silence"`` cuts at the quietest moment before
+    each boundary, overlaps neighbouring chunks and drops duplicated cues.
+    With ``vad`` (True, or a dict of ``speech_regions`` options) only detected
+    speech regions are transcribed (from a compact ``<audio>_speech.wav``)
+    and cue times are mapped back to the original.
+    """
     try:
         # Reset informational quota flag at the start of each run to avoid leaking across calls/tests.
         # Whether to short-circuit is decided by a per-audio marker file instead.
@@ -185,6 +425,33 @@ def run_transcribe_audio(
             # Continue if we can't stat the file for any reason
             pass
 
+        if vad:
+            speech_wav, mapping = _speech_only_audio(
+                audio_path, vad if isinstance(vad, dict) else None
+            )
+            if not mapping:
+                logging.warning(f"No speech detected in {audio_path}")
+                write_text_atomic(output_subtitle, "")
+                return True
+            speech_srt = f"{os.path.splitext(speech_wav)[0]}.srt"
+            if not run_transcribe_audio(
+                speech_wav,
+                speech_srt,
+                provider=provider,
+                model_size=model_size,
+                language=language,
+                api_model=api_model,
+                max_upload_bytes=max_upload_bytes,
+                segment_time=segment_time,
+                worker_url=worker_url,
+                max_in_flight=max_in_flight,
+                segment_mode=segment_mode,
+            ):
+                return False
+            _remap_srt(speech_srt, output_subtitle, mapping)
+            logging.info(f"Subtitles saved to {output_subtitle}")
+            return True
+
         if provider == "openai":
             size = os.path.getsize(audio_path)
             openai = importlib.import_module("openai")
@@ -202,15 +469,10 @@ def run_transcribe_audio(
                             response_format="srt",
                         )
                     except Exception as ex:
-                        txt = str(ex)
-                        if (
-                            "insufficient_quota" in txt
-                            or " 429" in txt
-                            or "quota" in txt
-                        ):
+                        if _is_quota_error(ex):
                             logging.error(
                                 "OpenAI transcription quota exceeded detected; skipping further transcriptions this run. (%s)",
-                                txt,
+                                ex,
                             )
                             _mark_quota_exceeded()
                             # Create a per-audio marker so subsequent attempts for the same
@@ -223,15 +485,19 @@ def run_transcribe_audio(
                             raise
                         if i == attempts - 1:
                             raise
+                        # A plain rate limit is temporary: back off longer and retry
+                        wait = _rate_limit_delay(ex, i)
+                        if wait is None:
+                            wait = delay
+                            delay = min(delay * 2, 10.0)
                         logging.warning(
                             "OpenAI transcription error (%s); retrying in %.1fs (%d/%d)",
                             ex,
-                            delay,
+                            wait,
                             i + 1,
                             attempts,
                         )
-                        time.sleep(delay)
-                        delay = min(delay * 2, 10.0)
+                        time.sleep(wait)
 
             if size <= max_upload_bytes:
                 # If a prior attempt for this same audio hit quota, short-circuit now.
@@ -242,8 +508,7 @@ def run_transcribe_audio(
                     return False
                 with open(audio_path, "rb") as f:
                     srt_text = _transcribe_file_with_retry(f)
-                with open(output_subtitle, "w", encoding="utf-8") as out:
-                    out.write(srt_text)
+                write_text_atomic(output_subtitle, srt_text)
                 logging.info(f"Subtitles saved to {output_subtitle}")
                 return True
             else:
@@ -254,25 +519,22 @@ def run_transcribe_audio(
                 )
                 # Use a persistent chunk directory next to the audio file so repeated runs can reuse chunks
                 stem = os.path.splitext(os.path.basename(audio_path))[0]
-                persistent_dir = os.path.join(os.path.dirname(audio_path), f"{stem}_chunks")
-                os.makedirs(persistent_dir, exist_ok=True)
-                existing_chunks = [
-                    os.path.join(persistent_dir, f)
-                    for f in sorted(os.listdir(persistent_dir))
-                    if f.startswith("chunk_") and f.endswith(".mp3")
-                ]
-                if existing_chunks:
-                    logging.info(
-                        "Reusing %d existing chunks from %s (skip re-segmentation)",
-                        len(existing_chunks),
-                        persistent_dir,
+                spans = None
+                if segment_mode == "silence":
+                    # Cut at quiet moments; the manifest records each chunk's true offset
+                    persistent_dir = os.path.join(
+                        os.path.dirname(audio_path), f"{stem}_silence_chunks"
                     )
-                    chunks = existing_chunks
+                    try:
+                        spans = _silence_segment(audio_path, persistent_dir, segment_time)
+                    except Exception as e:
+                        logging.error(f"Failed to segment audio: {e}")
+                        return False
+                    chunks = [os.path.join(persistent_dir, c["file"]) for c in spans]
                 else:
+                    persistent_dir = os.path.join(os.path.dirname(audio_path), f"{stem}_chunks")
                     try:
-                        chunks = _ffmpeg_segment(
-                            audio_path, persistent_dir, segment_time=segment_time
-                        )
+                        chunks = _fixed_segment(audio_path, persistent_dir, segment_time)
                     except Exception as e:
                         logging.error(f"Failed to segment audio: {e}")
                         return False
@@ -293,27 +555,49 @@ def run_transcribe_audio(
                         )
                         return False
 
-                merged_srt_lines = []
-                for idx, ch in enumerate(chunks):
+                # Transcribe chunks on a bounded pool; a failure stops new API calls
+                stop = threading.Event()
+
+                def _chunk_srt(idx: int, ch: str) -> str:
+                    # If we already transcribed this chunk before, reuse cached SRT next to the chunk file
+                    srt_cache = os.path.splitext(ch)[0] + ".srt"
+                    if os.path.exists(srt_cache) and os.path.getsize(srt_cache) > 0:
+                        logging.info(
+                            "Reusing cached transcription for %s (%d/%d)", ch, idx + 1, len(chunks)
+                        )
+                        with open(srt_cache, encoding="utf-8") as cf:
+                            return cf.read()
+                    if stop.is_set():
+                        raise _ChunkSkippedError()
                     try:
-                        # If we already transcribed this chunk before, reuse cached SRT next to the chunk file
-                        srt_cache = os.path.splitext(ch)[0] + ".srt"
-                        if os.path.exists(srt_cache) and os.path.getsize(srt_cache) > 0:
-                            logging.info(
-                                "Reusing cached transcription for %s (%d/%d)", ch, idx + 1, len(chunks)
-                            )
-                            with open(srt_cache, "r", encoding="utf-8") as cf:
-                                part_srt = cf.read()
-                        else:
-                            with open(ch, "rb") as f:
-                                part_srt = _transcribe_file_with_retry(f)
-                            # Persist per‑chunk SRT cache for future runs
-                            try:
-                                with open(srt_cache, "w", encoding="utf-8") as cf:
-                                    cf.write(part_srt)
-                            except Exception:
-                                # Cache write failure shouldn't abort the run
-                                pass
+                        with open(ch, "rb") as f:
+                            part_srt = _transcribe_file_with_retry(f)
+                    except Exception:
+                        stop.set()
+                        raise
+                    # Persist per-chunk SRT cache for future runs
+                    try:
+                        write_text_atomic(srt_cache, part_srt)
+                    except Exception:
+                        # Cache write failure shouldn't abort the run
+                        pass
+                    return part_srt
+
+                workers = max(1, min(int(max_in_flight), len(chunks)))
+                with ThreadPoolExecutor(
+                    max_workers=workers, thread_name_prefix="transcribe-chunk"
+                ) as pool:
+                    futures = [
+                        pool.submit(_chunk_srt, idx, ch) for idx, ch in enumerate(chunks)
+                    ]
+                failed = False
+                merged = []
+                for idx, (ch, fut) in enumerate(zip(chunks, futures)):
+                    try:
+                        part_srt = fut.result()
+                    except _ChunkSkippedError:
+                        failed = True
+                        continue
                     except Exception as e:
                         logging.error(
                             "Transcription failed for chunk %d/%d (%s): %s",
@@ -322,23 +606,31 @@ def run_transcribe_audio(
                             ch,
                             e,
                         )
-                        return False
-                    offset = idx * float(segment_time)
-                    shifted = _shift_srt(part_srt, offset)
-                    merged_srt_lines.append(shifted)
-
-                with open(output_subtitle, "w", encoding="utf-8") as out:
-                    full = "".join(merged_srt_lines)
-                    blocks = _parse_srt(full)
-                    for i, (_, start, end, text) in enumerate(blocks, start=1):
-                        out.write(f"{i}\n{start} --> {end}\n{text}\n\n")
+                        failed = True
+                        continue
+                    # Merge strictly in chunk order once every result is in
+                    if spans is not None:
+                        merged.extend(_place_chunk_srt(part_srt, spans[idx]))
+                    else:
+                        offset = srt_io.seconds_to_ms(idx * float(segment_time))
+                        merged.extend(_shift_srt(part_srt, offset))
+                if failed:
+                    return False
+
+                srt_io.write_srt(output_subtitle, merged, renumber=True)
                 logging.info(f"Subtitles saved to {output_subtitle}")
                 return True
 
-        elif provider == "local":
-            transcribe_audio_local(
-                audio_path, output_subtitle, model_size, language
-            )
+        elif provider in ("local", "worker"):
+            if not (
+                provider == "worker"
+                and _transcribe_via_worker(
+                    audio_path, output_subtitle, model_size, language, worker_url
+                )
+            ):
+                transcribe_audio_local(
+                    audio_path, output_subtitle, model_size, language
+                )
             # Normalize only for local to preserve API SRT formatting
             run_normalize_srt(output_subtitle, output_subtitle)
             logging.info(f"Subtitles saved to {output_subtitle}")
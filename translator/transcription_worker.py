@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""Long-lived local transcription worker that keeps Whisper models warm.
+
+The GUI starts a fresh orchestrator process per run, so every run would pay
+the Whisper/torch import and model load again. This worker holds models in
+``model_cache.whisper_models`` and serves jobs over localhost HTTP:
+
+- ``GET /health`` returns ``{"status": "ok", "models": [...]}``
+- ``POST /transcribe`` with ``{"audio_path", "output_subtitle", "model_size",
+  "language"}`` writes the SRT and returns ``{"ok": true}``
+
+``run_transcribe_audio(provider="worker")`` submits to it via
+``submit_job`` and falls back to in-process transcription when no worker
+answers. Paths are shared with the caller, so the worker must run on the
+same machine.
+"""
+import argparse
+import json
+import logging
+import os
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+from model_cache import whisper_models
+
+DEFAULT_URL = "http://127.0.0.1:8765"
+# The worker is local; never route its requests through HTTP(S)_PROXY
+_opener = urllib.request.build_opener(urllib.request.ProxyHandler({}))
+
+
+def worker_url(url: Optional[str] = None) -> str:
+    """Resolve the worker URL from the argument or ``TRANSCRIPTION_WORKER_URL``."""
+    return (url or os.getenv("TRANSCRIPTION_WORKER_URL") or DEFAULT_URL).rstrip("/")
+
+
+class WorkerUnavailableError(Exception):
+    """Raised when no transcription worker answers at the configured URL."""
+
+
+def submit_job(
+    audio_path: str,
+    output_subtitle: str,
+    model_size: str,
+    language: str,
+    url: Optional[str] = None,
+    timeout: float = 6 * 3600,
+) -> None:
+    """Ask the worker to transcribe ``audio_path`` into ``output_subtitle``.
+
+    Raises ``WorkerUnavailableError`` if nothing is listening and ``RuntimeError``
+    if the worker reports a failed job.
+    """
+    payload = json.dumps(
+        {
+            "audio_path": os.path.abspath(audio_path),
+            "output_subtitle": os.path.abspath(output_subtitle),
+            "model_size": model_size,
+            "language": language,
+        }
+    ).encode("utf-8")
+    req = urllib.request.Request(
+        f"{worker_url(url)}/transcribe",
+        data=payload,
+        headers={"Content-Type": "application/json"},
+        method="POST",
+    )
+    try:
+        with _opener.open(req, timeout=timeout) as resp:
+            result = json.loads(resp.read().decode("utf-8"))
+    except urllib.error.HTTPError as e:
+        try:
+            detail = json.loads(e.read().decode("utf-8")).get("error")
+        except Exception:
+            detail = str(e)
+        raise RuntimeError(f"Transcription worker failed: {detail}") from e
+    except (urllib.error.URLError, ConnectionError) as e:
+        raise WorkerUnavailableError(str(e)) from e
+    if not result.get("ok"):
+        raise RuntimeError(f"Transcription worker failed: {result.get('error')}")
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def log_message(self, fmt, *args):
+        logging.info("worker: " + fmt, *args)
+
+    def _reply(self, status: int, payload: dict):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path != "/health":
+            self._reply(404, {"error": "not found"})
+            return
+        models = [list(k) for k in whisper_models.loaded()]
+        self._reply(200, {"status": "ok", "models": models})
+
+    def do_POST(self):
+        if self.path != "/transcribe":
+            self._reply(404, {"error": "not found"})
+            return
+        try:
+            job = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            audio_path = job["audio_path"]
+            output_subtitle = job["output_subtitle"]
+        except Exception as e:
+            self._reply(400, {"ok": False, "error": f"bad request: {e}"})
+            return
+        # Imported lazily: transcribe_audio imports this module for submit_job
+        from transcribe_audio import transcribe_audio_local  # noqa: PLC0415
+
+        try:
+            logging.info(f"Transcribing {audio_path} -> {output_subtitle}")
+            transcribe_audio_local(
+                audio_path,
+                output_subtitle,
+                job.get("model_size", "large"),
+                job.get("language", "ko"),
+            )
+        except Exception as e:
+            logging.error(f"Worker transcription failed for {audio_path}: {e}")
+            self._reply(500, {"ok": False, "error": str(e)})
+            return
+        self._reply(200, {"ok": True})
+
+
+def make_server(host: str = "127.0.0.1", port: int = 8765) -> ThreadingHTTPServer:
+    """Create (but do not start) the worker HTTP server."""
+    server = ThreadingHTTPServer((host, port), _Handler)
+    server.daemon_threads = True
+    return server
+
+
+def main():
+    """Run the transcription worker until interrupted."""
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s"
+    )
+    p = argparse.ArgumentParser(description="Warm local Whisper transcription worker")
+    p.add_argument("--host", default="127.0.0.1", help="Interface to bind")
+    p.add_argument("--port", type=int, default=8765, help="Port to listen on")
+    p.add_argument(
+        "--preload",
+        default=None,
+        help="Whisper model size to load at startup (e.g. large)",
+    )
+    p.add_argument(
+        "--max-models",
+        type=int,
+        default=1,
+        help="Different models kept loaded at once",
+    )
+    args = p.parse_args()
+
+    whisper_models.configure(max_models=args.max_models)
+    if args.preload:
+        with whisper_models.use(args.preload):
+            pass
+    server = make_server(args.host, args.port)
+    logging.info(f"Transcription worker listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
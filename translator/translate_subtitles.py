@@ -1,60 +1,36 @@
-import json
 import logging  # Added for logging
 import os
-import re
+import threading
 import time
+from typing import Optional
 
 import openai
 from dotenv import load_dotenv
 from openai import OpenAI, RateLimitError
 
+import normalize_srt
+import translation_cache
+import translation_engine
+from srt_io import Cue, format_srt, parse_srt, read_srt, write_srt
+from translation_engine import ContextLengthError
 
-class ContextLengthError(Exception):
-    """Raised when the OpenAI API reports context-length exceeded."""
+SYSTEM_PROMPT = "You translate and adapt subtitles from Korean to English accurately."
+# Part of every chunk's cache key: bump when SYSTEM_PROMPT or build_prompt
+# change in a way that makes earlier replies stale
+PROMPT_VERSION = 1
+_sync_client = None
+# DAG runs call call_openai_api from several translate_subtitles workers
+_sync_client_lock = threading.Lock()
 
 
-class Subtitle:
-    """Lightweight container for a single SRT subtitle block."""
-
-    def __init__(self, index: int, start: str, end: str, lines: list):
-        self.index = index
-        self.start = start
-        self.end = end
-        self.lines = lines
-
-    def to_srt_block(self) -> str:
-        """Serialize the subtitle back to an SRT-formatted block."""
-        return (
-            f"{self.index}\n{self.start} --> {self.end}\n"
-            + "\n".join(self.lines)
-            + "\n"
-        )
-
-
-def parse_srt_file(filename: str) -> list:
-    """Parse an SRT file path into a list of Subtitle objects."""
-    with open(filename, encoding="utf-8-sig") as f:
-        content = f.read()
-    pattern = re.compile(
-        r"(\d+)\s+(\d{2}:\d{2}:\d{2},\d{3}) --> (\d{2}:\d{2}:\d{2},\d{3})\s+([\s\S]*?)(?=\n\n|\Z)",
-        re.MULTILINE,
-    )
-    subs = []
-    for m in pattern.finditer(content):
-        subs.append(
-            Subtitle(
-                int(m.group(1)), m.group(2), m.group(3), m.group(4).strip().split("\n")
-            )
-        )
-    return subs
+# Subtitles are srt_io cues (integer millisecond times)
+Subtitle = Cue
+parse_srt_file = read_srt
 
 
 def write_srt_file(filename: str, subtitles: list) -> None:
     """Write a list of Subtitle objects to disk as an SRT file."""
-    with open(filename, "w", encoding="utf-8") as f:
-        for sub in subtitles:
-            f.write(sub.to_srt_block())
-            f.write("\n")
+    write_srt(filename, subtitles)
 
 
 def chunk_subtitles(subs: list, chunk_size: int, overlap: int) -> list:
@@ -75,9 +51,7 @@ def chunk_subtitles(subs: list, chunk_size: int, overlap: int) -> list:
 
 def build_prompt(chunk: list, slang_text: str) -> str:
     """Build a translation prompt with SRT content and glossary."""
-    srt_content = ""
-    for sub in chunk:
-        srt_content += sub.to_srt_block() + "\n"
+    srt_content = format_srt(chunk)
     return (
         "You are translating Korean StarCraft: Brood War subtitles to English.\n"
         "Use the provided slang glossary to improve translation accuracy.\n"
@@ -92,47 +66,44 @@ def build_prompt(chunk: list, slang_text: str) -> str:
     )
 
 
-def get_cache_filename(cache_dir: str, input_filename: str, idx: int) -> str:
-    """Return the path for a chunk-level cache file."""
-    base = os.path.splitext(os.path.basename(input_filename))[0]
-    return os.path.join(cache_dir, f"{base}_chunk{idx}.json")
-
-
-def save_cache(cache_file: str, data: str) -> None:
-    """Write a chunk translation to the JSON cache file."""
-    with open(cache_file, "w", encoding="utf-8") as f:
-        json.dump({"translation": data}, f, ensure_ascii=False, indent=2)
+def chunk_cache_key(chunk: list, model: str, slang_text: str) -> str:
+    """Return the translation cache key of ``chunk`` (see ``translation_cache``)."""
+    return translation_cache.chunk_key(
+        chunk, model, PROMPT_VERSION, translation_cache.glossary_hash(slang_text)
+    )
 
 
-def load_cache(cache_file: str) -> str:
-    """Read a chunk translation from the JSON cache file, if it exists."""
-    if not os.path.isfile(cache_file):
-        return None
-    with open(cache_file, encoding="utf-8") as f:
-        return json.load(f).get("translation")
+def build_chunk_request(prompt: str, model: str, temperature: float = 0.2) -> dict:
+    """Return the Chat Completions request body for one chunk prompt."""
+    return {
+        "model": model,
+        "messages": [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": prompt},
+        ],
+        "temperature": temperature,
+        "max_tokens": 4000,
+    }
 
 
 def call_openai_api(prompt: str, model: str = "gpt-4", temperature: float = 0.2) -> str:
     """Call the OpenAI Chat Completions API with retry and error handling."""
-    load_dotenv()
-    api_key = os.getenv("OPENAI_API_KEY")
-    client = OpenAI(api_key=api_key) if api_key else OpenAI()
+    global _sync_client  # noqa: PLW0603
+    with _sync_client_lock:
+        if _sync_client is None:
+            load_dotenv()
+            api_key = os.getenv("OPENAI_API_KEY")
+            _sync_client = OpenAI(api_key=api_key) if api_key else OpenAI()
+        client = _sync_client
     for _attempt in range(5):
         try:
             resp = client.chat.completions.create(
-                model=model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You translate and adapt subtitles from Korean to English accurately.",
-                    },
-                    {"role": "user", "content": prompt},
-                ],
-                temperature=temperature,
-                max_tokens=4000,
+                **build_chunk_request(prompt, model, temperature)
             )
             return resp.choices[0].message.content.strip()
-        except RateLimitError:
+        except RateLimitError as e:
+            if translation_engine.is_quota_error(e):
+                raise
             logging.warning("Rate limit hit, retrying in 5s...")
             time.sleep(5)
         except openai.BadRequestError as e:
@@ -151,18 +122,7 @@ def call_openai_api(prompt: str, model: str = "gpt-4", temperature: float = 0.2)
 
 def parse_translated_chunk(text: str) -> list:
     """Parse an SRT-formatted translation chunk into Subtitle objects."""
-    pattern = re.compile(
-        r"(\d+)\s+(\d{2}:\d{2}:\d{2},\d{3}) --> (\d{2}:\d{2}:\d{2},\d{3})\s+([\s\S]*?)(?=\n\n|\Z)",
-        re.MULTILINE,
-    )
-    subs = []
-    for m in pattern.finditer(text):
-        subs.append(
-            Subtitle(
-                int(m.group(1)), m.group(2), m.group(3), m.group(4).strip().split("\n")
-            )
-        )
-    return subs
+    return parse_srt(text)
 
 
 def merge_chunks(chunks: list, overlap: int) -> list:
@@ -178,7 +138,35 @@ def merge_chunks(chunks: list, overlap: int) -> list:
     return merged
 
 
-def run_translate_subtitles(
+def _translate_concurrently(
+    chunks: list,
+    pending: list,
+    translated: list,
+    slang_text: str,
+    cache,
+    model: str,
+    concurrency: int,
+) -> None:
+    """Translate the ``pending`` chunk indexes in parallel into ``translated``."""
+    engine = translation_engine.ChatEngine(
+        model=model, system_prompt=SYSTEM_PROMPT, concurrency=concurrency
+    )
+    prompts = [build_prompt(chunks[i], slang_text) for i in pending]
+
+    def on_result(j: int, text: str) -> None:
+        i = pending[j]
+        key = chunk_cache_key(chunks[i], model, slang_text)
+        cache.put(key, text, chunks[i][0].start)
+        translated[i] = parse_translated_chunk(text)
+        logging.info(f"Translated chunk {i+1}/{len(chunks)}")
+
+    logging.info(
+        f"Translating {len(pending)} chunks with up to {concurrency} in flight"
+    )
+    translation_engine.run(engine.complete_all(prompts, on_result=on_result))
+
+
+def run_translate_subtitles(  # noqa: C901
     input_file: str,
     output_file: str,
     slang_file: str,
@@ -186,16 +174,36 @@ def run_translate_subtitles(
     overlap: int = 5,
     cache_dir: str = ".cache",
     model: str = "gpt-4.1-mini",
+    concurrency: int = 1,
+    normalize: bool = False,
+    cache_max_bytes: Optional[int] = None,
 ) -> bool:
-    """Translate a Korean SRT file to English using the OpenAI API in chunks."""
+    """Translate a Korean SRT file to English using the OpenAI API in chunks.
+
+    With ``concurrency`` > 1 uncached chunks are sent in parallel through the
+    shared async engine (see ``translation_engine``); each reply is cached as
+    soon as it arrives so an interrupted run resumes where it stopped.
+    ``normalize`` reads a raw SRT through ``normalize_srt.iter_normalized``
+    instead of expecting a normalized file.
+
+    Replies are cached in ``<cache_dir>/translations.sqlite`` by chunk
+    content, model, prompt version and glossary (see ``translation_cache``),
+    so identical chunks of other videos or other chunkings are reused;
+    ``cache_max_bytes`` bounds its size.
+    """
     try:
         load_dotenv()
 
-        os.makedirs(cache_dir, exist_ok=True)
+        cache = translation_cache.open_cache(cache_dir, cache_max_bytes)
         os.makedirs(os.path.dirname(output_file), exist_ok=True)
 
         logging.info(f"Loading subtitles from {input_file}")
-        subs = parse_srt_file(input_file)
+        if normalize:
+            subs = list(normalize_srt.iter_normalized(input_file))
+            for i, sub in enumerate(subs, start=1):
+                sub.index = i
+        else:
+            subs = parse_srt_file(input_file)
         logging.info(f"Loaded {len(subs)} subtitles")
 
         with open(slang_file, encoding="utf-8") as f:
@@ -210,22 +218,38 @@ def run_translate_subtitles(
             logging.info(
                 f"Divided into {len(chunks)} chunks (size={chunk_size}, overlap={overlap})"
             )
-            translated = []
+            translated = [None] * len(chunks)
+            pending = []
+            for i, chunk in enumerate(chunks):
+                cached = cache.get(chunk_cache_key(chunk, model, slang_text))
+                if cached:
+                    logging.info(f"Using cache for chunk {i+1}/{len(chunks)}")
+                    text, origin_ms = cached
+                    translated[i] = translation_cache.retime(text, chunk, origin_ms)
+                else:
+                    pending.append(i)
             try:
-                for i, chunk in enumerate(chunks):
-                    cache_file = get_cache_filename(cache_dir, input_file, i)
-                    cached = load_cache(cache_file)
-                    if cached:
-                        logging.info(f"Using cache for chunk {i+1}/{len(chunks)}")
-                        translated.append(parse_translated_chunk(cached))
-                        continue
-
-                    logging.info(f"Translating chunk {i+1}/{len(chunks)}")
-                    prompt = build_prompt(chunk, slang_text)
-                    result = call_openai_api(prompt, model=model)
-                    save_cache(cache_file, result)
-                    translated.append(parse_translated_chunk(result))
-                    time.sleep(1)
+                if concurrency > 1 and pending:
+                    _translate_concurrently(
+                        chunks,
+                        pending,
+                        translated,
+                        slang_text,
+                        cache,
+                        model,
+                        concurrency,
+                    )
+                else:
+                    for i in pending:
+                        logging.info(f"Translating chunk {i+1}/{len(chunks)}")
+                        prompt = build_prompt(chunks[i], slang_text)
+                        result = call_openai_api(prompt, model=model)
+                        cache.put(
+                            chunk_cache_key(chunks[i], model, slang_text),
+                            result,
+                            chunks[i][0].start,
+                        )
+                        translated[i] = parse_translated_chunk(result)
                 break
             except ContextLengthError:
                 new_size = chunk_size - 10
@@ -2,10 +2,8 @@
 """Recursively translate .srt files to English while preserving structure."""
 import argparse
 import os
-import tempfile
 
 from common import setup_logging
-from normalize_srt import run_normalize_srt
 from translate_subtitles import run_translate_subtitles
 
 log = setup_logging(__name__, "logs/translate_folder.log")
@@ -44,45 +42,42 @@ def main():
         "--cache-dir", default=".cache", help="Directory for translation caches"
     )
     p.add_argument("--model", default="gpt-4.1-mini", help="OpenAI model to use")
+    p.add_argument(
+        "--concurrency",
+        type=int,
+        default=4,
+        help="Chunks translated in parallel (1 = sequential)",
+    )
     args = p.parse_args()
 
     input_dir = args.input_dir
     output_dir = args.output_dir
 
-    # Use a temporary workspace to normalize raw .srt before translation
-    with tempfile.TemporaryDirectory(prefix="cleaned_srt_") as clean_root:
-        for root, _, files in os.walk(input_dir, topdown=False):
-            for fname in files:
-                if not fname.endswith(".srt"):
-                    continue
-                in_path = os.path.join(root, fname)
-                # Post-process raw Korean SRT: normalize timestamps & collapse duplicates
-                rel = os.path.relpath(root, input_dir)
-                clean_dir = (
-                    clean_root if rel == os.curdir else os.path.join(clean_root, rel)
-                )
-                os.makedirs(clean_dir, exist_ok=True)
-                clean_path = os.path.join(clean_dir, fname)
-                log.info(f"Post-processing {in_path} -> {clean_path}")
-                run_normalize_srt(in_path, clean_path)
-
-                # Translate the cleaned SRT to English
-                target_dir = (
-                    output_dir if rel == os.curdir else os.path.join(output_dir, rel)
-                )
-                os.makedirs(target_dir, exist_ok=True)
-                out_fname = fname if fname.startswith("en_") else f"en_{fname}"
-                out_path = os.path.join(target_dir, out_fname)
-                log.info(f"Translating {clean_path} -> {out_path}")
-                run_translate_subtitles(
-                    input_file=clean_path,
-                    output_file=out_path,
-                    slang_file=args.slang_file,
-                    chunk_size=args.chunk_size,
-                    overlap=args.overlap,
-                    cache_dir=args.cache_dir,
-                    model=args.model,
-                )
+    for root, _, files in os.walk(input_dir, topdown=False):
+        for fname in files:
+            if not fname.endswith(".srt"):
+                continue
+            in_path = os.path.join(root, fname)
+            rel = os.path.relpath(root, input_dir)
+            target_dir = (
+                output_dir if rel == os.curdir else os.path.join(output_dir, rel)
+            )
+            os.makedirs(target_dir, exist_ok=True)
+            out_fname = fname if fname.startswith("en_") else f"en_{fname}"
+            out_path = os.path.join(target_dir, out_fname)
+            # Raw Korean SRT is normalized (timestamps, duplicates) as it is read
+            log.info(f"Translating {in_path} -> {out_path}")
+            run_translate_subtitles(
+                input_file=in_path,
+                output_file=out_path,
+                slang_file=args.slang_file,
+                chunk_size=args.chunk_size,
+                overlap=args.overlap,
+                cache_dir=args.cache_dir,
+                model=args.model,
+                concurrency=args.concurrency,
+                normalize=True,
+            )
 
 
 if __name__ == "__main__":
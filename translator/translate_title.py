@@ -8,6 +8,9 @@ import openai
 from dotenv import load_dotenv
 from openai import OpenAI, RateLimitError
 
+import metadata_index
+from artifacts import write_json_atomic
+
 
 def sha1(text: str) -> str:
     """Return the SHA-1 hex digest of the given text (UTF-8)."""
@@ -23,26 +26,44 @@ def ensure_client():
     return OpenAI(api_key=key)
 
 
+def build_title_request(title: str, model: str) -> dict:
+    """Return the Chat Completions request body that translates ``title``."""
+    return {
+        "model": model,
+        "messages": [
+            {
+                "role": "system",
+                "content": "Translate a video title from Korean (or mixed) to concise, idiomatic English.",
+            },
+            {
+                "role": "user",
+                "content": f"Title:\n{title}\n\nReturn only the translated title.",
+            },
+        ],
+        "temperature": 0.3,
+        "max_tokens": 200,
+    }
+
+
+def save_title_cache(cache_path: str, video_id: str, title_en: str, source_hash: str):
+    """Write the ``title_<vid>.json`` cache entry and index it."""
+    data = {
+        "video_id": video_id,
+        "title_en": title_en,
+        "source_hash": source_hash,
+    }
+    write_json_atomic(cache_path, data, ensure_ascii=False, indent=2)
+    metadata_index.record(
+        metadata_index.TITLE, os.path.dirname(cache_path), video_id, data
+    )
+
+
 def call_openai_translate(title: str, model: str) -> str:
     """Translate a video title to English using the Chat Completions API."""
     client = ensure_client()
     for _attempt in range(5):
         try:
-            resp = client.chat.completions.create(
-                model=model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "Translate a video title from Korean (or mixed) to concise, idiomatic English.",
-                    },
-                    {
-                        "role": "user",
-                        "content": f"Title:\n{title}\n\nReturn only the translated title.",
-                    },
-                ],
-                temperature=0.3,
-                max_tokens=200,
-            )
+            resp = client.chat.completions.create(**build_title_request(title, model))
             return (resp.choices[0].message.content or "").strip()
         except RateLimitError:
             logging.warning("Rate limit hit, retrying in 5s...")
@@ -81,17 +102,7 @@ def run_translate_title(
                 return True  # Title already translated and cached
 
         translated = call_openai_translate(source_title, model=model)
-        with open(cache_path, "w", encoding="utf-8") as f:
-            json.dump(
-                {
-                    "video_id": video_id,
-                    "title_en": translated,
-                    "source_hash": source_hash,
-                },
-                f,
-                ensure_ascii=False,
-                indent=2,
-            )
+        save_title_cache(cache_path, video_id, translated, source_hash)
         logging.info(f"Successfully translated and cached title for {video_id}")
         return True
     except Exception as e:
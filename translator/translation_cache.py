@@ -0,0 +1,171 @@
+"""Content-addressed SQLite cache of subtitle chunk translations.
+
+A chunk's translation is stored under a hash of what the model saw: the text
+of its cues, the model, ``translate_subtitles.PROMPT_VERSION`` and the slang
+glossary. A different ``chunk_size``/``overlap``, a file with the same name in
+another folder or an edited glossary therefore never reuses a wrong reply,
+while identical chunks of other videos or of an earlier chunking do hit.
+
+Timings are not part of the key. A hit is re-timed onto the cues being
+translated (see ``retime``), since the same lines may appear at another point
+of another video.
+
+All entries live in ``translations.sqlite`` in the cache folder. When the
+stored translations outgrow ``max_bytes`` the least recently used ones are
+evicted.
+"""
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+from srt_io import parse_srt, shift_cues
+
+CACHE_FILE = "translations.sqlite"
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+# Eviction trims down to this share of max_bytes so it does not run per insert
+_LOW_WATER = 0.9
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS translations (
+    key TEXT PRIMARY KEY,
+    translation TEXT NOT NULL,
+    origin_ms INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS translations_last_used ON translations (last_used);
+"""
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def glossary_hash(slang_text: str) -> str:
+    """Digest of the slang glossary a prompt embeds."""
+    return hashlib.sha1(slang_text.encode("utf-8")).hexdigest()
+
+
+def chunk_key(chunk: list, model: str, prompt_version: int, glossary: str) -> str:
+    """Cache key of a chunk of cues translated with ``model`` and ``glossary``."""
+    payload = json.dumps(
+        [[cue.lines for cue in chunk], model, prompt_version, glossary],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def retime(translation: str, chunk: list, origin_ms: int) -> list:
+    """Cues of a cached ``translation`` placed on the timeline of ``chunk``.
+
+    When the reply has one cue per source cue, each takes its source's
+    times; otherwise the cues are shifted from ``origin_ms`` (the first
+    source cue's start when the reply was cached) to ``chunk[0].start``.
+    """
+    cues = parse_srt(translation)
+    if len(cues) == len(chunk):
+        for cue, src in zip(cues, chunk):
+            cue.start, cue.end = src.start, src.end
+        return cues
+    return shift_cues(cues, chunk[0].start - origin_ms if chunk else 0)
+
+
+class TranslationCache:
+    """SQLite table of chunk translations with size-bounded LRU eviction."""
+
+    def __init__(self, db_path: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=60)
+        self._conn.executescript(_SCHEMA)
+        self._total = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM translations"
+        ).fetchone()[0]
+
+    def close(self) -> None:
+        """Close the underlying database connection."""
+        with self._lock:
+            self._conn.close()
+
+    def get(self, key: str) -> Optional[tuple]:
+        """Return ``(translation, origin_ms)`` for ``key``, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT translation, origin_ms FROM translations WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is not None:
+                self._conn.execute(
+                    "UPDATE translations SET last_used = ? WHERE key = ?",
+                    (time.time(), key),
+                )
+                self._conn.commit()
+        return row
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return (
+                self._conn.execute(
+                    "SELECT 1 FROM translations WHERE key = ?", (key,)
+                ).fetchone()
+                is not None
+            )
+
+    def put(self, key: str, translation: str, origin_ms: int) -> None:
+        """Store ``translation``, then evict old entries if over ``max_bytes``."""
+        size = len(translation.encode("utf-8"))
+        with self._lock:
+            old = self._conn.execute(
+                "SELECT size FROM translations WHERE key = ?", (key,)
+            ).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO translations VALUES (?, ?, ?, ?, ?)",
+                (key, translation, origin_ms, size, time.time()),
+            )
+            self._total += size - (old[0] if old else 0)
+            if self._total > self.max_bytes:
+                self._evict(int(self.max_bytes * _LOW_WATER))
+            self._conn.commit()
+
+    def _evict(self, target: int) -> None:
+        # Caller holds the lock and commits
+        removed = []
+        rows = self._conn.execute(
+            "SELECT key, size FROM translations ORDER BY last_used"
+        ).fetchall()
+        for key, size in rows:
+            if self._total <= target:
+                break
+            removed.append((key,))
+            self._total -= size
+        self._conn.executemany("DELETE FROM translations WHERE key = ?", removed)
+        logging.info(
+            f"Evicted {len(removed)} cached translation(s) from {self.db_path}"
+        )
+
+
+def config_max_bytes(config: dict) -> Optional[int]:
+    """Size limit from the ``translation_cache_max_mb`` config key, if set."""
+    mb = config.get("translation_cache_max_mb")
+    return int(mb * 1024 * 1024) if mb else None
+
+
+def open_cache(cache_dir: str, max_bytes: Optional[int] = None) -> TranslationCache:
+    """Shared ``TranslationCache`` stored as ``<cache_dir>/translations.sqlite``.
+
+    ``max_bytes`` (when given) replaces the size limit of the shared cache.
+    """
+    path = os.path.abspath(os.path.join(cache_dir, CACHE_FILE))
+    with _caches_lock:
+        cache = _caches.get(path)
+        if cache is None:
+            cache = _caches[path] = TranslationCache(path)
+        if max_bytes is not None:
+            cache.max_bytes = max_bytes
+        return cache
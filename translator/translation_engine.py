@@ -0,0 +1,285 @@
+"""Asynchronous OpenAI chat engine shared by the translation steps.
+
+One ``AsyncOpenAI`` client and one event loop live in a background thread for
+the whole process, so every video translated at the same time (e.g. in DAG
+mode) shares a connection pool, a concurrency limit and a rate-limit budget.
+Requests are paced by token buckets that are resynchronised from the
+``x-ratelimit-*`` response headers instead of fixed sleeps.
+"""
+import asyncio
+import logging
+import os
+import re
+import threading
+import time
+from typing import Optional
+
+import openai
+from dotenv import load_dotenv
+
+
+class ContextLengthError(Exception):
+    """Raised when the OpenAI API reports context-length exceeded."""
+
+
+_DURATION_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def parse_duration(value) -> Optional[float]:
+    """Parse a header duration such as ``"1s"``, ``"6m0s"``, ``"20ms"`` or ``"2"``."""
+    if value is None or value == "":
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        pass
+    parts = _DURATION_RE.findall(str(value))
+    if not parts:
+        return None
+    return sum(float(n) * _UNITS[unit] for n, unit in parts)
+
+
+def estimate_tokens(prompt: str, max_tokens: int) -> int:
+    """Rough token cost of a request as counted against the TPM limit.
+
+    Korean text runs close to one token per character, English about four
+    characters per token; two characters per token is a safe middle. The
+    completion budget counts too.
+    """
+    return len(prompt) // 2 + max_tokens
+
+
+class TokenBucket:
+    """Async token bucket whose budget follows the server's rate-limit headers.
+
+    Until the first response arrives the limit is unknown and ``acquire`` never
+    waits; the engine's concurrency limit bounds the initial burst.
+    """
+
+    def __init__(self, clock=time.monotonic):
+        self.capacity: Optional[float] = None
+        self.rate = 0.0
+        self.tokens = 0.0
+        self._clock = clock
+        self._stamp = clock()
+        self._paused_until = 0.0
+
+    def _refill(self, now: float) -> None:
+        if self.capacity is not None:
+            elapsed = max(0.0, now - self._stamp)
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+        self._stamp = now
+
+    def update(self, limit, remaining, reset) -> None:
+        """Resynchronise from ``x-ratelimit-limit/remaining/reset-*`` values."""
+        try:
+            limit = float(limit)
+            remaining = float(remaining)
+        except (TypeError, ValueError):
+            return
+        if limit <= 0:
+            return
+        reset = parse_duration(reset)
+        self._refill(self._clock())
+        self.capacity = limit
+        self.tokens = min(limit, max(0.0, remaining))
+        # The reset header is the time until the bucket is full again
+        if reset and remaining < limit:
+            self.rate = (limit - remaining) / reset
+        else:
+            self.rate = limit / 60.0
+
+    def pause(self, seconds: float) -> None:
+        """Hold every caller for ``seconds`` (e.g. after a 429)."""
+        self._paused_until = max(self._paused_until, self._clock() + seconds)
+
+    async def acquire(self, amount: float = 1.0) -> None:
+        """Wait until ``amount`` tokens are available and take them."""
+        while True:
+            now = self._clock()
+            if now < self._paused_until:
+                await asyncio.sleep(self._paused_until - now)
+                continue
+            if self.capacity is None:
+                return
+            self._refill(now)
+            # A single request larger than the whole bucket waits for a full bucket
+            need = min(amount, self.capacity)
+            if self.tokens >= need:
+                self.tokens -= need
+                return
+            await asyncio.sleep((need - self.tokens) / max(self.rate, 1e-6))
+
+
+# --- Shared process-wide state ----------------------------------------------
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = threading.Lock()
+_client = None
+_client_lock = threading.Lock()
+# Only touched from the engine loop thread
+_semaphores: dict = {}
+request_bucket = TokenBucket()
+token_bucket = TokenBucket()
+
+
+def _engine_loop() -> asyncio.AbstractEventLoop:
+    global _loop  # noqa: PLW0603
+    with _loop_lock:
+        if _loop is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(
+                target=loop.run_forever, name="openai-engine", daemon=True
+            ).start()
+            _loop = loop
+    return _loop
+
+
+def run(coro):
+    """Run ``coro`` on the shared engine loop and block until it finishes."""
+    return asyncio.run_coroutine_threadsafe(coro, _engine_loop()).result()
+
+
+def get_client():
+    """Return the process-wide ``AsyncOpenAI`` client."""
+    global _client  # noqa: PLW0603
+    with _client_lock:
+        if _client is None:
+            load_dotenv()
+            api_key = os.getenv("OPENAI_API_KEY")
+            _client = (
+                openai.AsyncOpenAI(api_key=api_key)
+                if api_key
+                else openai.AsyncOpenAI()
+            )
+        return _client
+
+
+def _semaphore(limit: int) -> asyncio.Semaphore:
+    # Created lazily on the engine loop so it binds to the right loop on py3.9
+    if limit not in _semaphores:
+        _semaphores[limit] = asyncio.Semaphore(limit)
+    return _semaphores[limit]
+
+
+def _update_limits(headers) -> None:
+    request_bucket.update(
+        headers.get("x-ratelimit-limit-requests"),
+        headers.get("x-ratelimit-remaining-requests"),
+        headers.get("x-ratelimit-reset-requests"),
+    )
+    token_bucket.update(
+        headers.get("x-ratelimit-limit-tokens"),
+        headers.get("x-ratelimit-remaining-tokens"),
+        headers.get("x-ratelimit-reset-tokens"),
+    )
+
+
+def is_quota_error(ex: Exception) -> bool:
+    """Return True for an exhausted account quota, which retrying cannot fix."""
+    return getattr(ex, "code", None) == "insufficient_quota" or (
+        "insufficient_quota" in str(ex)
+    )
+
+
+def _retry_delay(headers, attempt: int) -> float:
+    """Seconds to back off after a 429, preferring the server's own hints."""
+    headers = headers or {}
+    ms = parse_duration(headers.get("retry-after-ms"))
+    if ms is not None:
+        return ms / 1000.0
+    for name in (
+        "retry-after",
+        "x-ratelimit-reset-tokens",
+        "x-ratelimit-reset-requests",
+    ):
+        delay = parse_duration(headers.get(name))
+        if delay:
+            return delay
+    return min(60.0, 2.0 * 2**attempt)
+
+
+class ChatEngine:
+    """Concurrent chat completions over the shared client and rate limits."""
+
+    def __init__(
+        self,
+        model: str,
+        system_prompt: str,
+        concurrency: int = 4,
+        temperature: float = 0.2,
+        max_tokens: int = 4000,
+        max_retries: int = 5,
+    ):
+        self.model = model
+        self.system_prompt = system_prompt
+        self.concurrency = max(1, int(concurrency))
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+        self.max_retries = max_retries
+
+    async def complete(self, prompt: str) -> str:
+        """Return the assistant reply for ``prompt``, retrying transient errors."""
+        client = get_client()
+        cost = estimate_tokens(prompt, self.max_tokens)
+        async with _semaphore(self.concurrency):
+            for attempt in range(self.max_retries):
+                await request_bucket.acquire(1)
+                await token_bucket.acquire(cost)
+                try:
+                    raw = await client.chat.completions.with_raw_response.create(
+                        model=self.model,
+                        messages=[
+                            {"role": "system", "content": self.system_prompt},
+                            {"role": "user", "content": prompt},
+                        ],
+                        temperature=self.temperature,
+                        max_tokens=self.max_tokens,
+                    )
+                except openai.RateLimitError as e:
+                    if is_quota_error(e):
+                        raise
+                    delay = _retry_delay(getattr(e.response, "headers", None), attempt)
+                    logging.warning(f"Rate limit hit, pausing requests for {delay:.1f}s")
+                    request_bucket.pause(delay)
+                    continue
+                except openai.BadRequestError as e:
+                    if getattr(
+                        e, "code", ""
+                    ) == "context_length_exceeded" or "context_length_exceeded" in str(
+                        e
+                    ):
+                        raise ContextLengthError from e
+                    logging.warning(f"OpenAI API error: {e}, retrying...")
+                    await asyncio.sleep(_retry_delay(None, attempt))
+                    continue
+                except openai.OpenAIError as e:
+                    logging.warning(f"OpenAI API error: {e}, retrying...")
+                    await asyncio.sleep(_retry_delay(None, attempt))
+                    continue
+                _update_limits(raw.headers)
+                resp = raw.parse()
+                return (resp.choices[0].message.content or "").strip()
+        raise RuntimeError("OpenAI API failed after multiple retries")
+
+    async def complete_all(self, prompts: list, on_result=None) -> list:
+        """Complete ``prompts`` concurrently, preserving order.
+
+        ``on_result(i, text)`` runs as each reply arrives (e.g. to write a
+        cache file). The first failure cancels the remaining requests.
+        """
+
+        async def one(i: int, prompt: str) -> str:
+            text = await self.complete(prompt)
+            if on_result:
+                on_result(i, text)
+            return text
+
+        tasks = [asyncio.ensure_future(one(i, p)) for i, p in enumerate(prompts)]
+        try:
+            return list(await asyncio.gather(*tasks))
+        except BaseException:
+            for t in tasks:
+                t.cancel()
+            raise
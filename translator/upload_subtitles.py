@@ -5,6 +5,8 @@ from typing import Optional
 
 import requests
 
+from artifacts import write_json_atomic
+
 
 def run_upload_subtitles(  # noqa: C901
     input_file: str,
@@ -56,8 +58,9 @@ def run_upload_subtitles(  # noqa: C901
                     logging.error(f"Pastebin login failed: {resp_login.status_code}")
                     return False
                 user_key = resp_login.text.strip()
-                with open(user_key_cache, "w", encoding="utf-8") as f:
-                    json.dump({"user_key": user_key}, f, ensure_ascii=False, indent=2)
+                write_json_atomic(
+                    user_key_cache, {"user_key": user_key}, ensure_ascii=False, indent=2
+                )
                 logging.info("Logged in to Pastebin, user key cached")
 
         # Read subtitles and construct paste payload
@@ -96,10 +99,9 @@ def run_upload_subtitles(  # noqa: C901
         else:
             paste_id = resp_text
             url = f"https://pastebin.com/raw/{paste_id}"
-        with open(cache_file, "w", encoding="utf-8") as f:
-            json.dump(
-                {"paste_id": paste_id, "url": url}, f, ensure_ascii=False, indent=2
-            )
+        write_json_atomic(
+            cache_file, {"paste_id": paste_id, "url": url}, ensure_ascii=False, indent=2
+        )
         logging.info("Uploaded to Pastebin: %s", url)
         return True
     except Exception as e: